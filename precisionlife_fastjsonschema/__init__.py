@@ -76,14 +76,32 @@ API
 ***
 """
 
+import time
+
+from .bundler import bundle
+from .code_cache import CodeCache
+from .compile_stats import collect_compile_stats
+from .adaptive import AdaptiveValidator
 from .draft04 import CodeGeneratorDraft04
 from .draft06 import CodeGeneratorDraft06
 from .draft07 import CodeGeneratorDraft07
-from .exceptions import JsonSchemaException, JsonSchemaValidationException, JsonSchemaDefinitionException
+from .exceptions import (
+    JsonSchemaException, JsonSchemaValidationException, JsonSchemaDefinitionException, JsonSchemaBudgetExceeded,
+)
+from .explain import Explainer, format_report
+from .fetcher import HttpFetcher
+from .function_pool import FunctionPool
+from .instrumentation import Instrumentation
+from .interpreter import Interpreter, TieredValidator
+from .normalizer import normalize_schema
+from .profile import Profile
 from .ref_resolver import RefResolver
+from .regex_analysis import RegexRiskWarning, analyze_regex
+from .source_map import locate_source, locate_traceback
+from .store import RefStore
 from .version import VERSION
 
-__all__ = ('VERSION', 'JsonSchemaException', 'JsonSchemaValidationException', 'JsonSchemaDefinitionException', 'validate', 'compile', 'compile_to_code')
+__all__ = ('VERSION', 'JsonSchemaException', 'JsonSchemaValidationException', 'JsonSchemaDefinitionException', 'JsonSchemaBudgetExceeded', 'HttpFetcher', 'RefStore', 'CodeCache', 'FunctionPool', 'Instrumentation', 'Profile', 'AdaptiveValidator', 'TieredValidator', 'RegexRiskWarning', 'validate', 'interpret', 'compile', 'compile_to_code', 'bundle', 'normalize_schema', 'locate_source', 'locate_traceback', 'explain', 'format_report', 'analyze_regex')
 
 
 def validate(definition, data, handlers={}, formats={}):
@@ -100,13 +118,45 @@ def validate(definition, data, handlers={}, formats={}):
         fastjsonschema.validate({'type': 'string'}, 'hello')
         # same as: compile({'type': 'string'})('hello')
 
+    The definition is interpreted (see :any:`interpret`), because generating and
+    compiling the code would cost more than one validation. Recursive definition
+    is compiled, because the interpreter uses more Python frames per level of data
+    and deeply nested data would end with ``RecursionError``.
+
     Preferred is to use :any:`compile` function.
     """
-    return compile(definition, handlers, formats)(data)
+    interpreted = interpret(definition, handlers, formats)
+    if interpreted.recursive:
+        return compile(definition, handlers, formats)(data)
+    return interpreted(data)
+
+
+# pylint: disable=dangerous-default-value
+def interpret(definition, handlers={}, formats={}, regex_policy=None, **resolver_kwargs):
+    """
+    Returns validation function for JSON schema passed in ``definition`` which
+    interprets it instead of generating the code (see :any:`Interpreter`). It
+    takes the same ``handlers`` and ``formats`` as :any:`compile` and raises the
+    same exceptions (and ``regex_policy``), only it is slower for repeated validation:
+
+    .. code-block:: python
+
+        validate = fastjsonschema.interpret({'type': 'string'})
+        validate('hello')
+
+    Exception :any:`JsonSchemaDefinitionException` is raised for bad definition.
+    """
+    resolver, code_generator = _factory(definition, handlers, formats, **resolver_kwargs)
+    return Interpreter(resolver, code_generator, formats, regex_policy)
 
 
 # pylint: disable=redefined-builtin,dangerous-default-value,exec-used
-def compile(definition, handlers={}, formats={}, **resolver_kwargs):
+def compile(
+    definition, handlers={}, formats={}, code_cache=None, optimize=True, normalize=False, deduplicate=True,
+    function_pool=None, lazy=False, inline_refs=4, iterative=False, instrument=False, source_map=False,
+    compile_stats=False, profile=None, adaptive=False, tiered=False, budget_ns=None, regex_policy=None,
+    **resolver_kwargs
+):
     """
     Generates validation function for validating JSON schema passed in ``definition``.
     Example:
@@ -145,6 +195,13 @@ def compile(definition, handlers={}, formats={}, **resolver_kwargs):
 
     You can pass mapping from URI to function that should be used to retrieve
     remote schemes used in your ``definition`` in parameter ``handlers``.
+    For HTTP(S) with keep-alive connections, timeouts and on-disk cache use
+    :any:`HttpFetcher`:
+
+    .. code-block:: python
+
+        fetcher = fastjsonschema.HttpFetcher(cache_dir='/tmp/schemas', timeout=5)
+        validate = fastjsonschema.compile(definition, handlers={'http': fetcher, 'https': fetcher})
 
     Also, you can pass mapping for custom formats. Key is the name of your
     formatter and value can be regular expression which will be compiled or
@@ -157,21 +214,192 @@ def compile(definition, handlers={}, formats={}, **resolver_kwargs):
             'bar': lambda value: value in ('foo', 'bar'),
         })
 
+    Generated code is optimized, for example checks of keywords applicable only to
+    strings are not wrapped by check of string type when ``type`` already ensured
+    it. Optimizations can be turned off by ``optimize=False``.
+
+    With ``normalize=True`` the ``definition`` is simplified before generating the
+    code (see :any:`normalize_schema`), for example redundant ``allOf`` wrappers
+    are removed. Validation results and errors stay the same, only attribute
+    ``definition`` of errors can be the simplified subschema.
+
+    Structurally equal subschemas used more than once (for example the same address
+    object in many places) are validated by one shared function instead of repeating
+    the same code. It can be turned off by ``deduplicate=False``.
+
+    Validators of many schemas built from the same definitions can share those
+    functions (and compiled regular expressions) by :any:`FunctionPool`:
+
+    .. code-block:: python
+
+        function_pool = fastjsonschema.FunctionPool()
+        validate = fastjsonschema.compile(definition, function_pool=function_pool)
+
+    With ``lazy=True`` functions of referenced definitions are generated and compiled
+    only when they are called for the first time, so the compilation costs only what
+    is really used (useful for huge schemas with many definitions).
+
+    Small targets of ``$ref`` (with at most ``inline_refs`` keywords, including nested
+    ones) are validated in place instead of calling their functions, unless they are
+    part of a recursion. Higher value means faster validation but bigger code,
+    ``inline_refs=0`` turns it off.
+
+    Recursive schemas (for example trees) validate nested data by recursive calls,
+    so too deep data ends with ``RecursionError``. With ``iterative=True`` referenced
+    definitions are validated on an explicit stack instead, so the depth of data is
+    limited by its maximum depth, which can be passed instead of ``True`` (100 times
+    ``sys.getrecursionlimit()`` by default). Deeper stack (for example by cycle of
+    ``$ref``) raises ``RecursionError`` as well. It is a bit slower, therefore it
+    is turned off by default.
+
+    To find out which keywords of a slow schema take the time, compile it with
+    ``instrument=True`` (or ``instrument='timing'`` to measure also time spent in
+    every generated function). Validator then counts evaluations and failures of
+    every keyword and has method ``stats`` returning them (see :any:`Instrumentation`):
+
+    .. code-block:: python
+
+        validate = fastjsonschema.compile(definition, instrument=True)
+        validate(data)
+        validate.stats()  # or validate.stats(format='prometheus')
+
+    Instrumented validator does not share functions of equal subschemas (nor
+    with ``function_pool``), so every subschema has own counters.
+
+    Its ``stats()`` saved as JSON can be passed back in ``profile`` (path to the
+    file, the dictionary or :any:`Profile`). Validator compiled with it tries the
+    most frequently matching branches of ``anyOf`` first and orders independent
+    checks so the most frequently failing cheap ones come first:
+
+    .. code-block:: python
+
+        validate = fastjsonschema.compile(definition, profile='profile.json')
+
+    With ``adaptive=True`` (or number of sampled inputs, 100 by default) it returns
+    :any:`AdaptiveValidator` which observes shape of the first inputs and when it is
+    stable (same types and keys of objects), it compiles in the background validator
+    specialized for it, with cheap check of the shape and fallback to the generic one.
+    It counts ``hits`` and ``misses`` of the specialization.
+
+    With ``tiered=True`` (or number of calls, 100 by default) it returns
+    :any:`TieredValidator` which interprets the schema (see :any:`interpret`) and
+    generates and compiles the code only after that number of calls or 50 ms spent
+    in validation. Schemas validated only a few times never pay for the compilation.
+    The interpreter is recursive, so with ``iterative=True`` the code is compiled
+    right away and ``tiered`` is ignored.
+
+    To bound the time spent by a single pathological input (such as huge array
+    under ``anyOf`` with many branches), pass ``budget_ns``. Loops over the data
+    and branches of combinators then check the deadline and validation taking
+    longer raises :any:`JsonSchemaBudgetExceeded`. Budget can be changed also for
+    one call, validators without it do not check anything:
+
+    .. code-block:: python
+
+        validate = fastjsonschema.compile(definition, budget_ns=10_000_000)
+        validate(data)
+        validate(data, budget_ns=1_000_000)
+
+    Single regular expression is not interrupted, but regular expressions of
+    ``pattern``, ``patternProperties`` and custom formats prone to catastrophic
+    backtracking (see :any:`analyze_regex`) can be handled by ``regex_policy``:
+    ``'warn'`` emits :any:`RegexRiskWarning`, ``'reject'`` raises
+    :any:`JsonSchemaDefinitionException` and ``'guard'`` does not match strings
+    longer than 1000 characters by them. Found ones are always listed in
+    ``regex_risks`` of ``compile_stats``. The interpreted phase of tiered validator
+    is not budgeted.
+
+    Generated code is compiled with file name identifying it, such as
+    ``<fastjsonschema 1f2e3d4c5b6a7988>``. With ``source_map=True`` the code is also
+    registered in :mod:`linecache` (tracebacks show its lines) and
+    :any:`locate_source` returns JSON pointer of keyword which generated given
+    line, for example hotspot reported by a profiler:
+
+    .. code-block:: python
+
+        validate = fastjsonschema.compile(definition, source_map=True)
+        fastjsonschema.locate_source('<fastjsonschema 1f2e3d4c5b6a7988>', 120)
+        # '#/definitions/order/properties/items/pattern'
+
+    With ``compile_stats=True`` validator has attribute ``compile_stats`` with times
+    of phases of the compilation, size of generated code and approximate memory
+    held by the validator (see :any:`collect_compile_stats`).
+
+    Compiling the generated code by Python is the slowest part for big schemas.
+    Pass :any:`CodeCache` in ``code_cache`` to compile the same code only once
+    (optionally even across processes when it has ``cache_dir``):
+
+    .. code-block:: python
+
+        code_cache = fastjsonschema.CodeCache(cache_dir='/var/cache/validators')
+        validate = fastjsonschema.compile(definition, code_cache=code_cache)
+
     Exception :any:`JsonSchemaDefinitionException` is raised when generating the
     code fails (bad definition).
 
     Exception :any:`JsonSchemaValidationException` is raised from generated function when
     validation fails (data do not follow the definition).
     """
-    resolver, code_generator = _factory(definition, handlers, formats, **resolver_kwargs)
+    options = {
+        'optimize': optimize,
+        'normalize': normalize,
+        'deduplicate': deduplicate,
+        'function_pool': function_pool,
+        'lazy': lazy,
+        'inline_refs': inline_refs,
+        'iterative': iterative,
+        'instrument': instrument,
+        'source_map': source_map,
+        'profile': _load_profile(profile),
+        'budget_ns': budget_ns,
+        'regex_policy': regex_policy,
+    }
+
+    def build():
+        validate = _compile(definition, handlers, formats, options, code_cache, compile_stats, **resolver_kwargs)
+        if adaptive:
+            def specialize(shape):
+                return _compile(definition, handlers, formats, dict(options, shape=shape), code_cache, **resolver_kwargs)
+            validate = AdaptiveValidator(validate, specialize, sample_size=100 if adaptive is True else adaptive)
+        return validate
+
+    if tiered and not iterative:
+        interpreted = interpret(definition, handlers, formats, regex_policy, **resolver_kwargs)
+        return TieredValidator(interpreted, build, promote_calls=100 if tiered is True else tiered)
+    return build()
+
+
+# pylint: disable=exec-used
+def _compile(definition, handlers, formats, options, code_cache=None, compile_stats=False, **resolver_kwargs):
+    timings = {}
+    resolver, code_generator = _factory(definition, handlers, formats, options, timings, **resolver_kwargs)
+    if options.get('shape') is not None and not code_generator.specialized:
+        return None
+    started = time.perf_counter_ns()
     global_state = code_generator.global_state
+    code_generator.func_code  # pylint: disable=pointless-statement
+    timings['generate_ns'] = time.perf_counter_ns() - started
+    started = time.perf_counter_ns()
+    code = code_generator.compile_func_code(code_cache)
     # Do not pass local state so it can recursively call itself.
-    exec(code_generator.func_code, global_state)
-    return global_state[resolver.get_scope_name()]
+    exec(code, global_state)
+    timings['exec_ns'] = time.perf_counter_ns() - started
+    validate = global_state[resolver.get_scope_name()]
+    if compile_stats:
+        validate.compile_stats = collect_compile_stats(resolver, code_generator, code, global_state, timings)
+    if options['instrument']:
+        validate.stats = global_state['INSTRUMENTATION'].stats
+    if options['source_map']:
+        # Source maps are registered only as long as the validator exists.
+        validate.source_maps = code_generator.source_maps
+    return validate
 
 
 # pylint: disable=dangerous-default-value
-def compile_to_code(definition, handlers={}, formats={}, **resolver_kwargs):
+def compile_to_code(
+    definition, handlers={}, formats={}, optimize=True, normalize=False, deduplicate=True, inline_refs=4,
+    iterative=False, **resolver_kwargs
+):
     """
     Generates validation code for validating JSON schema passed in ``definition``.
     Example:
@@ -194,7 +422,14 @@ def compile_to_code(definition, handlers={}, formats={}, **resolver_kwargs):
     Exception :any:`JsonSchemaDefinitionException` is raised when generating the
     code fails (bad definition).
     """
-    _, code_generator = _factory(definition, handlers, formats, **resolver_kwargs)
+    options = {
+        'optimize': optimize,
+        'normalize': normalize,
+        'deduplicate': deduplicate,
+        'inline_refs': inline_refs,
+        'iterative': iterative,
+    }
+    _, code_generator = _factory(definition, handlers, formats, options, **resolver_kwargs)
     return (
         'VERSION = "' + VERSION + '"\n' +
         code_generator.global_state_code + '\n' +
@@ -202,9 +437,48 @@ def compile_to_code(definition, handlers={}, formats={}, **resolver_kwargs):
     )
 
 
-def _factory(definition, handlers, formats={}, **resolver_kwargs):
+# pylint: disable=dangerous-default-value
+def explain(definition, handlers={}, formats={}, **resolver_kwargs):
+    """
+    Estimates cost of validation by ``definition`` without compiling it and reports
+    constructs known to be slow in this implementation (such as ``anyOf`` with many
+    branches without discriminator). Example:
+
+    .. code-block:: python
+
+        report = fastjsonschema.explain(definition)
+        report['warnings'][0]
+        # {'pointer': '#/properties/shape/anyOf', 'keyword': 'anyOf', 'cost': 95,
+        #  'message': 'anyOf with 6 branches without discriminator, every failing branch raises an exception'}
+        print(fastjsonschema.format_report(report))
+
+    Report contains estimated ``cost`` of the whole schema, ``warnings`` and ``nodes``
+    (subschemas with their cost including nested subschemas and own cost), both ranked
+    from the most expensive one. See :any:`Explainer` for the cost model.
+
+    Exception :any:`JsonSchemaDefinitionException` is raised for bad definition.
+    """
+    resolver, code_generator = _factory(definition, handlers, formats, **resolver_kwargs)
+    return Explainer(resolver, code_generator.keywords).explain()
+
+
+def _load_profile(profile):
+    if profile is None or isinstance(profile, Profile):
+        return profile
+    if isinstance(profile, dict):
+        return Profile(profile)
+    return Profile.load(profile)
+
+
+def _factory(definition, handlers, formats={}, options={}, timings=None, **resolver_kwargs):
+    started = time.perf_counter_ns()
+    options = dict(options)
+    if options.pop('normalize', False):
+        definition, _ = normalize_schema(definition)
     resolver = RefResolver.from_schema(definition, handlers=handlers, **resolver_kwargs)
-    code_generator = _get_code_generator_class(definition)(definition, resolver=resolver, formats=formats)
+    if timings is not None:
+        timings['walk_ns'] = time.perf_counter_ns() - started
+    code_generator = _get_code_generator_class(definition)(definition, resolver=resolver, formats=formats, **options)
     return resolver, code_generator
 
 
@@ -1,10 +1,14 @@
 import json
 import sys
 
-from . import compile_to_code
+from . import HttpFetcher, bundle, compile, compile_to_code, explain, format_report  # pylint: disable=redefined-builtin
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
     if len(sys.argv) == 2:
         definition = sys.argv[1]
     else:
@@ -15,5 +19,55 @@ def main():
     print(code)
 
 
+def read_definition(args):
+    """
+    Definition is read from the file given as the first argument or from stdin.
+    """
+    if args and args[0] != '-':
+        with open(args[0], encoding='utf-8') as definition_file:
+            return json.load(definition_file)
+    return json.load(sys.stdin)
+
+
+def bundle_command(args):
+    """
+    Usage: python3 -m precisionlife_fastjsonschema bundle [schema.json] > bundled.json
+    """
+    with HttpFetcher() as fetcher:
+        bundled = bundle(read_definition(args), handlers={'http': fetcher, 'https': fetcher})
+    print(json.dumps(bundled, indent=2))
+
+
+def stats_command(args):
+    """
+    Usage: python3 -m precisionlife_fastjsonschema stats [schema.json]
+
+    Prints statistics of compilation of the schema (times, size of code and memory) as JSON.
+    """
+    with HttpFetcher() as fetcher:
+        validate = compile(read_definition(args), handlers={'http': fetcher, 'https': fetcher}, compile_stats=True)
+    print(json.dumps(validate.compile_stats, indent=2))
+
+
+def explain_command(args):
+    """
+    Usage: python3 -m precisionlife_fastjsonschema explain [--json] [schema.json]
+
+    Prints estimated cost of the schema and constructs known to be slow, as JSON with ``--json``.
+    """
+    as_json = '--json' in args
+    args = [arg for arg in args if arg != '--json']
+    with HttpFetcher() as fetcher:
+        report = explain(read_definition(args), handlers={'http': fetcher, 'https': fetcher})
+    print(json.dumps(report, indent=2) if as_json else format_report(report))
+
+
+COMMANDS = {
+    'bundle': bundle_command,
+    'stats': stats_command,
+    'explain': explain_command,
+}
+
+
 if __name__ == '__main__':
     main()
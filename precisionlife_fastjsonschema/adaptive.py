@@ -0,0 +1,216 @@
+"""
+Adaptive validators specialized for the shape of validated data.
+
+Generic validator does not know anything about the data, so it checks types
+by ``isinstance`` with abstract classes, probes every optional property and
+computes required and additional properties for every object. When the data
+have a stable shape (always plain ``dict`` and ``list`` with the same keys),
+validator compiled with ``adaptive=True`` (or number of sampled inputs) can do
+better:
+
+.. code-block:: python
+
+    validate = fastjsonschema.compile(definition, adaptive=100)
+    for data in stream:
+        validate(data)
+    validate.hits, validate.misses
+
+It validates the first ``sample_size`` inputs by the generic validator and
+observes their shape. When all of them have the same shape, specialized
+validator is compiled in a background thread. It checks cheaply that the value
+has the observed shape (exact type and set of keys of objects) and relies on it
+afterwards; values of other shapes are validated by the generic validator
+again (counted as ``misses``). Specialization is dropped when most of the
+inputs miss it.
+
+Schemas with side effects (``default``, ``contentEncoding`` or ``contentMediaType``)
+are never specialized. Functions of ``$ref`` which are not inlined stay generic.
+"""
+
+import threading
+
+
+# Shapes are observed only up to this depth and only for this number of items of arrays.
+SHAPE_DEPTH = 8
+SHAPE_ITEMS = 20
+
+PYTHON_TYPE_TO_KIND = {
+    type(None): 'null',
+    bool: 'bool',
+    int: 'int',
+    float: 'float',
+    str: 'str',
+    list: 'list',
+    dict: 'dict',
+}
+
+
+class SpecializationMiss(Exception):
+    """
+    Raised by specialized validator when the value does not have its shape.
+    It is not :any:`JsonSchemaValidationException`, so it is never caught by
+    the generated code.
+    """
+
+
+class Shape:
+    """
+    Shape of the value: its ``kind`` (see :any:`TypeFact`) given by exact type,
+    for objects its ``keys`` and shapes of its ``properties`` and for arrays
+    shape of all its ``items``. Unknown shapes are ``None``.
+    """
+
+    __slots__ = ('kind', 'keys', 'properties', 'items')
+
+    def __init__(self, kind, keys=None, properties=None, items=None):
+        self.kind = kind
+        self.keys = keys
+        self.properties = properties or {}
+        self.items = items
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Shape)
+            and (self.kind, self.keys, self.properties, self.items) == (other.kind, other.keys, other.properties, other.items)
+        )
+
+    def __repr__(self):
+        if self.kind == 'dict':
+            return '{{{}}}'.format(', '.join('{!r}: {!r}'.format(key, self.properties.get(key)) for key in sorted(self.keys)))
+        if self.kind == 'list':
+            return '[{!r}]'.format(self.items)
+        return self.kind
+
+
+def observe_shape(value, depth=SHAPE_DEPTH):
+    """
+    Returns :any:`Shape` of ``value``, ``None`` when it is not JSON value.
+    """
+    kind = PYTHON_TYPE_TO_KIND.get(type(value))
+    if kind == 'dict':
+        if not all(type(key) is str for key in value):
+            return None
+        properties = {key: observe_shape(item, depth - 1) for key, item in value.items()} if depth else {}
+        return Shape(kind, keys=frozenset(value), properties=properties)
+    if kind == 'list':
+        items = common_shape([observe_shape(item, depth - 1) for item in value[:SHAPE_ITEMS]]) if depth else None
+        return Shape(kind, items=items)
+    if kind is None:
+        return None
+    return Shape(kind)
+
+
+def common_shape(shapes):
+    """
+    Returns shape of all values of given ``shapes``, ``None`` when they differ.
+    """
+    if not shapes or any(shape is None for shape in shapes):
+        return None
+    first = shapes[0]
+    if any(shape.kind != first.kind or shape.keys != first.keys for shape in shapes):
+        return None
+    if first.kind == 'dict':
+        return Shape('dict', keys=first.keys, properties={
+            key: common_shape([shape.properties.get(key) for shape in shapes])
+            for key in first.keys
+        })
+    if first.kind == 'list':
+        return Shape('list', items=common_shape([shape.items for shape in shapes]))
+    return first
+
+
+class AdaptiveValidator:
+    """
+    Callable validator which samples shapes of its first ``sample_size`` inputs and
+    then uses validator returned by ``specialize(shape)`` (``None`` when the schema
+    cannot be specialized) with fallback to generic ``validate``.
+
+    Keyword arguments of calls (such as ``root_path`` or ``budget_ns``) are passed
+    to both validators, so it can be used the same way as the generic one.
+
+    Counters ``calls``, ``hits`` and ``misses`` of the specialization are updated
+    without locking, so they are only approximate when used by many threads.
+    Other attributes (such as ``stats``) are the ones of the generic validator.
+    """
+
+    def __init__(self, validate, specialize, sample_size=100, background=True):
+        self.validate = validate
+        self.specialize = specialize
+        self.sample_size = sample_size
+        self.background = background
+        self.shape = None
+        self.calls = 0
+        self.misses = 0
+        self._specialized = None
+        self._samples = 0
+        self._sampled_shape = None
+        self._sampling = True
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def hits(self):
+        return self.calls - self.misses
+
+    @property
+    def specialized(self):
+        """
+        Returns whether the specialized validator is used.
+        """
+        return self._specialized is not None
+
+    def __call__(self, data, **kwargs):
+        specialized = self._specialized
+        if specialized is None:
+            if self._sampling:
+                self._sample(data)
+            return self.validate(data, **kwargs)
+        self.calls += 1
+        try:
+            return specialized(data, **kwargs)
+        except SpecializationMiss:
+            self.misses += 1
+            # Shape was not stable after all, generic validator is faster then.
+            if self.misses >= self.sample_size and self.misses * 2 > self.calls:
+                self._specialized = None
+            return self.validate(data, **kwargs)
+
+    def wait(self, timeout=None):
+        """
+        Waits until the specialized validator is compiled (when it is compiled
+        in the background). Returns whether it is used.
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.specialized
+
+    def _sample(self, data):
+        shape = observe_shape(data)
+        with self._lock:
+            if not self._sampling:
+                return
+            self._sampled_shape = shape if not self._samples else common_shape([self._sampled_shape, shape])
+            self._samples += 1
+            if self._sampled_shape is None:
+                self._sampling = False
+                return
+            if self._samples < self.sample_size:
+                return
+            self._sampling = False
+        if self.background:
+            self._thread = threading.Thread(target=self._specialize, args=(self._sampled_shape,), daemon=True)
+            self._thread.start()
+        else:
+            self._specialize(self._sampled_shape)
+
+    def _specialize(self, shape):
+        specialized = self.specialize(shape)
+        if specialized is not None:
+            self.shape = shape
+            self._specialized = specialized
+
+    def __getattr__(self, name):
+        if name == 'validate':
+            raise AttributeError(name)
+        return getattr(self.validate, name)
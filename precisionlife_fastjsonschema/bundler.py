@@ -0,0 +1,197 @@
+"""
+Bundling of JSON schema with all referenced documents into one self-contained definition.
+
+Bundled definition does not need any handler (or network) during compilation
+and can be generated once at build time:
+
+.. code-block:: python
+
+    definition = fastjsonschema.bundle(definition, handlers={'https': fetcher})
+    with open('bundled.json', 'w') as f:
+        json.dump(definition, f)
+"""
+
+import copy
+import json
+import re
+from urllib import parse as urlparse
+
+from .exceptions import JsonSchemaDefinitionException
+from .ref_resolver import RefResolver, escape_pointer_part, fixed_urljoin, get_id, normalize
+
+# Values of those keywords are data, not schemas, therefore they are never searched for references.
+DATA_KEYWORDS = ('enum', 'const', 'default', 'examples')
+
+
+# pylint: disable=dangerous-default-value
+def bundle(definition, handlers={}, definitions_keyword='definitions', **resolver_kwargs):
+    """
+    Returns copy of ``definition`` where every referenced remote document is included
+    under ``definitions`` (or other ``definitions_keyword``, for example ``$defs``) and
+    all ``$ref`` are rewritten to local JSON pointers. Identical documents are included
+    only once. Documents are retrieved by :any:`RefResolver` with given ``handlers``.
+
+    .. code-block:: python
+
+        fastjsonschema.bundle({'$ref': 'http://example.com/item.json'})
+        # {'$ref': '#/definitions/item', 'definitions': {'item': {...}}}
+
+    You can also use it as a script:
+
+    .. code-block:: bash
+
+        python3 -m precisionlife_fastjsonschema bundle schema.json > bundled.json
+
+    Exception :any:`JsonSchemaDefinitionException` is raised when some reference
+    cannot be bundled (for example reference by plain name fragment).
+    """
+    return Bundler(definition, handlers, definitions_keyword, **resolver_kwargs).bundle()
+
+
+def fragment_pointer_part(part):
+    """
+    Escape one part of JSON pointer to be used in URI fragment.
+    """
+    return urlparse.quote(escape_pointer_part(part), safe="~!$&'()*+,;=:@")
+
+
+class Bundler:
+    """
+    This class is not supposed to be used directly, use :any:`bundle` instead.
+    """
+
+    def __init__(self, definition, handlers, definitions_keyword, **resolver_kwargs):
+        self._definition = copy.deepcopy(definition)
+        self._definitions_keyword = definitions_keyword
+        self._resolver = RefResolver.from_schema(self._definition, handlers=handlers, **resolver_kwargs)
+
+        # Normalized URI of every known document (or subschema with ``$id``) to JSON pointer in bundled definition.
+        self._locations = {}
+        # Found references as pairs of the node with ``$ref`` and absolute URI of that reference.
+        self._refs = []
+        # Canonical representation of already bundled documents to JSON pointer for deduplication.
+        self._pointers_by_content = {}
+        self._keys_taken = set()
+
+    def bundle(self):
+        if not isinstance(self._definition, dict):
+            return self._definition
+
+        root_uri = get_id(self._definition)
+        root_uri = root_uri if isinstance(root_uri, str) else ''
+        self._locations[self._document_uri(root_uri)] = ''
+        self._collect(self._definition, root_uri, '')
+
+        processed = 0
+        while processed < len(self._refs):
+            _, uri = self._refs[processed]
+            processed += 1
+            document_uri = self._document_uri(uri)
+            if document_uri not in self._locations:
+                self._include_document(document_uri)
+
+        for node, uri in self._refs:
+            node['$ref'] = self._local_ref(uri)
+        return self._definition
+
+    @staticmethod
+    def _document_uri(uri):
+        return normalize(urlparse.urldefrag(uri)[0])
+
+    def _collect(self, node, scope, pointer):
+        """
+        Walk thru ``node`` located at ``pointer``, remember locations of all ``$id``
+        and all references (resolved against the current ``scope``).
+        """
+        if isinstance(node, list):
+            for index, item in enumerate(node):
+                self._collect(item, scope, '{}/{}'.format(pointer, index))
+            return
+        if not isinstance(node, dict):
+            return
+
+        node_id = get_id(node)
+        if node_id and isinstance(node_id, str):
+            scope = fixed_urljoin(scope, node_id)
+            self._locations.setdefault(self._document_uri(scope), pointer)
+            if pointer:
+                # All references will be local to the root, nested resolution scopes would break them.
+                node.pop('$id', None)
+                node.pop('id', None)
+        if isinstance(node.get('$ref'), str):
+            self._refs.append((node, fixed_urljoin(scope, node['$ref'])))
+
+        for key, item in node.items():
+            if key not in DATA_KEYWORDS and isinstance(item, (dict, list)):
+                self._collect(item, scope, '{}/{}'.format(pointer, fragment_pointer_part(key)))
+
+    def _include_document(self, uri):
+        with self._resolver.resolving(uri) as document:
+            document = copy.deepcopy(document)
+
+        content = self._canonical_content(document, uri)
+        if content in self._pointers_by_content:
+            self._locations[uri] = self._pointers_by_content[content]
+            return
+
+        definitions = self._definition.setdefault(self._definitions_keyword, {})
+        if not isinstance(definitions, dict):
+            raise JsonSchemaDefinitionException('{} must be an object'.format(self._definitions_keyword))
+        if not self._keys_taken:
+            self._keys_taken.update(definitions.keys())
+        key = self._unique_key(uri)
+        definitions[key] = document
+
+        pointer = '/{}/{}'.format(fragment_pointer_part(self._definitions_keyword), fragment_pointer_part(key))
+        self._locations[uri] = pointer
+        self._pointers_by_content[content] = pointer
+        self._collect(document, uri, pointer)
+
+    def _canonical_content(self, document, uri):
+        """
+        Two documents are the same only when they are equal with all references resolved
+        to absolute URIs (the same relative reference can mean different document).
+        """
+        def absolute(node, scope):
+            if isinstance(node, list):
+                return [absolute(item, scope) for item in node]
+            if not isinstance(node, dict):
+                return node
+            node_id = get_id(node)
+            has_id = node_id and isinstance(node_id, str)
+            if has_id:
+                scope = fixed_urljoin(scope, node_id)
+            result = {}
+            for key, item in node.items():
+                if has_id and key in ('$id', 'id') and item is node_id:
+                    continue
+                if key == '$ref' and isinstance(item, str):
+                    result[key] = fixed_urljoin(scope, item)
+                elif key in DATA_KEYWORDS:
+                    result[key] = item
+                else:
+                    result[key] = absolute(item, scope)
+            return result
+
+        return json.dumps(absolute(document, uri), sort_keys=True, default=repr)
+
+    def _unique_key(self, uri):
+        path = urlparse.urlsplit(uri).path.rstrip('/')
+        name = path.rsplit('/', 1)[-1]
+        if name.endswith('.json'):
+            name = name[:-len('.json')]
+        name = re.sub(r'[^a-zA-Z0-9_.-]', '_', name) or 'schema'
+
+        key = name
+        idx = 0
+        while key in self._keys_taken:
+            idx += 1
+            key = '{}_{}'.format(name, idx)
+        self._keys_taken.add(key)
+        return key
+
+    def _local_ref(self, uri):
+        document_uri, fragment = urlparse.urldefrag(uri)
+        if fragment and not fragment.startswith('/'):
+            raise JsonSchemaDefinitionException('Cannot bundle reference with plain name fragment: {}'.format(uri))
+        return '#' + self._locations[self._document_uri(document_uri)] + fragment
@@ -0,0 +1,118 @@
+"""
+Cache of compiled validation code.
+
+For big schemas most of the time of :any:`compile` is not spent by generating
+the code but by Python parsing and compiling it. Compiled code objects can be
+cached (in memory and optionally on the disk in ``cache_dir``), so the same
+schema is compiled by Python only once, even across processes:
+
+.. code-block:: python
+
+    code_cache = CodeCache(cache_dir='/var/cache/validators')
+    validate = fastjsonschema.compile(definition, code_cache=code_cache)
+    code_cache.stats()
+    # {'hits': 0, 'misses': 1, 'entries': 1}
+"""
+
+import collections
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import types
+
+
+class CodeCache:
+    """
+    Thread-safe cache of code objects keyed by the generated source code.
+
+     * ``cache_dir`` is directory for storing compiled code on the disk (``None`` means memory only),
+     * ``max_entries`` limits number of code objects kept in memory (``None`` means no limit).
+
+    Files on the disk are specific to the Python implementation and version, other
+    versions simply do not find them.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=128):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        # Key -> code object; ordered from least recently used.
+        self._entries = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def compile(self, source, filename='<string>'):
+        """
+        Returns code object of ``source``, same as built-in ``compile`` in ``exec`` mode.
+        """
+        key = hashlib.sha256('{}\0{}'.format(filename, source).encode('utf-8')).hexdigest()
+        with self._lock:
+            code = self._entries.get(key)
+            if code is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return code
+
+        code = self._load(key)
+        with self._lock:
+            if code is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        if code is None:
+            code = compile(source, filename, 'exec')
+            self._save(key, code)
+
+        with self._lock:
+            self._entries[key] = code
+            if self.max_entries is not None and len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return code
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns counters of the cache as a dictionary.
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'entries': len(self._entries),
+            }
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, '{}.{}.bin'.format(key, sys.implementation.cache_tag))
+
+    def _load(self, key):
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._cache_path(key), 'rb') as cache_file:
+                code = marshal.load(cache_file)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        return code if isinstance(code, types.CodeType) else None
+
+    def _save(self, key, code):
+        if self.cache_dir is None:
+            return
+        # Write to temporary file first so concurrent processes never see partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as cache_file:
+                marshal.dump(code, cache_file)
+            os.replace(tmp_path, self._cache_path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,85 @@
+"""
+Statistics of compilation of validators.
+
+To budget memory and compile time of schemas, compile them with
+``compile_stats=True``. Validator then has attribute ``compile_stats``:
+
+.. code-block:: python
+
+    validate = fastjsonschema.compile(definition, compile_stats=True)
+    validate.compile_stats
+    # {'walk_ns': 81000, 'remote_fetches': 0, 'remote_fetch_ns': 0, 'generate_ns': 2150000,
+    #  'exec_ns': 1630000, 'total_ns': 3870000, 'functions': 3, 'lines': 120, 'bytes': 9800,
+    #  'regexs': 2, 'regex_compile_ns': 250000, 'regex_risks': [], 'code_bytes': 14000,
+    #  'global_state_bytes': 6300}
+
+Times are in nanoseconds:
+
+ * ``walk_ns`` is spent by :any:`RefResolver` walking the schema (and by normalization
+   when it is turned on),
+ * ``remote_fetch_ns`` by retrieving ``remote_fetches`` remote documents,
+ * ``generate_ns`` by generating the code (without remote fetching),
+ * ``exec_ns`` by compiling the code by Python and executing it.
+
+Sizes in bytes are only approximate, ``code_bytes`` is held by code objects of
+the generated functions and ``global_state_bytes`` by global variables of the
+validator (such as referenced definitions and compiled regular expressions).
+Lazily generated functions (``lazy=True``) are not included.
+
+``regex_risks`` lists user's regular expressions prone to catastrophic backtracking
+(see :any:`analyze_regex`) with JSON ``pointer`` of the subschema, ``keyword``,
+``pattern`` and found ``risks``.
+Same is printed for a schema file by ``python -m precisionlife_fastjsonschema stats schema.json``.
+"""
+
+import sys
+import types
+
+
+def code_size(code):
+    """
+    Returns approximate size of ``code`` object including nested code objects.
+    """
+    size = sys.getsizeof(code)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            size += code_size(const)
+    return size
+
+
+def deep_size(value, seen=None):
+    """
+    Returns approximate size of ``value`` including all contained values. Modules,
+    classes and functions are shared by all validators, so they are not counted.
+    """
+    if seen is None:
+        seen = set()
+    if id(value) in seen or isinstance(value, (types.ModuleType, type, types.FunctionType, types.BuiltinFunctionType, types.MethodType)):
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(key, seen) + deep_size(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in value)
+    return size
+
+
+def collect_compile_stats(resolver, code_generator, code, global_state, timings):
+    """
+    Returns statistics of compiled validator as a dictionary, see module documentation.
+    """
+    stats = {
+        'walk_ns': timings['walk_ns'],
+        'remote_fetches': resolver.remote_fetches,
+        'remote_fetch_ns': resolver.remote_fetch_ns,
+        'generate_ns': timings['generate_ns'] - resolver.remote_fetch_ns,
+        'exec_ns': timings['exec_ns'],
+        'total_ns': timings['walk_ns'] + timings['generate_ns'] + timings['exec_ns'],
+    }
+    stats.update(code_generator.code_stats)
+    stats['code_bytes'] = code_size(code)
+    stats['global_state_bytes'] = deep_size({
+        key: value for key, value in global_state.items() if key != '__builtins__'
+    })
+    return stats
@@ -3,6 +3,8 @@ import re
 
 from .exceptions import JsonSchemaDefinitionException
 from .generator import CodeGenerator, enforce_list, prepare_path
+from .optimizer import TypeFact, type_kinds
+from .regex_analysis import REGEX_GUARD_LENGTH
 
 JSON_TYPE_TO_PYTHON_TYPE = {
     'null': 'NoneType',
@@ -10,8 +12,8 @@ JSON_TYPE_TO_PYTHON_TYPE = {
     'number': 'int, float',
     'integer': 'int',
     'string': 'str',
-    'array': 'collections.abc.Sequence',
-    'object': 'collections.abc.Mapping',
+    'array': 'Sequence',
+    'object': 'Mapping',
 }
 
 DOLLAR_FINDER = re.compile(r"(?<!\\)\$")  # Finds any un-escaped $ (including inside []-sets)
@@ -33,8 +35,8 @@ class CodeGeneratorDraft04(CodeGenerator):
         'uri': r'^\w+:(\/?\/?)[^\s]+\Z',
     }
 
-    def __init__(self, definition, resolver=None, formats={}):
-        super().__init__(definition, resolver)
+    def __init__(self, definition, resolver=None, formats={}, **options):
+        super().__init__(definition, resolver, **options)
         self._custom_formats = formats
         self._json_keywords_to_function.update((
             ('type', self.generate_type),
@@ -83,6 +85,8 @@ class CodeGeneratorDraft04(CodeGenerator):
             python_types = ', '.join(JSON_TYPE_TO_PYTHON_TYPE[t] for t in types)
         except KeyError as exc:
             raise JsonSchemaDefinitionException('Unknown type: {}'.format(exc))
+        if self.shape_has_type(types):
+            return
 
         extra = ''
         if ('number' in types or 'integer' in types) and 'boolean' not in types:
@@ -92,6 +96,7 @@ class CodeGeneratorDraft04(CodeGenerator):
 
         with self.l('if not isinstance({variable}, ({})){}:', python_types, extra):
             self.exc('must be {}, but is a: " + type({variable}).__name__ + "', ' or '.join(types), rule='type')
+        self.add_type_fact(type_kinds(types))
 
     def generate_enum(self):
         """
@@ -143,24 +148,45 @@ class CodeGeneratorDraft04(CodeGenerator):
             }
 
         Valid values for this definition are 3, 4, 5, 10, 11, ... but not 8 for example.
+
+        With a profile, branches are tried in order of their observed matches, but
+        errors are collected in the order of the schema (see :any:`Profile`).
         """
-        self.l('{variable}_any_of_count = 0')
-        self.l('{variable}_errors = []')
-        for definition_item in self._definition['anyOf']:
+        definition_items = self._definition['anyOf']
+        order = list(range(len(definition_items)))
+        if self._profile is not None and not self.has_side_effects(definition_items):
+            order = self._profile.branch_order(self.definition_pointer() + '/anyOf', len(definition_items))
+        matches_index = None
+        if self._instrumentation is not None:
+            matches_index = self._instrumentation.add_branches(self.definition_pointer() + '/anyOf', len(definition_items))
+        reordered = order != sorted(order)
+        prefix = self.enter_nested('anyOf')
+        self.l('{prefix}_any_of_count = 0', prefix=prefix)
+        if reordered:
+            self.l('{prefix}_errors = [None] * {}', len(definition_items), prefix=prefix)
+        else:
+            self.l('{prefix}_errors = []', prefix=prefix)
+        for idx in order:
             # When we know it's passing (at least once), we do not need to do another expensive try-except.
-            with self.l('if not {variable}_any_of_count:', optimize=False):
+            with self.l('if not {prefix}_any_of_count:', optimize=False, prefix=prefix):
+                self.generate_budget_check()
                 with self.l('try:', optimize=False):
-                    self.generate_func_code_block(definition_item, self._variable, self._variable_path, clear_variables=True)
-                    self.l('{variable}_any_of_count += 1')
+                    self.generate_func_code_block(definition_items[idx], self._variable, self._variable_path, clear_variables=True)
+                    self.l('{prefix}_any_of_count += 1', prefix=prefix)
+                    if matches_index is not None:
+                        self.l('INSTRUMENT_MATCHES[{}] += 1', matches_index + idx)
                 with self.l('except JsonSchemaValidationException as exc:'):
-                    self.l('{variable}_errors.append(exc)')
+                    if reordered:
+                        self.l('{prefix}_errors[{}] = exc', idx, prefix=prefix)
+                    else:
+                        self.l('{prefix}_errors.append(exc)', prefix=prefix)
 
-        with self.l('if not {variable}_any_of_count:', optimize=False):
+        with self.l('if not {prefix}_any_of_count:', optimize=False, prefix=prefix):
             self.create_variable_is_dict()
             #with self.l('if special_fields_extractor and {variable}_is_dict:'):
-            name_path = prepare_path(self._variable_path)
-            self.l('raise_best_anyof_error(data, root_object, root_path + ' + name_path + ', {variable}_errors, special_fields_extractor, {definition})', definition=repr(self._definition))
+            self.l('raise_best_anyof_error(data, root_object, root_path + {path}, {prefix}_errors, special_fields_extractor, {definition})', definition=self.definition_constant(), path=prepare_path(self._variable_path), prefix=prefix)
             #self.exc('must be valid by one of anyOf definition. Candidates:\n  -- " + "\n  -- ".join(str(error) for error in {variable}_errors) + "', rule='anyOf')
+        self.leave_nested('anyOf')
 
     def generate_one_of(self):
         """
@@ -178,17 +204,25 @@ class CodeGeneratorDraft04(CodeGenerator):
 
         Valid values for this definition are 3, 5, 6, ... but not 15 for example.
         """
-        self.l('{variable}_one_of_count = 0')
-        for definition_item in self._definition['oneOf']:
+        matches_index = None
+        if self._instrumentation is not None:
+            matches_index = self._instrumentation.add_branches(self.definition_pointer() + '/oneOf', len(self._definition['oneOf']))
+        prefix = self.enter_nested('oneOf')
+        self.l('{prefix}_one_of_count = 0', prefix=prefix)
+        for idx, definition_item in enumerate(self._definition['oneOf']):
             # When we know it's failing (one of means exactly once), we do not need to do another expensive try-except.
-            with self.l('if {variable}_one_of_count < 2:', optimize=False):
+            with self.l('if {prefix}_one_of_count < 2:', optimize=False, prefix=prefix):
+                self.generate_budget_check()
                 with self.l('try:', optimize=False):
                     self.generate_func_code_block(definition_item, self._variable, self._variable_path, clear_variables=True)
-                    self.l('{variable}_one_of_count += 1')
+                    self.l('{prefix}_one_of_count += 1', prefix=prefix)
+                    if matches_index is not None:
+                        self.l('INSTRUMENT_MATCHES[{}] += 1', matches_index + idx)
                 self.l('except JsonSchemaValidationException: pass')
 
-        with self.l('if {variable}_one_of_count != 1:'):
+        with self.l('if {prefix}_one_of_count != 1:', prefix=prefix):
             self.exc('must be valid exactly by one of oneOf definition', rule='oneOf')
+        self.leave_nested('oneOf')
 
     def generate_not(self):
         """
@@ -210,8 +244,9 @@ class CodeGeneratorDraft04(CodeGenerator):
             return
         else:
             with self.l('try:', optimize=False):
-                self.generate_func_code_block(not_definition, self._variable, self._variable_path)
-                if not not_definition:
+                start = len(self._code)
+                self.generate_func_code_block(not_definition, self._variable, self._variable_path, clear_variables=True)
+                if all(isinstance(line, TypeFact) for _, line in self._code[start:]):
                     self.l('pass')  # Adding that in case generate_func_code_block() generated nothing.
             self.l('except JsonSchemaValidationException: pass')
             with self.l('else:'):
@@ -238,8 +273,12 @@ class CodeGeneratorDraft04(CodeGenerator):
             pattern = self._definition['pattern']
             safe_pattern = pattern.replace('\\', '\\\\').replace('"', '\\"')
             end_of_string_fixed_pattern = DOLLAR_FINDER.sub(r'\\Z', pattern)
-            self._compile_regexps[pattern] = re.compile(end_of_string_fixed_pattern)
-            with self.l('if not REGEX_PATTERNS[{}].search({variable}):', repr(pattern)):
+            guard = self.analyze_regex(pattern, 'pattern')
+            self._compile_regexps[pattern] = self.compile_regex(end_of_string_fixed_pattern)
+            regex = self.hoist('REGEX_PATTERNS[{!r}].search'.format(pattern), 'regex')
+            # Guarded risky pattern does not match too long strings at all.
+            condition = 'len({variable}) > {} or not {}({variable})' if guard else 'not {1}({variable})'
+            with self.l('if ' + condition + ':', REGEX_GUARD_LENGTH, regex):
                 self.exc('\\"" + {variable} + "\\" does not match pattern \\"{}\\"', safe_pattern, rule='pattern')
 
     def generate_format(self):
@@ -258,7 +297,8 @@ class CodeGeneratorDraft04(CodeGenerator):
             if format_ in self._custom_formats:
                 custom_format = self._custom_formats[format_]
                 if isinstance(custom_format, str):
-                    self._generate_format(format_, format_ + '_re_pattern', custom_format)
+                    guard = self.analyze_regex(custom_format, 'format')
+                    self._generate_format(format_, format_ + '_re_pattern', custom_format, guard)
                 else:
                     with self.l('if not custom_formats["{}"]({variable}):', format_):
                         self.exc('must be {}', format_, rule='format')
@@ -275,11 +315,13 @@ class CodeGeneratorDraft04(CodeGenerator):
                 raise JsonSchemaDefinitionException('Unknown format: {}'.format(format_))
 
 
-    def _generate_format(self, format_name, regexp_name, regexp):
+    def _generate_format(self, format_name, regexp_name, regexp, guard=False):
         if self._definition['format'] == format_name:
             if not regexp_name in self._compile_regexps:
-                self._compile_regexps[regexp_name] = re.compile(regexp)
-            with self.l('if not REGEX_PATTERNS["{}"].match({variable}):', regexp_name):
+                self._compile_regexps[regexp_name] = self.compile_regex(regexp)
+            regex = self.hoist('REGEX_PATTERNS[{!r}].match'.format(regexp_name), 'regex')
+            condition = 'len({variable}) > {} or not {}({variable})' if guard else 'not {1}({variable})'
+            with self.l('if ' + condition + ':', REGEX_GUARD_LENGTH, regex):
                 self.exc('must be {}', format_name, rule='format')
 
     def generate_minimum(self):
@@ -404,6 +446,7 @@ class CodeGeneratorDraft04(CodeGenerator):
                             self.exc('must contain only specified items', rule='items')
                     else:
                         with self.l('for {variable}_x, {variable}_item in enumerate({variable}[{0}:], {0}):', len(items_definition)):
+                            self.generate_budget_check()
                             self.generate_func_code_block(
                                 self._definition['additionalItems'],
                                 '{}_item'.format(self._variable),
@@ -412,10 +455,12 @@ class CodeGeneratorDraft04(CodeGenerator):
             else:
                 if items_definition:
                     with self.l('for {variable}_x, {variable}_item in enumerate({variable}):'):
+                        self.generate_budget_check()
                         self.generate_func_code_block(
                             items_definition,
                             '{}_item'.format(self._variable),
                             self._variable_path + [self._variable + '_x'],
+                            shape=self._shape.items if self._shape is not None else None,
                         )
 
     def generate_min_properties(self):
@@ -437,6 +482,9 @@ class CodeGeneratorDraft04(CodeGenerator):
                 self.exc('must contain less than or equal to {maxProperties} properties', rule='maxProperties')
 
     def generate_required_and_additional(self):
+        # Keys of value with known shape always pass.
+        if self.properties_shape() is not None:
+            return
         if not self.can_emit_required_and_additional():
             return
         self.l('{variable}_ra_missing = []')
@@ -449,7 +497,7 @@ class CodeGeneratorDraft04(CodeGenerator):
         if 'additionalProperties' in self._definition:
             with self.l('try:'):
                 self._generate_additional_properties()
-            with self.l('except Exception as exc:'):
+            with self.l('except JsonSchemaValidationException as exc:'):
                 with self.l('if exc.rule != \'additionalProperties\':'):
                     self.l('raise')
                 self.l('{variable}_ra_extra.extend(exc.extra_fields)')
@@ -478,14 +526,30 @@ class CodeGeneratorDraft04(CodeGenerator):
             }
 
         Valid object is containing key called 'key' and value any number.
+
+        When keys of the object are known (see :any:`Shape`), present properties
+        are validated directly and missing ones are not probed at all.
         """
+        shape = self.properties_shape()
         self.create_variable_is_dict()
         with self.l('if {variable}_is_dict:'):
-            self.create_variable_keys()
+            if shape is None:
+                self.create_variable_keys()
             for key, prop_definition in self._definition['properties'].items():
                 key_name = re.sub(r'($[^a-zA-Z]|[^a-zA-Z0-9])', '', key)
                 if not isinstance(prop_definition, (dict, bool)):
                     raise JsonSchemaDefinitionException('{}[{}] must be object'.format(self._variable, key_name))
+                if shape is not None:
+                    if key in shape.keys:
+                        self.l('{variable}__{0} = {variable}["{1}"]', key_name, self.e(key))
+                        self.generate_func_code_block(
+                            prop_definition,
+                            '{}__{}'.format(self._variable, key_name),
+                            self._variable_path + ['"{}"'.format(self.e(key))],
+                            clear_variables=True,
+                            shape=shape.properties.get(key),
+                        )
+                    continue
                 with self.l('if "{}" in {variable}_keys:', self.e(key)):
                     self.l('{variable}_keys.remove("{}")', self.e(key))
                     self.l('{variable}__{0} = {variable}["{1}"]', key_name, self.e(key))
@@ -515,11 +579,16 @@ class CodeGeneratorDraft04(CodeGenerator):
         self.create_variable_is_dict()
         with self.l('if {variable}_is_dict:'):
             self.create_variable_keys()
+            guards = {}
             for pattern, definition in self._definition['patternProperties'].items():
-                self._compile_regexps[pattern] = re.compile(pattern)
+                guards[pattern] = self.analyze_regex(pattern, 'patternProperties')
+                self._compile_regexps[pattern] = self.compile_regex(pattern)
             with self.l('for {variable}_key, {variable}_val in {variable}.items():'):
+                self.generate_budget_check()
                 for pattern, definition in self._definition['patternProperties'].items():
-                    with self.l('if REGEX_PATTERNS[{}].search({variable}_key):', repr(pattern)):
+                    regex = self.hoist('REGEX_PATTERNS[{!r}].search'.format(pattern), 'regex')
+                    condition = 'len({variable}_key) <= {} and {}({variable}_key)' if guards[pattern] else '{1}({variable}_key)'
+                    with self.l('if ' + condition + ':', REGEX_GUARD_LENGTH, regex):
                         with self.l('if {variable}_key in {variable}_keys:'):
                             self.l('{variable}_keys.remove({variable}_key)')
                         self.generate_func_code_block(
@@ -555,6 +624,7 @@ class CodeGeneratorDraft04(CodeGenerator):
             elif add_prop_definition:
                 properties_keys = list(self._definition.get("properties", {}).keys())
                 with self.l('for {variable}_key in {variable}_keys:'):
+                    self.generate_budget_check()
                     with self.l('if {variable}_key not in {}:', properties_keys):
                         self.l('{variable}_value = {variable}.get({variable}_key)')
                         self.generate_func_code_block(
@@ -1,6 +1,7 @@
 from .draft04 import CodeGeneratorDraft04, JSON_TYPE_TO_PYTHON_TYPE
 from .exceptions import JsonSchemaDefinitionException
 from .generator import enforce_list
+from .optimizer import type_kinds
 
 
 class CodeGeneratorDraft06(CodeGeneratorDraft04):
@@ -15,8 +16,8 @@ class CodeGeneratorDraft06(CodeGeneratorDraft04):
         ),
     })
 
-    def __init__(self, definition, resolver=None, formats={}):
-        super().__init__(definition, resolver, formats)
+    def __init__(self, definition, resolver=None, formats={}, **options):
+        super().__init__(definition, resolver, formats, **options)
         self._json_keywords_to_function.update((
             ('exclusiveMinimum', self.generate_exclusive_minimum),
             ('exclusiveMaximum', self.generate_exclusive_maximum),
@@ -30,7 +31,7 @@ class CodeGeneratorDraft06(CodeGeneratorDraft04):
             self.generate_boolean_schema()
         elif '$ref' in definition:
             # needed because ref overrides any sibling keywords
-            self.generate_ref()
+            self.generate_keyword('$ref', self.generate_ref)
         else:
             self.run_generate_functions(definition)
 
@@ -58,6 +59,8 @@ class CodeGeneratorDraft06(CodeGeneratorDraft04):
             python_types = ', '.join(JSON_TYPE_TO_PYTHON_TYPE[t] for t in types)
         except KeyError as exc:
             raise JsonSchemaDefinitionException('Unknown type: {}'.format(exc))
+        if self.shape_has_type(types):
+            return
 
         extra = ''
 
@@ -73,6 +76,7 @@ class CodeGeneratorDraft06(CodeGeneratorDraft04):
 
         with self.l('if not isinstance({variable}, ({})){}:', python_types, extra):
             self.exc('must be {}, but is a: " + type({variable}).__name__ + "', ' or '.join(types), rule='type')
+        self.add_type_fact(type_kinds(types))
 
     def generate_exclusive_minimum(self):
         with self.l('if isinstance({variable}, (int, float)):'):
@@ -116,6 +120,7 @@ class CodeGeneratorDraft06(CodeGeneratorDraft04):
                 with self.l('if {variable}_len != 0:'):
                     self.l('{variable}_property_names = True')
                     with self.l('for {variable}_key in {variable}:'):
+                        self.generate_budget_check()
                         with self.l('try:'):
                             self.generate_func_code_block(
                                 property_names_definition,
@@ -154,6 +159,7 @@ class CodeGeneratorDraft06(CodeGeneratorDraft04):
             else:
                 self.l('{variable}_contains = False')
                 with self.l('for {variable}_key in {variable}:'):
+                    self.generate_budget_check()
                     with self.l('try:'):
                         self.generate_func_code_block(
                             contains_definition,
@@ -15,6 +15,20 @@ class JsonSchemaDefinitionException(JsonSchemaException):
     pass
 
 
+class JsonSchemaBudgetExceeded(JsonSchemaException):
+    """
+    Exception raised by validation function compiled with ``budget_ns`` when
+    validation takes longer. Property ``path`` is where the data was being
+    validated at that moment. It is not :any:`JsonSchemaValidationException`,
+    so no branch of ``anyOf`` or ``oneOf`` catches it.
+    """
+
+    def __init__(self, message, path=None):
+        super().__init__(message)
+        self.message = message
+        self.path = path
+
+
 class JsonSchemaValidationException(JsonSchemaException):
     """
     Exception raised by validation function. Available properties:
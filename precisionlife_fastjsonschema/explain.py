@@ -0,0 +1,324 @@
+"""
+Cost model of schemas and report of constructs known to be slow.
+
+:any:`explain` walks the schema the same way as the code generator does
+(keywords in the same order, ``$ref`` overrides its siblings) and estimates
+cost of validation of every subschema in abstract units (one unit is roughly
+one simple check such as ``type`` or ``minimum``). Validated data are not
+known, so every array is expected to have ``ASSUMED_ITEMS`` items and every
+object ``ASSUMED_PROPERTIES`` properties.
+
+It also reports constructs known to be slow in this implementation:
+
+ * ``anyOf`` and ``oneOf`` with many branches without discriminator (every
+   failing branch is validated until it raises an exception),
+ * ``uniqueItems`` of arrays of objects or arrays (every item is converted by ``str``),
+ * patterns without anchor (searched through the whole string) or prone to
+   catastrophic backtracking (see :any:`analyze_regex`),
+ * large ``enum`` (searched item by item),
+ * ``patternProperties`` with many patterns (every key is matched by every pattern).
+
+Report is a dictionary with total ``cost``, ``warnings`` and ``nodes``
+(subschemas), both ranked from the most expensive one, and it can be printed
+by :any:`format_report` (or by ``python -m precisionlife_fastjsonschema explain schema.json``).
+"""
+
+from .ref_resolver import escape_pointer_part
+from .regex_analysis import analyze_regex
+
+
+ASSUMED_ITEMS = 10
+ASSUMED_PROPERTIES = 10
+
+# Costs in units of one simple check.
+CHECK_COST = 1
+CALL_COST = 2
+REGEX_COST = 5
+# Catastrophic backtracking can take much more, it depends on the validated string.
+BACKTRACKING_COST = 100
+EXCEPTION_COST = 20
+# Unique items are compared by their string representation.
+STR_COST = 2
+STR_CONTAINER_COST = 20
+
+MANY_BRANCHES = 4
+LARGE_ENUM = 50
+MANY_PATTERNS = 5
+
+
+def pattern_cost(pattern):
+    """
+    Returns cost of search by regular expression ``pattern`` and list of reasons why it can be slow.
+    """
+    cost, problems = REGEX_COST, []
+    if not pattern.startswith('^'):
+        cost += REGEX_COST
+        problems.append('is not anchored by ^, so it is searched through the whole string')
+    risks = analyze_regex(pattern)
+    if risks:
+        cost += BACKTRACKING_COST
+        problems.extend(risks)
+    return cost, problems
+
+
+class Explainer:
+    """
+    Estimates costs of subschemas of schema of ``resolver`` supported by the code
+    generator with ``keywords`` (in order of generated checks).
+    """
+
+    def __init__(self, resolver, keywords):
+        self._resolver = resolver
+        self._keywords = keywords
+        self._nodes = []
+        self._warnings = []
+        # Stack of summed costs of children of subschemas being explained.
+        self._children_costs = []
+        # Costs of already explained targets of references (``None`` while being explained).
+        self._ref_costs = {}
+        self._keyword_costs = {
+            'allOf': self._all_of_cost,
+            'anyOf': self._any_of_cost,
+            'oneOf': self._one_of_cost,
+            'not': self._not_cost,
+            'enum': self._enum_cost,
+            'pattern': self._pattern_cost,
+            'format': lambda definition, pointer: REGEX_COST,
+            'uniqueItems': self._unique_items_cost,
+            'items': self._items_cost,
+            'additionalItems': self._additional_items_cost,
+            'contains': self._contains_cost,
+            'properties': self._properties_cost,
+            'patternProperties': self._pattern_properties_cost,
+            'additionalProperties': self._additional_properties_cost,
+            'propertyNames': self._property_names_cost,
+            'dependencies': self._dependencies_cost,
+            'if': self._if_cost,
+        }
+
+    def explain(self):
+        """
+        Returns the report of the whole schema.
+        """
+        uri = self._resolver.get_uri()
+        self._ref_costs[uri] = None
+        cost = self._ref_costs[uri] = self._node_cost(self._resolver.schema, uri if '#' in uri else uri + '#')
+        return {
+            'cost': cost,
+            'warnings': sorted(self._warnings, key=lambda warning: -warning['cost']),
+            'nodes': sorted(self._nodes, key=lambda node: -node['own_cost']),
+        }
+
+    def _warn(self, pointer, keyword, cost, message):
+        self._warnings.append({
+            'pointer': '{}/{}'.format(pointer, escape_pointer_part(keyword)),
+            'keyword': keyword,
+            'cost': cost,
+            'message': message,
+        })
+
+    def _node_cost(self, definition, pointer):
+        if not isinstance(definition, dict):
+            return CHECK_COST if definition is False else 0
+        if '$ref' in definition:
+            return self._ref_cost(definition['$ref'])
+        self._children_costs.append(0)
+        cost = 0
+        for keyword in self._keywords:
+            if keyword in definition:
+                keyword_cost = self._keyword_costs.get(keyword)
+                cost += CHECK_COST if keyword_cost is None else keyword_cost(definition, pointer)
+        own_cost = cost - self._children_costs.pop()
+        self._nodes.append({'pointer': pointer, 'cost': cost, 'own_cost': own_cost})
+        return cost
+
+    def _child_cost(self, definition, pointer, *parts, times=1):
+        """
+        Returns cost of subschema validated ``times`` (per validation of its parent).
+        """
+        child_pointer = pointer + ''.join('/' + escape_pointer_part(part) for part in parts)
+        cost = round(times * self._node_cost(definition, child_pointer))
+        self._children_costs[-1] += cost
+        return cost
+
+    def _ref_cost(self, ref):
+        with self._resolver.in_scope(ref):
+            uri = self._resolver.get_uri()
+        if uri not in self._ref_costs:
+            self._ref_costs[uri] = None
+            with self._resolver.resolving(ref) as definition:
+                self._ref_costs[uri] = self._node_cost(definition, uri if '#' in uri else uri + '#')
+        # Recursive reference costs only the call, its target is already counted.
+        return CALL_COST + (self._ref_costs[uri] or 0)
+
+    def _all_of_cost(self, definition, pointer):
+        return sum(self._child_cost(item, pointer, 'allOf', idx) for idx, item in enumerate(definition['allOf']))
+
+    def _branches_cost(self, definition, pointer, keyword):
+        """
+        Returns cost of branches of ``anyOf`` or ``oneOf``. With discriminator only
+        the matching one is validated, the other ones fail on the first check.
+        Without it on average half of branches (``anyOf``) or all of them
+        (``oneOf``) are validated.
+        """
+        branches = definition[keyword]
+        discriminated = self._is_discriminated(branches)
+        costs = [self._node_cost(item, '{}/{}/{}'.format(pointer, keyword, idx)) for idx, item in enumerate(branches)]
+        if not costs:
+            return 0, discriminated
+        if discriminated:
+            cost = max(costs) + len(costs) * CHECK_COST
+        else:
+            cost = sum(costs) // 2 if keyword == 'anyOf' else sum(costs)
+        self._children_costs[-1] += cost
+        return cost, discriminated
+
+    def _any_of_cost(self, definition, pointer):
+        branches = len(definition['anyOf'])
+        cost, discriminated = self._branches_cost(definition, pointer, 'anyOf')
+        cost += EXCEPTION_COST * max(branches - 1, 0) // 2
+        if branches >= MANY_BRANCHES and not discriminated:
+            self._warn(pointer, 'anyOf', cost, 'anyOf with {} branches without discriminator, every failing branch raises an exception'.format(branches))
+        return cost
+
+    def _one_of_cost(self, definition, pointer):
+        branches = len(definition['oneOf'])
+        cost, discriminated = self._branches_cost(definition, pointer, 'oneOf')
+        cost += EXCEPTION_COST * max(branches - 1, 0)
+        if branches >= MANY_BRANCHES and not discriminated:
+            self._warn(pointer, 'oneOf', cost, 'oneOf with {} branches without discriminator, all branches are always validated'.format(branches))
+        return cost
+
+    def _is_discriminated(self, branches):
+        """
+        Branches are discriminated when all of them require different ``type`` or
+        the same property with ``const`` or ``enum``, so wrong ones fail on the first check.
+        """
+        branches = [self._resolve(branch) for branch in branches]
+        if not all(isinstance(branch, dict) for branch in branches):
+            return False
+        types = [branch.get('type') for branch in branches]
+        if all(isinstance(type_, str) for type_ in types) and len(set(types)) == len(types):
+            return True
+        discriminators = None
+        for branch in branches:
+            properties = branch.get('properties')
+            if not isinstance(properties, dict):
+                return False
+            keys = {
+                key for key, value in properties.items()
+                if isinstance(value, dict) and ('const' in value or 'enum' in value)
+            }
+            discriminators = keys if discriminators is None else discriminators & keys
+        return bool(discriminators)
+
+    def _resolve(self, definition):
+        if isinstance(definition, dict) and '$ref' in definition:
+            with self._resolver.resolving(definition['$ref']) as resolved:
+                return resolved
+        return definition
+
+    def _not_cost(self, definition, pointer):
+        # Valid value has to fail the subschema.
+        return self._child_cost(definition['not'], pointer, 'not') + EXCEPTION_COST
+
+    def _enum_cost(self, definition, pointer):
+        enum = definition['enum']
+        cost = CHECK_COST + len(enum) // 10 if isinstance(enum, list) else CHECK_COST
+        if isinstance(enum, list) and len(enum) >= LARGE_ENUM:
+            self._warn(pointer, 'enum', cost, 'enum with {} values is searched value by value'.format(len(enum)))
+        return cost
+
+    def _pattern_cost(self, definition, pointer):
+        pattern = definition['pattern']
+        cost, problems = pattern_cost(pattern) if isinstance(pattern, str) else (REGEX_COST, [])
+        if problems:
+            self._warn(pointer, 'pattern', cost, 'pattern {!r} {}'.format(pattern, ' and '.join(problems)))
+        return cost
+
+    def _unique_items_cost(self, definition, pointer):
+        if not definition['uniqueItems']:
+            return 0
+        items = self._resolve(definition.get('items'))
+        if isinstance(items, dict) and (
+            items.get('type') in ('object', 'array')
+            or any(key in items for key in ('properties', 'items', 'required', 'additionalProperties'))
+        ):
+            cost = ASSUMED_ITEMS * STR_CONTAINER_COST
+            self._warn(pointer, 'uniqueItems', cost, 'uniqueItems of array of objects or arrays converts every item by str()')
+            return cost
+        return ASSUMED_ITEMS * STR_COST
+
+    def _items_cost(self, definition, pointer):
+        items = definition['items']
+        if isinstance(items, list):
+            return sum(self._child_cost(item, pointer, 'items', idx) for idx, item in enumerate(items))
+        return self._child_cost(items, pointer, 'items', times=ASSUMED_ITEMS)
+
+    def _additional_items_cost(self, definition, pointer):
+        if not isinstance(definition.get('items'), list):
+            return 0
+        return CHECK_COST + self._child_cost(definition['additionalItems'], pointer, 'additionalItems')
+
+    def _contains_cost(self, definition, pointer):
+        # Items are validated until the first valid one, the other ones raise exceptions.
+        item_cost = self._child_cost(definition['contains'], pointer, 'contains', times=ASSUMED_ITEMS / 2)
+        return item_cost + ASSUMED_ITEMS * EXCEPTION_COST // 2
+
+    def _properties_cost(self, definition, pointer):
+        return sum(
+            CHECK_COST + self._child_cost(item, pointer, 'properties', key)
+            for key, item in definition['properties'].items()
+        )
+
+    def _pattern_properties_cost(self, definition, pointer):
+        pattern_properties = definition['patternProperties']
+        cost = 0
+        for pattern, item in pattern_properties.items():
+            cost += self._child_cost(item, pointer, 'patternProperties', pattern)
+            # Property names are usually short, only backtracking matters there.
+            risks = analyze_regex(pattern)
+            if risks:
+                search_cost = ASSUMED_PROPERTIES * (REGEX_COST + BACKTRACKING_COST)
+                self._warn(pointer, 'patternProperties', search_cost, 'pattern {!r} {}'.format(pattern, ' and '.join(risks)))
+            else:
+                search_cost = ASSUMED_PROPERTIES * REGEX_COST
+            cost += search_cost
+        if len(pattern_properties) >= MANY_PATTERNS:
+            self._warn(pointer, 'patternProperties', cost, 'patternProperties with {} patterns matches every key by every pattern'.format(len(pattern_properties)))
+        return cost
+
+    def _additional_properties_cost(self, definition, pointer):
+        return CHECK_COST + self._child_cost(definition['additionalProperties'], pointer, 'additionalProperties')
+
+    def _property_names_cost(self, definition, pointer):
+        return self._child_cost(definition['propertyNames'], pointer, 'propertyNames', times=ASSUMED_PROPERTIES)
+
+    def _dependencies_cost(self, definition, pointer):
+        return sum(
+            CHECK_COST + (self._child_cost(item, pointer, 'dependencies', key) if isinstance(item, dict) else 0)
+            for key, item in definition['dependencies'].items()
+        )
+
+    def _if_cost(self, definition, pointer):
+        cost = self._child_cost(definition['if'], pointer, 'if')
+        branches = [self._child_cost(definition[key], pointer, key) for key in ('then', 'else') if key in definition]
+        # Failing condition raises an exception.
+        return cost + EXCEPTION_COST // 2 + max(branches, default=0)
+
+
+def format_report(report, limit=20):
+    """
+    Returns the report of :any:`explain` as text with at most ``limit`` most expensive subschemas.
+    """
+    lines = ['Estimated cost: {} units'.format(report['cost']), '']
+    if report['warnings']:
+        lines.append('Slow constructs:')
+        for warning in report['warnings']:
+            lines.append('  {:>8}  {}  {}'.format(warning['cost'], warning['pointer'], warning['message']))
+    else:
+        lines.append('No slow constructs found.')
+    lines += ['', 'Most expensive subschemas:', '  {:>8}  {:>8}  {}'.format('cost', 'own cost', 'pointer')]
+    for node in report['nodes'][:limit]:
+        lines.append('  {:>8}  {:>8}  {}'.format(node['cost'], node['own_cost'], node['pointer']))
+    return '\n'.join(lines)
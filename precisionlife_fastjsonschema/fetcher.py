@@ -0,0 +1,217 @@
+"""
+HTTP(S) handler for fetching remote schemas referenced by ``$ref``.
+
+Default resolution of remote references (see ``resolve_remote``) uses plain ``urlopen``
+without any timeout or caching. ``HttpFetcher`` can be passed in ``handlers`` instead:
+
+.. code-block:: python
+
+    fetcher = HttpFetcher(cache_dir='/var/cache/schemas', ttl=3600, timeout=5)
+    validate = fastjsonschema.compile(definition, handlers={'http': fetcher, 'https': fetcher})
+"""
+
+import hashlib
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+from urllib import parse as urlparse
+
+from .exceptions import JsonSchemaDefinitionException
+
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 5
+
+
+class HttpFetcherError(Exception):
+    """
+    Raised internally when the remote server could not give us a usable response.
+    """
+
+
+class HttpFetcher:
+    """
+    Callable handler retrieving remote schemas over HTTP(S).
+
+     * connections are kept alive and reused per host,
+     * responses are cached (in memory and optionally on the disk in ``cache_dir``),
+     * cached response is used without any request for ``ttl`` seconds,
+     * after that it is revalidated by ``If-None-Match`` / ``If-Modified-Since`` request,
+     * when the server is not available, stale response is used for ``stale_if_error`` more seconds,
+     * every request is limited by ``timeout`` seconds.
+
+    Instance is thread-safe and can be shared by many compilations.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, cache_dir=None, ttl=3600, stale_if_error=86400, timeout=10, headers=None):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.stale_if_error = stale_if_error
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self.headers.setdefault('Accept', 'application/schema+json, application/json')
+
+        self._memory_cache = {}
+        self._cache_lock = threading.Lock()
+        # Idle connections per (scheme, host, port).
+        self._connections = {}
+        self._connections_lock = threading.Lock()
+
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __call__(self, uri):
+        entry = self._load_entry(uri)
+        now = time.time()
+        if entry is not None and now - entry['fetched_at'] < self.ttl:
+            return entry['schema']
+
+        try:
+            entry = self._fetch(uri, entry)
+        except HttpFetcherError as exc:
+            if entry is not None and now - entry['fetched_at'] < self.ttl + self.stale_if_error:
+                return entry['schema']
+            raise JsonSchemaDefinitionException('{} failed to fetch: {}'.format(uri, exc))
+        self._store_entry(uri, entry)
+        return entry['schema']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Close all kept-alive connections.
+        """
+        with self._connections_lock:
+            connections, self._connections = self._connections, {}
+        for idle_connections in connections.values():
+            for connection in idle_connections:
+                connection.close()
+
+    def _fetch(self, uri, entry):
+        headers = dict(self.headers)
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        url = urlparse.urldefrag(uri)[0]
+        for _ in range(MAX_REDIRECTS + 1):
+            status, response_headers, body = self._request(url, headers)
+            if status in REDIRECT_STATUSES and response_headers.get('location'):
+                url = urlparse.urljoin(url, response_headers['location'])
+                continue
+            break
+        else:
+            raise HttpFetcherError('too many redirects')
+
+        if status == 304 and entry is not None:
+            return dict(entry, fetched_at=time.time())
+        if status != 200:
+            raise HttpFetcherError('unexpected HTTP status {}'.format(status))
+
+        encoding = response_headers.get_content_charset() or 'utf-8'
+        try:
+            schema = json.loads(body.decode(encoding))
+        except ValueError as exc:
+            raise JsonSchemaDefinitionException('{} failed to decode: {}'.format(uri, exc))
+        return {
+            'uri': uri,
+            'etag': response_headers.get('etag'),
+            'last_modified': response_headers.get('last-modified'),
+            'fetched_at': time.time(),
+            'schema': schema,
+        }
+
+    def _request(self, url, headers):
+        parts = urlparse.urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise HttpFetcherError('unsupported scheme {}'.format(parts.scheme))
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = urlparse.urlunsplit(('', '', parts.path or '/', parts.query, ''))
+
+        connection, reused = self._acquire_connection(key)
+        try:
+            try:
+                response = self._send(connection, path, headers)
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                if not reused:
+                    raise
+                # Server could close kept-alive connection in the meantime, try once more with new one.
+                connection, reused = self._new_connection(key), False
+                response = self._send(connection, path, headers)
+            body = response.read()
+        except (OSError, http.client.HTTPException) as exc:
+            connection.close()
+            raise HttpFetcherError(str(exc) or type(exc).__name__)
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release_connection(key, connection)
+        return response.status, response.headers, body
+
+    @staticmethod
+    def _send(connection, path, headers):
+        connection.request('GET', path, headers=headers)
+        return connection.getresponse()
+
+    def _acquire_connection(self, key):
+        with self._connections_lock:
+            idle_connections = self._connections.get(key)
+            if idle_connections:
+                return idle_connections.pop(), True
+        return self._new_connection(key), False
+
+    def _release_connection(self, key, connection):
+        with self._connections_lock:
+            self._connections.setdefault(key, []).append(connection)
+
+    def _new_connection(self, key):
+        scheme, host, port = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _cache_path(self, uri):
+        return os.path.join(self.cache_dir, hashlib.sha256(uri.encode('utf-8')).hexdigest() + '.json')
+
+    def _load_entry(self, uri):
+        with self._cache_lock:
+            entry = self._memory_cache.get(uri)
+        if entry is not None or self.cache_dir is None:
+            return entry
+        try:
+            with open(self._cache_path(uri), encoding='utf-8') as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if entry.get('uri') != uri:
+            return None
+        with self._cache_lock:
+            self._memory_cache[uri] = entry
+        return entry
+
+    def _store_entry(self, uri, entry):
+        with self._cache_lock:
+            self._memory_cache[uri] = entry
+        if self.cache_dir is None:
+            return
+        # Write to temporary file first so concurrent processes never see partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as cache_file:
+                json.dump(entry, cache_file)
+            os.replace(tmp_path, self._cache_path(uri))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
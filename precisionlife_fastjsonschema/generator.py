@@ -1,11 +1,22 @@
+import builtins
 import collections
 from collections import OrderedDict
+import functools
 import re
 import inspect
+import string
+import sys
+import threading
+import time
 
-from .exceptions import JsonSchemaValidationException, JsonSchemaDefinitionException
+from .adaptive import SpecializationMiss
+from .exceptions import JsonSchemaBudgetExceeded, JsonSchemaValidationException, JsonSchemaDefinitionException
 from .indent import indent
-from .ref_resolver import RefResolver
+from .instrumentation import Instrumentation
+from .optimizer import TypeFact, optimize
+from .ref_resolver import RefResolver, normalize
+from .regex_analysis import check_regex
+from .source_map import SourceLine, SourceMap, code_filename
 
 
 def enforce_list(variable):
@@ -14,6 +25,19 @@ def enforce_list(variable):
     return [variable]
 
 
+@functools.lru_cache(maxsize=4096)
+def template_fields(template):
+    """
+    Returns names of keyword fields used in ``template`` of :any:`CodeGenerator.l`,
+    so only those have to be looked up instead of copying whole definition for every line.
+    """
+    return tuple({
+        field_name.split('.', 1)[0].split('[', 1)[0]
+        for _, field_name, _, _ in string.Formatter().parse(template)
+        if field_name and not field_name[0].isdigit()
+    })
+
+
 def prepare_path(path):
     """
     Returns path as a string that can be evaluated.
@@ -139,6 +163,62 @@ def raise_best_anyof_error(data, root_object, root_path, errors, special_fields_
     raise best_error
 
 
+# JSON types of values of kinds of exact shapes, see `shape_has_type`. Float is not
+# known to be an integer.
+SHAPE_KIND_TO_JSON_TYPES = {
+    'null': {'null'},
+    'bool': {'boolean'},
+    'int': {'integer', 'number'},
+    'float': {'number'},
+    'str': {'string'},
+    'list': {'array'},
+    'dict': {'object'},
+}
+
+
+# Default maximum depth of the stack of iterative validation in multiples of the recursion limit.
+ITERATIVE_DEPTH_FACTOR = 100
+
+
+def run_iterative(generator, max_depth):
+    """
+    Runs validation function generated in the iterative mode. Instead of calling
+    other validation functions (and going deeper in Python stack), such functions
+    yield generators of those calls, which are run here on the explicit stack.
+    Return values and exceptions are passed back the same way as with calls.
+    Stack deeper than ``max_depth`` (such as by ``$ref`` cycle) raises ``RecursionError``.
+    """
+    stack = [generator]
+    value, error = None, None
+    while True:
+        try:
+            call = stack[-1].send(value) if error is None else stack[-1].throw(error)
+        except StopIteration as stop:
+            stack.pop()
+            value, error = stop.value, None
+            if not stack:
+                return value
+        except Exception as exc:  # pylint: disable=broad-except
+            stack.pop()
+            if not stack:
+                raise
+            value, error = None, exc
+        else:
+            if len(stack) >= max_depth:
+                raise RecursionError('maximum depth of iterative validation exceeded')
+            stack.append(call)
+            value, error = None, None
+
+
+class ValidationBudget(threading.local):
+    """
+    Deadline (by ``time.perf_counter_ns``) of validation running in the current
+    thread by validator compiled with ``budget_ns``, zero when none is running.
+    """
+
+    deadline = 0
+
+
 common_functions_lines = [
     *inspect.getsourcelines(is_any_field_error)[0],
     '',
@@ -150,6 +230,9 @@ common_functions_lines = [
     '',
     '',
     *inspect.getsourcelines(raise_best_anyof_error)[0],
+    '',
+    '',
+    *inspect.getsourcelines(run_iterative)[0],
 ]
 
 
@@ -168,10 +251,78 @@ class CodeGenerator:
     """
 
     INDENT = 4  # spaces
-
-    def __init__(self, definition, resolver=None):
+    # Minimal number of keywords (including nested ones) of subschema to be shared
+    # by its structurally equal occurrences, smaller ones are cheaper inlined.
+    DEDUPLICATE_MIN_SIZE = 5
+    # Subschemas with more keywords (not counting already outlined ones) and subschemas
+    # nested deeper than given indentation are generated as separate functions. Python
+    # compiles huge functions slowly and limits nesting of blocks.
+    OUTLINE_MIN_SIZE = 500
+    OUTLINE_INDENT = 30
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self, definition, resolver=None, optimize=True, deduplicate=True, function_pool=None, lazy=False, inline_refs=4,
+        iterative=False, instrument=False, source_map=False, profile=None, shape=None, budget_ns=None,
+        regex_policy=None,
+    ):
+        # Pairs of indentation level and line of code (or `TypeFact` for the optimizer).
         self._code = []
+        self._optimize = optimize
+        self._func_code = None
         self._compile_regexps = {}
+        self._regex_compile_ns = 0
+        # What to do with regular expressions prone to catastrophic backtracking and
+        # those found, see `analyze_regex`.
+        self._regex_policy = regex_policy
+        self._regex_risks = []
+        # Global variables assigned once after all functions are defined (expression to name),
+        # so functions do not have to look them up on every call.
+        self._hoisted = OrderedDict()
+        # Definitions referenced by generated code (in errors) are stored only once
+        # in the table of constants, see `definition_constant`.
+        self._definitions = []
+        self._definitions_indexes = {}
+        # Counters of instrumented validator, see `generate_instrumented_keyword`.
+        self._instrumentation = Instrumentation(timing=instrument == 'timing') if instrument else None
+        # Subschemas generated as separate functions, see `generate_subschema_function_call`.
+        # Shared functions of instrumented validator would mix counters of different subschemas.
+        self._deduplicate = deduplicate and not instrument
+        # Optional `Profile` used to reorder checks and branches, see `run_generate_functions`.
+        self._profile = profile
+        # Optional `Shape` of validated data which the code is specialized for and shape
+        # of the current value, see `generate_shape_guard`.
+        self._root_shape = shape
+        self._shape = None
+        self._root_referenced = False
+        # Id of subschema to its structural key, size and whether it should be outlined.
+        self._subschema_stats = {}
+        # Structural key to number of occurrences.
+        self._subschema_counts = collections.Counter()
+        # Ids of already counted documents.
+        self._counted_documents = set()
+        # Id of subschema to its URI with JSON pointer, see `definition_pointer`.
+        self._definition_pointers = {}
+        # With source map every line knows which JSON pointer and keyword generated it,
+        # see `SourceLine` and `compile_code`.
+        self._source_map = source_map
+        self._source = None
+        self._func_sources = [] if source_map else None
+        self._source_maps = []
+        # Pair of resolution scope and structural key to name of subschema function.
+        self._subschema_functions = {}
+        # Subschema functions that are not yet generated, name to pair of scope and definition.
+        self._needed_subschema_functions = OrderedDict()
+        self._subschema_function_definition = None
+        # Maximal number of keywords of ``$ref`` target to be inlined instead of called.
+        self._inline_refs = inline_refs
+        # URIs of function being generated and of references being inlined into it.
+        self._function_uri = None
+        self._inlined_refs = []
+        # Optional `FunctionPool` shared by many validators and functions from it by name.
+        # Functions of budgeted validator check its own deadline.
+        self._function_pool = None if instrument or budget_ns is not None else function_pool
+        self._pooled_functions = {}
 
         # Any extra library should be here to be imported only once.
         # Lines are imports to be printed in the file and objects
@@ -179,9 +330,14 @@ class CodeGenerator:
         self._extra_imports_lines = []
         self._extra_imports_objects = {}
 
-        self._variables = set()
+        # Names of created local variables with blocks (see `Indent`) they are created in.
+        self._variables = {}
         self._indent = 0
         self._indent_last_line = None
+        self._blocks = ()
+        self._blocks_count = 0
+        self._last_block = None
+        self._nesting = {}
         # Name of the variable in generated code, that holds object that is being validated.
         self._variable = None
         # Path to this object (list of field names and array indices that were traversed to reach it).
@@ -202,7 +358,31 @@ class CodeGenerator:
         self._resolver = resolver
 
         # add main function to `self._needed_validation_functions`
-        self._needed_validation_functions[self._resolver.get_uri()] = self._resolver.get_scope_name()
+        self._root_name = self._resolver.get_scope_name()
+        self._root_uri = self._resolver.get_uri()
+        self._needed_validation_functions[self._root_uri] = self._root_name
+        # Specialized code must not change the data, the generic validator would see them changed.
+        # It also relies on the optimizer to remove checks ensured by the shape.
+        if shape is not None and (not optimize or self.has_side_effects(definition)):
+            self._root_shape = None
+
+        # In the iterative mode internal functions are generators run by `run_iterative`
+        # and the main function is only a wrapper of its internal variant.
+        self._iterative = iterative
+        self._iterative_max_depth = ITERATIVE_DEPTH_FACTOR * sys.getrecursionlimit() if iterative is True else iterative
+        self._iterative_root_name = 'iterative_' + self._root_name
+
+        # With budget the main function sets the deadline of validation and loops
+        # check it, see `generate_budget_check`.
+        self._budget_ns = budget_ns
+        self._budget_root_name = 'budgeted_' + self._root_name
+
+        # With lazy generation referenced functions are only stubs generating
+        # the real function on the first call, see `load_lazy_function`.
+        self._lazy = lazy
+        # Names of stubs to URIs of functions which are not generated yet.
+        self._lazy_functions = {}
+        self._lazy_lock = threading.Lock()
 
         self._json_keywords_to_function = OrderedDict()
 
@@ -213,7 +393,77 @@ class CodeGenerator:
         """
         self._generate_func_code()
 
-        return '\n'.join(self._code)
+        if self._func_code is None:
+            self._func_code = self._join_code(self._code, self._func_sources)
+        return self._func_code
+
+    def _join_code(self, code, sources=None):
+        if self._optimize:
+            code = optimize(code)
+        else:
+            code = [(indent, line) for indent, line in code if not isinstance(line, TypeFact)]
+        if sources is not None:
+            sources.extend(getattr(line, 'source', None) for _, line in code)
+        return '\n'.join(' ' * self.INDENT * indent + line for indent, line in code)
+
+    def compile_func_code(self, code_cache=None):
+        """
+        Returns code object of ``func_code``, see `compile_code`.
+        """
+        return self.compile_code(self.func_code, self._func_sources, code_cache)
+
+    def compile_code(self, code, sources=None, code_cache=None):
+        """
+        Returns code object of generated ``code`` compiled with file name identifying it.
+        Its source map is registered when ``sources`` of lines are given.
+        """
+        filename = code_filename(code, self._root_uri)
+        if sources is not None:
+            self._source_maps.append(SourceMap(filename, code, sources))
+        if code_cache is not None:
+            return code_cache.compile(code, filename)
+        return builtins.compile(code, filename, 'exec')
+
+    @property
+    def keywords(self):
+        """
+        Returns supported keywords in order of their checks in generated code.
+        """
+        return tuple(self._json_keywords_to_function)
+
+    @property
+    def code_stats(self):
+        """
+        Returns size of generated code (number of functions, lines and bytes) and
+        number of its regular expressions with total time of their compilation.
+        """
+        func_code = self.func_code
+        lines = func_code.split('\n')
+        return {
+            'functions': sum(1 for line in lines if line.startswith('def ')),
+            'lines': len(lines),
+            'bytes': len(func_code.encode('utf-8')),
+            'regexs': len(self._compile_regexps),
+            'regex_compile_ns': self._regex_compile_ns,
+            'regex_risks': self._regex_risks,
+        }
+
+    @property
+    def specialized(self):
+        """
+        Returns whether the code is specialized for the shape of data. Schema with
+        side effects or referencing its root (called with values of other shapes)
+        is not specialized.
+        """
+        self._generate_func_code()
+        return self._root_shape is not None and not self._root_referenced
+
+    @property
+    def source_maps(self):
+        """
+        Returns source maps of compiled code (more of them with lazy generation).
+        """
+        return self._source_maps
 
     @property
     def global_state(self):
@@ -224,9 +474,11 @@ class CodeGenerator:
         """
         self._generate_func_code()
 
-        return dict(
+        state = dict(
             **self._extra_imports_objects,
+            **self._pooled_functions,
             REGEX_PATTERNS=self._compile_regexps,
+            DEFINITIONS=self._definitions,
             collections=collections,
             re=re,
             JsonSchemaValidationException=JsonSchemaValidationException,
@@ -234,7 +486,19 @@ class CodeGenerator:
             is_specific_field_error=is_specific_field_error,
             is_fundamental_error=is_fundamental_error,
             raise_best_anyof_error=raise_best_anyof_error,
+            run_iterative=run_iterative,
         )
+        if self._lazy:
+            state['load_lazy_function'] = self.load_lazy_function
+        if self._instrumentation is not None:
+            state.update(self._instrumentation.global_state, INSTRUMENTATION=self._instrumentation)
+            state['perf_counter_ns'] = time.perf_counter_ns
+        if self._root_shape is not None:
+            state['SpecializationMiss'] = SpecializationMiss
+        if self._budget_ns is not None:
+            state.update(BUDGET=ValidationBudget(), JsonSchemaBudgetExceeded=JsonSchemaBudgetExceeded)
+            state['perf_counter_ns'] = time.perf_counter_ns
+        return state
 
     @property
     def global_state_code(self):
@@ -244,32 +508,33 @@ class CodeGenerator:
         """
         self._generate_func_code()
 
-        if not self._compile_regexps:
-            return '\n'.join(self._extra_imports_lines + [
-                'import collections',
-                'from precisionlife_fastjsonschema import JsonSchemaValidationException',
-                '',
-                '',
-                '',
-                *common_functions_lines,
-                '',
-            ])
-        regexs = ['"{}": re.compile(r"{}")'.format(key, value.pattern) for key, value in self._compile_regexps.items()]
-        return '\n'.join(self._extra_imports_lines + [
-            'import re',
+        lines = list(self._extra_imports_lines)
+        if self._compile_regexps:
+            lines.append('import re')
+        lines += [
             'import collections',
             'from precisionlife_fastjsonschema import JsonSchemaValidationException',
             '',
             '',
-            'REGEX_PATTERNS = {',
-            '    ' + ',\n    '.join(regexs),
-            '}',
+        ]
+        if self._compile_regexps:
+            regexs = ['"{}": re.compile(r"{}")'.format(key, value.pattern) for key, value in self._compile_regexps.items()]
+            lines += [
+                'REGEX_PATTERNS = {',
+                '    ' + ',\n    '.join(regexs),
+                '}',
+                '',
+            ]
+        lines += [
+            'DEFINITIONS = [',
+            *('    {},'.format(repr(definition)) for definition in self._definitions),
+            ']',
             '',
             '',
             *common_functions_lines,
             '',
-        ])
-
+        ]
+        return '\n'.join(lines)
 
     def _generate_func_code(self):
         if not self._code:
@@ -281,40 +546,388 @@ class CodeGenerator:
         for creating code by definition.
         """
         self.l('NoneType = type(None)')
-        # Generate parts that are referenced and not yet generated
-        while self._needed_validation_functions:
+        self.l('Mapping = collections.abc.Mapping')
+        self.l('Sequence = collections.abc.Sequence')
+        self.generate_needed_functions()
+        self._source = None
+        if self._hoisted:
+            self.l('')
+        for expression, name in self._hoisted.items():
+            self.l('{} = {}', name, expression)
+
+    def generate_needed_functions(self):
+        """
+        Generate parts that are referenced and not yet generated.
+        """
+        while self._needed_validation_functions or self._needed_subschema_functions:
             # During generation of validation function, could be needed to generate
             # new one that is added again to `_needed_validation_functions`.
             # Therefore usage of while instead of for loop.
-            uri, name = self._needed_validation_functions.popitem()
-            self.generate_validation_function(uri, name)
+            if self._needed_validation_functions:
+                uri, name = self._needed_validation_functions.popitem()
+                if self._lazy and name != self._root_name:
+                    self.generate_lazy_stub(uri, name)
+                else:
+                    self.generate_validation_function(uri, name)
+            else:
+                name, (scope, definition) = self._needed_subschema_functions.popitem(last=False)
+                self.generate_subschema_function(name, scope, definition)
+
+    def generate_lazy_stub(self, uri, name):
+        """
+        Generate stub of validation function for given uri which replaces itself
+        by the real function on the first call.
+        """
+        self._validation_functions_done.add(uri)
+        self._lazy_functions[name] = uri
+        self.l('')
+        with self.l('def {}(*args):', name):
+            self.l('return load_lazy_function("{0}", globals())(*args)', name)
+
+    # pylint: disable=exec-used
+    def load_lazy_function(self, name, global_state):
+        """
+        Returns real validation function of stub ``name``. On the first call it is
+        generated, compiled and bound in ``global_state`` of the validator instead
+        of the stub (together with stubs of functions it references).
+        """
+        with self._lazy_lock:
+            uri = self._lazy_functions.pop(name, None)
+            if uri is not None:
+                code, self._code = self._code, []
+                hoisted_count = len(self._hoisted)
+                self._indent_last_line = None
+
+                self.generate_validation_function(uri, name)
+                self.generate_needed_functions()
+                self._source = None
+                for expression, hoisted_name in list(self._hoisted.items())[hoisted_count:]:
+                    self.l('{} = {}', hoisted_name, expression)
+
+                lazy_code, self._code = self._code, code
+                # Imports (such as Decimal) and pooled functions needed first by the lazy code.
+                global_state.update(self._extra_imports_objects)
+                global_state.update(self._pooled_functions)
+                sources = [] if self._source_map else None
+                exec(self.compile_code(self._join_code(lazy_code, sources), sources), global_state)
+            return global_state[name]
 
     def generate_validation_function(self, uri, name):
         """
         Generate validation function for given uri with given name
         """
         self._validation_functions_done.add(uri)
+        self._function_uri = uri
+        self._source = None
         self.l('')
-        with self._resolver.resolving(uri) as definition:
+        is_public = name == self._root_name
+        if is_public and self._budget_ns is not None:
+            self.generate_budget_wrapper(name)
+            name = self._budget_root_name
+        if is_public and self._iterative:
             with self.l('def {}(data, *, root_object=None, root_path=[], special_fields_extractor=None):', name):
+                self.l(
+                    'return run_iterative({}(data, data if root_object is None else root_object, root_path, special_fields_extractor), {})',
+                    self._iterative_root_name,
+                    self._iterative_max_depth,
+                )
+            self.l('')
+            name, is_public = self._iterative_root_name, False
+        with self._resolver.resolving(uri) as definition:
+            self.count_document_subschemas()
+            if self._source_map:
+                self._source = (self.definition_pointer(definition), None)
+            # Only the main function is public, internal ones are called with positional arguments.
+            if is_public:
+                signature = 'def {}(data, *, root_object=None, root_path=[], special_fields_extractor=None):'
+            else:
+                signature = 'def {}(data, root_object, root_path, special_fields_extractor):'
+            with self.l(signature, name):
                 self.l(f'""" Validation function for: base_uri={self._resolver.base_uri} uri={uri} """')
-                self.l('root_object = (data if root_object is None else root_object)')
-                self.generate_func_code_block(definition, 'data', [], clear_variables=True)
-                self.l('return data')
+                if is_public:
+                    self.l('root_object = (data if root_object is None else root_object)')
+                self.generate_function_body(name, definition)
+
+    def generate_budget_wrapper(self, name):
+        """
+        Generate main function of budgeted validator. It sets the deadline unless it
+        is already running (called recursively by ``$ref``) and calls its internal variant.
+        """
+        call = '{}(data, root_object=root_object, root_path=root_path, special_fields_extractor=special_fields_extractor)'.format(
+            self._budget_root_name,
+        )
+        signature = 'def {}(data, *, root_object=None, root_path=[], special_fields_extractor=None, budget_ns={}):'
+        with self.l(signature, name, self._budget_ns):
+            with self.l('if BUDGET.deadline:'):
+                self.l('return ' + call)
+            self.l('BUDGET.deadline = perf_counter_ns() + budget_ns')
+            with self.l('try:'):
+                self.l('return ' + call)
+            with self.l('finally:'):
+                self.l('BUDGET.deadline = 0')
+        self.l('')
+
+    def generate_budget_check(self):
+        """
+        Append check of the deadline of budgeted validator, used in loops over the data
+        and before branches of combinators. Validators without budget have no check.
+        """
+        if self._budget_ns is None:
+            return
+        with self.l('if perf_counter_ns() > budget_deadline:'):
+            self.l('raise JsonSchemaBudgetExceeded("validation budget exceeded", path=root_path + {path})', path=prepare_path(self._variable_path))
+
+    def generate_subschema_function(self, name, scope, definition):
+        """
+        Generate validation function for subschema (used by all its structurally
+        equal occurrences in given resolution ``scope``).
+        """
+        self._function_uri = None
+        self._source = (self.definition_pointer(definition), None) if self._source_map else None
+        self.l('')
+        with self._resolver.resolving(scope):
+            with self.l('def {}(data, root_object, root_path, special_fields_extractor):', name):
+                self.l('""" Validation function of subschema """')
+                self._subschema_function_definition = definition
+                self.generate_function_body(name, definition)
+
+    def generate_function_body(self, name, definition):
+        shape = self._root_shape if name in (self._root_name, self._iterative_root_name, self._budget_root_name) else None
+        if self._budget_ns is not None:
+            self.l('budget_deadline = BUDGET.deadline')
+        if self._instrumentation is None or not self._instrumentation.timing:
+            self.generate_func_code_block(definition, 'data', [], clear_variables=True, shape=shape)
+            self.generate_function_end()
+            return
+        index = self._instrumentation.add_function(name, self.definition_pointer(definition))
+        self.l('instrument_start = perf_counter_ns()')
+        with self.l('try:'):
+            self.generate_func_code_block(definition, 'data', [], clear_variables=True, shape=shape)
+            self.generate_function_end()
+        with self.l('finally:'):
+            self.l('INSTRUMENT_CALLS[{}] += 1', index)
+            self.l('INSTRUMENT_TIMES[{}] += perf_counter_ns() - instrument_start', index)
+
+    def generate_function_end(self):
+        self.l('return data')
+        if self._iterative:
+            # Internal function has to be a generator even when it does not call any other function.
+            self.l('yield')
+
+    def count_document_subschemas(self):
+        """
+        Counts subschemas of currently resolved document unless it was already done.
+        """
+        if id(self._resolver.schema) not in self._counted_documents:
+            self._counted_documents.add(id(self._resolver.schema))
+            self.count_subschemas(self._resolver.schema)
+            self.index_definition_pointers()
+
+    def index_definition_pointers(self):
+        """
+        Remembers JSON pointers of all subschemas of currently resolved document
+        (first one when the same object is used more times).
+        """
+        document_index = self._resolver.pointer_indexes.get(normalize(self._resolver.base_uri))
+        if document_index is None or document_index[0] is not self._resolver.schema:
+            return
+        for pointer, node in document_index[1].items():
+            self._definition_pointers.setdefault(id(node), '{}#{}'.format(self._resolver.base_uri, pointer))
 
-    def generate_func_code_block(self, definition, variable, variable_path, clear_variables=False):
+    def definition_pointer(self, definition=None):
         """
-        Creates validation rules for current definition.
+        Returns URI with JSON pointer of ``definition`` (current one by default).
         """
-        backup = self._definition, self._variable, self._variable_path
-        self._definition, self._variable, self._variable_path = definition, variable, variable_path
+        if definition is None:
+            definition = self._definition
+        pointer = self._definition_pointers.get(id(definition))
+        if pointer is None:
+            return self._resolver.get_uri()
+        return pointer
+
+    def has_side_effects(self, definition, seen=None):
+        """
+        Returns True when validation by ``definition`` (including referenced ones)
+        can change the data or the validated value, so its order matters.
+        """
+        if seen is None:
+            seen = set()
+        if isinstance(definition, list):
+            return any(self.has_side_effects(item, seen) for item in definition)
+        if not isinstance(definition, dict):
+            return False
+        for key, value in definition.items():
+            if key in ('default', 'contentEncoding', 'contentMediaType'):
+                return True
+            if key == '$ref' and isinstance(value, str):
+                with self._resolver.resolving(value) as target:
+                    uri = self._resolver.get_uri()
+                    if uri not in seen:
+                        seen.add(uri)
+                        if self.has_side_effects(target, seen):
+                            return True
+            elif key not in ('enum', 'const', 'examples', 'definitions'):
+                if isinstance(value, dict) and key in ('properties', 'patternProperties', 'dependencies'):
+                    value = list(value.values())
+                if self.has_side_effects(value, seen):
+                    return True
+        return False
+
+    def count_subschemas(self, definition):
+        """
+        Counts structurally equal subschemas of ``definition`` so it is known which
+        ones are worth to be shared and decides which ones are too big to be inlined.
+        Returns pair of size of ``definition`` as number of keywords and its size
+        when it is inlined (outlined subschemas count as one keyword).
+        """
+        if isinstance(definition, list):
+            sizes = [self.count_subschemas(item) for item in definition]
+            return sum(size for size, _ in sizes), sum(size for _, size in sizes)
+        if not isinstance(definition, dict):
+            return 0, 0
+        size = inlined_size = len(definition)
+        for key, value in definition.items():
+            if key in ('enum', 'const', 'default', 'examples'):
+                continue
+            if key in ('properties', 'patternProperties', 'definitions', 'dependencies') and isinstance(value, dict):
+                value = list(value.values())
+            value_size, value_inlined_size = self.count_subschemas(value)
+            size += value_size
+            # Definitions are never inlined, they are validated by own functions.
+            if key != 'definitions':
+                inlined_size += value_inlined_size
+        # Order of keys matters (it is order of checks), therefore `repr` and not sorted JSON.
+        key = repr(definition)
+        outlined = inlined_size >= self.OUTLINE_MIN_SIZE
+        self._subschema_stats[id(definition)] = (key, size, outlined)
+        self._subschema_counts[key] += 1
+        return size, 1 if outlined else inlined_size
+
+    def generate_subschema_function_call(self, definition, variable, variable_path):
+        """
+        Subschema is validated by separate function, same as ``$ref`` is, when it is:
+
+         * structurally equal to other subschemas (with at least ``DEDUPLICATE_MIN_SIZE`` keywords),
+         * stored in the function pool,
+         * too big (``OUTLINE_MIN_SIZE``) or too deep (``OUTLINE_INDENT``) to be inlined.
+
+        Returns False when ``definition`` has to be inlined.
+        """
+        stats = self._subschema_stats.get(id(definition))
+        if (
+            stats is None
+            or definition is self._subschema_function_definition
+            # Decoded value has to stay in the variable for following checks.
+            or 'contentEncoding' in definition or 'contentMediaType' in definition
+        ):
+            return False
+        key, size, outlined = stats
+        # Subschema with reference depends on its resolution scope, it cannot be used by other validators.
+        pooled = (
+            self._function_pool is not None
+            and size >= self.DEDUPLICATE_MIN_SIZE
+            and definition is not self._root_definition
+            and "'$ref'" not in key
+        )
+        if not (
+            pooled
+            or (self._deduplicate and size >= self.DEDUPLICATE_MIN_SIZE and self._subschema_counts[key] > 1)
+            # Subschema directly in the function body is not worth of another function.
+            or (self._indent > 1 and (outlined or self._indent >= self.OUTLINE_INDENT))
+        ):
+            return False
+        scope = None if pooled else self._resolver.resolution_scope
+        name = self._subschema_functions.get((scope, key))
+        if name is None:
+            name = 'validate_subschema_{}'.format(len(self._subschema_functions))
+            self._subschema_functions[(scope, key)] = name
+            if pooled:
+                self._pooled_functions[name] = self.get_pooled_function(definition, key)
+            else:
+                self._needed_subschema_functions[name] = (scope, definition)
+        # Pooled function is the main (public) function of its own validator.
+        self.generate_call(name, variable, variable_path, positional=name not in self._pooled_functions)
+        return True
+
+    # pylint: disable=exec-used
+    def get_pooled_function(self, definition, key):
+        """
+        Returns validation function of ``definition`` from the function pool,
+        it is generated and compiled by new generator only when it is not there yet.
+        """
+        formats = getattr(self, '_custom_formats', {})
+        # Only guards change the code, found risks are reported below with pointers of this validator.
+        regex_policy = 'guard' if self._regex_policy == 'guard' else None
+        pool_key = (type(self), self._optimize, repr(sorted(formats.items())), regex_policy, key)
+
+        def factory():
+            resolver = RefResolver.from_schema(definition)
+            generator = type(self)(
+                definition, resolver, formats=formats, optimize=self._optimize, function_pool=self._function_pool,
+                regex_policy=regex_policy,
+            )
+            global_state = generator.global_state
+            exec(generator.func_code, global_state)
+            function = global_state[resolver.get_scope_name()]
+            function.regex_risks = generator._regex_risks
+            return function
+
+        function = self._function_pool.get_function(pool_key, factory)
+        pointer = self.definition_pointer(definition)
+        for risk in function.regex_risks:
+            risk_pointer = risk['pointer']
+            if risk_pointer.startswith('#'):
+                risk_pointer = pointer + risk_pointer[1:]
+            self.analyze_regex(risk['pattern'], risk['keyword'], risk_pointer)
+        return function
+
+    def compile_regex(self, pattern):
+        """
+        Returns compiled regular expression, shared by the function pool when there is one.
+        """
+        started = time.perf_counter_ns()
+        if self._function_pool is not None:
+            regex = self._function_pool.compile_regex(pattern)
+        else:
+            regex = re.compile(pattern)
+        self._regex_compile_ns += time.perf_counter_ns() - started
+        return regex
+
+    def analyze_regex(self, pattern, keyword, pointer=None):
+        """
+        Analyzes user's regular expression ``pattern`` used by ``keyword`` of the current
+        definition (or the one at ``pointer``) and applies the regex policy to it.
+        Returns whether matching has to be guarded by length of the string.
+        """
+        if pointer is None:
+            pointer = self.definition_pointer()
+        risks = check_regex(pattern, self._regex_policy, '{} {!r} at {}'.format(keyword, pattern, pointer))
+        if not risks:
+            return False
+        self._regex_risks.append({'pointer': pointer, 'keyword': keyword, 'pattern': pattern, 'risks': risks})
+        return self._regex_policy == 'guard'
+
+    def generate_func_code_block(self, definition, variable, variable_path, clear_variables=False, shape=None):
+        """
+        Creates validation rules for current definition. ``shape`` is the known
+        shape of new ``variable``, subschemas of the same value keep the current one.
+        """
+        if self.generate_subschema_function_call(definition, variable, variable_path):
+            return
+        in_place = variable == self._variable
+        if in_place:
+            shape = self._shape
+        backup = self._definition, self._variable, self._variable_path, self._shape
+        self._definition, self._variable, self._variable_path, self._shape = definition, variable, variable_path, shape
         if clear_variables:
             backup_variables = self._variables
-            self._variables = set()
+            self._variables = {}
 
+        if shape is not None and not in_place and definition and isinstance(definition, dict):
+            self.generate_shape_guard(shape)
         self._generate_func_code_block(definition)
 
-        self._definition, self._variable, self._variable_path = backup
+        self._definition, self._variable, self._variable_path, self._shape = backup
         if clear_variables:
             self._variables = backup_variables
 
@@ -323,14 +936,52 @@ class CodeGenerator:
             raise JsonSchemaDefinitionException("definition must be an object")
         if '$ref' in definition:
             # needed because ref overrides any sibling keywords
-            self.generate_ref()
+            self.generate_keyword('$ref', self.generate_ref)
         else:
             self.run_generate_functions(definition)
 
     def run_generate_functions(self, definition):
-        for key, func in self._json_keywords_to_function.items():
-            if key in definition:
-                func()
+        keywords = [key for key in self._json_keywords_to_function if key in definition]
+        if self._profile is not None:
+            keywords = self._profile.keyword_order(self.definition_pointer(), keywords)
+        for key in keywords:
+            self.generate_keyword(key, self._json_keywords_to_function[key])
+
+    def generate_keyword(self, keyword, func):
+        """
+        Generates code of ``keyword`` of current definition by ``func``.
+        """
+        if self._source_map:
+            backup_source = self._source
+            self._source = (self.definition_pointer(), keyword)
+        if self._instrumentation is not None:
+            self.generate_instrumented_keyword(keyword, func)
+        else:
+            func()
+        if self._source_map:
+            self._source = backup_source
+
+    def generate_instrumented_keyword(self, keyword, func):
+        """
+        Generates code of ``keyword`` by ``func`` with counting of its evaluations
+        and failures (validation errors raised by it, including nested ones).
+        """
+        index = self._instrumentation.add_keyword(self.definition_pointer(), keyword)
+        self.l('INSTRUMENT_EVALUATIONS[{}] += 1', index)
+        start = len(self._code)
+        with self.l('try:'):
+            func()
+        body = self._code[start + 1:]
+        # Error is always raised again, so facts about types are valid after the block as well.
+        facts = [line for indent, line in body if isinstance(line, TypeFact) and indent == self._indent + 1]
+        if all(isinstance(line, TypeFact) for _, line in body):
+            del self._code[start:]
+        else:
+            with self.l('except JsonSchemaValidationException:'):
+                self.l('INSTRUMENT_FAILURES[{}] += 1', index)
+                self.l('raise')
+        self._code.extend((self._indent, fact) for fact in facts)
+        self._indent_last_line = None
 
     def generate_ref(self):
         """
@@ -346,13 +997,62 @@ class CodeGenerator:
                 }
             }
         """
+        if self._inline_refs and self.generate_inlined_ref():
+            return
         with self._resolver.in_scope(self._definition['$ref']):
             name = self._resolver.get_scope_name()
             uri = self._resolver.get_uri()
             if uri not in self._validation_functions_done:
                 self._needed_validation_functions[uri] = name
             # call validation function, with current full name as a root_path
-            self.l('{}({variable}, root_object=root_object, root_path=root_path + {path}, special_fields_extractor=special_fields_extractor)', name, path=prepare_path(self._variable_path))
+            if name == self._root_name:
+                self._root_referenced = True
+            if self._iterative and name == self._root_name:
+                name = self._iterative_root_name
+            self.generate_call(name, self._variable, self._variable_path, positional=name != self._root_name)
+
+    def generate_call(self, name, variable, variable_path, positional=True):
+        """
+        Generate call of validation function ``name`` for ``variable``. Internal functions
+        take positional arguments, which is cheaper than keyword-only arguments of public ones.
+        """
+        if positional:
+            template = '{}({}, root_object, root_path + {path}, special_fields_extractor)'
+            if self._iterative:
+                template = 'yield ' + template
+        else:
+            template = '{}({}, root_object=root_object, root_path=root_path + {path}, special_fields_extractor=special_fields_extractor)'
+        self.l(template, name, variable, path=prepare_path(variable_path))
+
+    def generate_inlined_ref(self):
+        """
+        Small ``$ref`` target (with at most ``inline_refs`` keywords) is generated
+        in place instead of calling its function, unless it is part of a recursion.
+        Returns False when the target has to be called.
+        """
+        ref = self._definition['$ref']
+        with self._resolver.in_scope(ref):
+            uri = self._resolver.get_uri()
+        if uri == self._function_uri or uri in self._inlined_refs:
+            return False
+        with self._resolver.resolving(ref) as definition:
+            self.count_document_subschemas()
+            stats = self._subschema_stats.get(id(definition))
+            if (
+                stats is None
+                or stats[1] > self._inline_refs
+                # Decoded value has to stay in the variable of the called function.
+                or 'contentEncoding' in definition or 'contentMediaType' in definition
+            ):
+                return False
+            self._inlined_refs.append(uri)
+            start = len(self._code)
+            self.generate_func_code_block(definition, self._variable, self._variable_path, clear_variables=True)
+            self._inlined_refs.pop()
+            if all(isinstance(line, TypeFact) for _, line in self._code[start:]):
+                # Target without validation (such as ``{}``) cannot leave the block empty.
+                self.l('pass')
+        return True
 
 
     # pylint: disable=invalid-name
@@ -375,18 +1075,89 @@ class CodeGenerator:
             with self.l('if {variable} not in {enum}:'):
                 self.l('raise JsonSchemaValidationException("Wrong!")')
         """
-        spaces = ' ' * self.INDENT * self._indent
-
-        context = dict(
-            self._definition or {},
-            variable=self._variable,
-            **kwds
-        )
+        definition = self._definition or {}
+        context = {}
+        for name in template_fields(line):
+            if name in kwds:
+                context[name] = kwds[name]
+            elif name == 'variable':
+                context[name] = self._variable
+            elif name in definition:
+                context[name] = definition[name]
         line = line.format(*args, **context)
-        line = line.replace('\n', '\\n').replace('\r', '\\r')
-        self._code.append(spaces + line)
+        if '\n' in line or '\r' in line:
+            line = line.replace('\n', '\\n').replace('\r', '\\r')
+        if self._source is not None:
+            line = SourceLine(line, self._source)
+        self._code.append((self._indent, line))
         return line
 
+    def add_type_fact(self, kinds):
+        """
+        Tells the optimizer that following code is reached only with values of given
+        ``kinds`` (see :any:`TypeFact`), for example after check of ``type``.
+        """
+        self._code.append((self._indent, TypeFact(self._variable, kinds)))
+        # Line after the fact cannot be merged with the block before it.
+        self._indent_last_line = None
+
+    def generate_shape_guard(self, shape):
+        """
+        Generates check that value of current variable has ``shape`` (see :any:`Shape`),
+        following code can rely on it. Values of other shapes are left to the generic
+        validator by raising ``SpecializationMiss``.
+        """
+        if shape.kind == 'dict':
+            keys = self.hoist('frozenset({!r})'.format(sorted(shape.keys)), 'shape_keys')
+            guard = 'if type({variable}) is not dict or {variable}.keys() != {}:'
+        elif shape.kind == 'null':
+            keys = None
+            guard = 'if {variable} is not None:'
+        else:
+            keys = None
+            guard = 'if type({variable}) is not {kind}:'
+        with self.l(guard, keys, kind=shape.kind):
+            self.l('raise SpecializationMiss')
+        self.add_type_fact({shape.kind})
+
+    def shape_has_type(self, types):
+        """
+        Returns True when current value is known to be of one of JSON ``types``.
+        """
+        if self._shape is None:
+            return False
+        return bool(SHAPE_KIND_TO_JSON_TYPES[self._shape.kind] & set(types))
+
+    def properties_shape(self):
+        """
+        Returns shape of current object when its keys are known and ``properties``,
+        ``required`` and ``additionalProperties`` can be decided by them, ``None`` otherwise.
+        """
+        shape = self._shape
+        definition = self._definition
+        if shape is None or shape.kind != 'dict':
+            return None
+        if any(key in definition for key in ('patternProperties', 'dependencies', 'propertyNames')):
+            return None
+        properties = definition.get('properties', {})
+        if not isinstance(properties, dict):
+            return None
+        if 'additionalProperties' in definition and not shape.keys <= properties.keys():
+            return None
+        required = definition.get('required', [])
+        if not isinstance(required, (list, tuple)) or not shape.keys.issuperset(required):
+            return None
+        return shape
+
+    def hoist(self, expression, prefix):
+        """
+        Returns name of global variable with value of invariant ``expression``
+        (such as method of compiled regular expression), which is evaluated only once.
+        """
+        if expression not in self._hoisted:
+            self._hoisted[expression] = '{}_{}'.format(prefix, len(self._hoisted))
+        return self._hoisted[expression]
+
     def e(self, string):
         """
         Short-cut of escape. Used for inserting user values into a string message.
@@ -400,26 +1171,65 @@ class CodeGenerator:
     def exc(self, msg, *args, rule=None, missing_fields=None, extra_fields=None):
         """
         """
-        name_path = prepare_path(self._variable_path)
-        msg = 'raise JsonSchemaValidationException("'+msg+'", value={variable}, definition={definition}, rule={rule}, path=root_path + ' + name_path + ', root_object=root_object, special_fields_extractor=special_fields_extractor'
+        msg = 'raise JsonSchemaValidationException("'+msg+'", value={variable}, definition={definition}, rule={rule}, path=root_path + {path}, root_object=root_object, special_fields_extractor=special_fields_extractor'
         if missing_fields:
             msg += f', missing_fields={missing_fields}'
         if extra_fields:
             msg += f', extra_fields={extra_fields}'
         msg += ')'
-        self.l(msg, *args, definition=repr(self._definition), rule=repr(rule))
+        self.l(msg, *args, definition=self.definition_constant(), rule=repr(rule), path=prepare_path(self._variable_path))
+
+    def definition_constant(self):
+        """
+        Returns code referencing current definition in the table of constants
+        ``DEFINITIONS``. Every definition is stored there only once, no matter how
+        many errors can be raised for it.
+        """
+        index = self._definitions_indexes.get(id(self._definition))
+        if index is None:
+            index = len(self._definitions)
+            self._definitions.append(self._definition)
+            self._definitions_indexes[id(self._definition)] = index
+        return 'DEFINITIONS[{}]'.format(index)
+
+    def enter_nested(self, keyword):
+        """
+        Returns prefix of local variables of ``keyword`` (such as ``anyOf``) of current
+        variable, ``leave_nested`` has to be called after its code is generated. Keyword
+        nested in the same keyword of the same variable (``anyOf`` in branch of ``anyOf``)
+        gets different prefix, so it does not overwrite variables of the enclosing one.
+        """
+        key = (self._variable, keyword)
+        depth = self._nesting.get(key, 0)
+        self._nesting[key] = depth + 1
+        if depth:
+            return '{}_{}'.format(self._variable, depth)
+        return self._variable
+
+    def leave_nested(self, keyword):
+        self._nesting[(self._variable, keyword)] -= 1
+
+    def is_variable_in_scope(self, variable_name):
+        """
+        Returns whether local variable ``variable_name`` was already created in current
+        block or in a block enclosing it, so it's always assigned when current line is reached.
+        Variable created in other block (for example under ``if {variable}_is_list:``,
+        or under condition of ``anyOf``) has to be created again.
+        """
+        blocks = self._variables.get(variable_name)
+        return blocks is not None and blocks == self._blocks[:len(blocks)]
 
     def create_variable_with_length(self):
         """
         Append code for creating variable with length of that variable
         (for example length of list or dictionary) with name ``{variable}_len``.
         It can be called several times and always it's done only when that variable
-        still does not exists.
+        still does not exist in the current block.
         """
         variable_name = '{}_len'.format(self._variable)
-        if variable_name in self._variables:
+        if self.is_variable_in_scope(variable_name):
             return
-        self._variables.add(variable_name)
+        self._variables[variable_name] = self._blocks
         self.l('{variable}_len = len({variable})')
 
     def create_variable_keys(self):
@@ -430,7 +1240,7 @@ class CodeGenerator:
         variable_name = '{}_keys'.format(self._variable)
         if variable_name in self._variables:
             return
-        self._variables.add(variable_name)
+        self._variables[variable_name] = self._blocks
         self.l('{variable}_keys = set({variable}.keys())')
 
     def create_variable_is_list(self):
@@ -439,10 +1249,10 @@ class CodeGenerator:
         with a name ``{variable}_is_list``. Similar to `create_variable_with_length`.
         """
         variable_name = '{}_is_list'.format(self._variable)
-        if variable_name in self._variables:
+        if self.is_variable_in_scope(variable_name):
             return
-        self._variables.add(variable_name)
-        self.l('{variable}_is_list = isinstance({variable}, collections.abc.Sequence) and not isinstance({variable}, str)')
+        self._variables[variable_name] = self._blocks
+        self.l('{variable}_is_list = isinstance({variable}, Sequence) and not isinstance({variable}, str)')
 
     def create_variable_is_dict(self):
         """
@@ -450,14 +1260,14 @@ class CodeGenerator:
         with a name ``{variable}_is_dict``. Similar to `create_variable_with_length`.
         """
         variable_name = '{}_is_dict'.format(self._variable)
-        if variable_name in self._variables:
+        if self.is_variable_in_scope(variable_name):
             return
-        self._variables.add(variable_name)
-        self.l('{variable}_is_dict = isinstance({variable}, collections.abc.Mapping)')
+        self._variables[variable_name] = self._blocks
+        self.l('{variable}_is_dict = isinstance({variable}, Mapping)')
 
     def can_emit_required_and_additional(self):
         variable_name = '{}_required_and_additional'.format(self._variable)
         if variable_name in self._variables:
             return False
-        self._variables.add(variable_name)
+        self._variables[variable_name] = self._blocks
         return True
@@ -8,21 +8,33 @@ def indent(func):
         line = func(self, line, *args, **kwds)
         # When two blocks have the same condition (such as value has to be dict),
         # do the check only once and keep it under one block.
-        if optimize and last_line == line and line != 'try:': # @note "try" is always coupled with either an "else" or "except", and optimizing away nested "try" statements results in bad code gen.
+        merged = optimize and last_line == line and line != 'try:' # @note "try" is always coupled with either an "else" or "except", and optimizing away nested "try" statements results in bad code gen.
+        if merged:
             self._code.pop()
         self._indent_last_line = line
-        return Indent(self, line)
+        return Indent(self, line, merged)
     return wrapper
 
 
 class Indent:
-    def __init__(self, instance, line):
+    def __init__(self, instance, line, merged=False):
         self.instance = instance
         self.line = line
+        self.merged = merged
 
     def __enter__(self):
         self.instance._indent += 1
+        # Block merged with the previous one continues it, so it keeps its identity.
+        last_block = self.instance._last_block
+        if self.merged and last_block is not None and last_block[0] == self.line:
+            block_id = last_block[1]
+        else:
+            self.instance._blocks_count += 1
+            block_id = self.instance._blocks_count
+        self.instance._blocks += (block_id,)
 
     def __exit__(self, type_, value, traceback):
         self.instance._indent -= 1
         self.instance._indent_last_line = self.line
+        self.instance._last_block = (self.line, self.instance._blocks[-1])
+        self.instance._blocks = self.instance._blocks[:-1]
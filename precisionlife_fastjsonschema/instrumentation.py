@@ -0,0 +1,157 @@
+"""
+Counters of validation collected by instrumented validators.
+
+When a schema is slow, it is hard to tell which keywords or subschemas take
+the time. Validator compiled with ``instrument=True`` counts evaluations and
+failures of every keyword (identified by JSON pointer of its subschema), with
+``instrument='timing'`` also calls and cumulative time (by ``perf_counter_ns``,
+including nested calls) of every generated function:
+
+.. code-block:: python
+
+    validate = fastjsonschema.compile(definition, instrument=True)
+    validate(data)
+    validate.stats()
+    # {'keywords': {'#/properties/a': {'type': {'evaluations': 1, 'failures': 0}}}, 'branches': {}, 'functions': {}}
+    print(validate.stats(format='prometheus', labels={'schema': 'user'}))
+
+Counters are updated without locking, so they are only approximate when the
+validator is used by many threads at once. Validators compiled without
+``instrument`` do not contain any of this code.
+"""
+
+
+class Instrumentation:
+    """
+    Counters of one instrumented validator. Generated code updates the lists
+    directly by index of the keyword or function.
+    """
+
+    def __init__(self, timing=False):
+        self.timing = timing
+        # Pairs of JSON pointer and keyword with their counters at the same index.
+        self.keywords = []
+        self.evaluations = []
+        self.failures = []
+        # Pointers of ``anyOf`` and ``oneOf`` with numbers of their branches and counters
+        # of matches of all branches (in order of the schema) one after another.
+        self.branches = []
+        self.matches = []
+        # Pairs of function name and JSON pointer of its definition.
+        self.functions = []
+        self.calls = []
+        self.times = []
+
+    def add_keyword(self, pointer, keyword):
+        """
+        Returns index of counters of new ``keyword`` of subschema at ``pointer``.
+        """
+        self.keywords.append((pointer, keyword))
+        self.evaluations.append(0)
+        self.failures.append(0)
+        return len(self.keywords) - 1
+
+    def add_branches(self, pointer, count):
+        """
+        Returns index of counters of matches of the first of ``count`` branches of
+        ``anyOf`` or ``oneOf`` at ``pointer``, other ones follow it.
+        """
+        self.branches.append((pointer, count, len(self.matches)))
+        self.matches.extend([0] * count)
+        return len(self.matches) - count
+
+    def add_function(self, name, pointer):
+        """
+        Returns index of counters of new generated function ``name``.
+        """
+        self.functions.append((name, pointer))
+        self.calls.append(0)
+        self.times.append(0)
+        return len(self.functions) - 1
+
+    @property
+    def global_state(self):
+        """
+        Returns global variables used by the instrumented code.
+        """
+        return {
+            'INSTRUMENT_EVALUATIONS': self.evaluations,
+            'INSTRUMENT_FAILURES': self.failures,
+            'INSTRUMENT_MATCHES': self.matches,
+            'INSTRUMENT_CALLS': self.calls,
+            'INSTRUMENT_TIMES': self.times,
+        }
+
+    # pylint: disable=redefined-builtin
+    def stats(self, format='dict', labels=None):
+        """
+        Returns counters as a dictionary (``format='dict'``) or as text in Prometheus
+        exposition format (``format='prometheus'``) with optional extra ``labels``.
+        Same keyword of the same subschema validated by more places in the generated
+        code (for example inlined ``$ref`` target) is reported only once with summed counters.
+        Dictionary can be saved as JSON and used as a profile for compilation (see :any:`Profile`).
+        """
+        keywords = {}
+        for (pointer, keyword), evaluations, failures in zip(self.keywords, self.evaluations, self.failures):
+            counters = keywords.setdefault(pointer, {}).setdefault(keyword, {'evaluations': 0, 'failures': 0})
+            counters['evaluations'] += evaluations
+            counters['failures'] += failures
+        branches = {}
+        for pointer, count, index in self.branches:
+            matches = branches.setdefault(pointer, [0] * count)
+            for idx in range(count):
+                matches[idx] += self.matches[index + idx]
+        functions = {}
+        for (name, pointer), calls, time_ns in zip(self.functions, self.calls, self.times):
+            functions[name] = {'pointer': pointer, 'calls': calls, 'time_ns': time_ns}
+        stats = {'keywords': keywords, 'branches': branches, 'functions': functions}
+
+        if format == 'dict':
+            return stats
+        if format == 'prometheus':
+            return _to_prometheus(stats, labels or {})
+        raise ValueError('Unknown format of stats: {}'.format(format))
+
+
+PROMETHEUS_METRICS = (
+    ('keywords', 'evaluations', 'fastjsonschema_keyword_evaluations_total', 'Number of evaluations of the keyword.'),
+    ('keywords', 'failures', 'fastjsonschema_keyword_failures_total', 'Number of failed evaluations of the keyword.'),
+    ('branches', 'matches', 'fastjsonschema_branch_matches_total', 'Number of matches of the branch of anyOf or oneOf.'),
+    ('functions', 'calls', 'fastjsonschema_function_calls_total', 'Number of calls of the generated function.'),
+    ('functions', 'time_ns', 'fastjsonschema_function_time_nanoseconds_total', 'Time spent in the generated function.'),
+)
+
+
+def _to_prometheus(stats, labels):
+    samples = {
+        'keywords': [
+            (dict(labels, pointer=pointer, keyword=keyword), counters)
+            for pointer, keyword_counters in stats['keywords'].items()
+            for keyword, counters in keyword_counters.items()
+        ],
+        'branches': [
+            (dict(labels, pointer=pointer, branch=idx), {'matches': matches})
+            for pointer, branch_matches in stats['branches'].items()
+            for idx, matches in enumerate(branch_matches)
+        ],
+        'functions': [
+            (dict(labels, function=name, pointer=counters['pointer']), counters)
+            for name, counters in stats['functions'].items()
+        ],
+    }
+    lines = []
+    for kind, counter, metric, help_text in PROMETHEUS_METRICS:
+        if not samples[kind]:
+            continue
+        lines.append('# HELP {} {}'.format(metric, help_text))
+        lines.append('# TYPE {} counter'.format(metric))
+        for sample_labels, counters in samples[kind]:
+            lines.append('{}{{{}}} {}'.format(metric, _format_labels(sample_labels), counters[counter]))
+    return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    return ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels.items()
+    )
@@ -0,0 +1,888 @@
+"""
+Interpreter of schemas for cold validators and tiering of validators.
+
+Generating the code and compiling it by Python costs much more than one
+validation. For schemas used only once or a few times (such as by
+:any:`validate`) it is cheaper to interpret them. :any:`interpret` builds
+a tree of nodes (one per subschema, each with a table of checks of its keywords
+in the same order as in the generated code) and returns validator walking it:
+
+.. code-block:: python
+
+    validate = fastjsonschema.interpret(definition)
+    validate(data)
+
+Interpreted validation raises the same errors as the generated code, it is only
+slower. Options of the generated code (such as ``iterative`` or ``instrument``)
+do not apply to it. Validator compiled with ``tiered=True`` (or number of calls) starts as
+interpreted one and it is compiled (promoted) when it is used often enough,
+see :any:`TieredValidator`.
+"""
+
+import base64
+import copy
+import decimal
+import json
+import re
+import threading
+import time
+from collections.abc import Mapping, Sequence
+
+from .draft04 import DOLLAR_FINDER
+from .draft06 import CodeGeneratorDraft06
+from .exceptions import JsonSchemaDefinitionException, JsonSchemaValidationException
+from .generator import enforce_list, raise_best_anyof_error
+from .regex_analysis import check_regex, guard_regex
+
+
+JSON_TYPE_TO_PYTHON_TYPES = {
+    'null': (type(None),),
+    'boolean': (bool,),
+    'number': (int, float),
+    'integer': (int,),
+    'string': (str,),
+    'array': (Sequence,),
+    'object': (Mapping,),
+}
+
+
+class Node:
+    """
+    Subschema prepared for interpretation: its ``definition`` and ``checks``, pairs
+    of function and its argument evaluated in order. Checks of ``keyed`` node share
+    keys of validated object not matched yet by ``properties`` or ``patternProperties``.
+    """
+
+    __slots__ = ('definition', 'checks', 'keyed')
+
+    def __init__(self, definition):
+        self.definition = definition
+        self.checks = []
+        self.keyed = False
+
+
+class Context:
+    """
+    Values common for the whole validation, passed to every check, and ``keys``
+    of object validated by current keyed node.
+    """
+
+    __slots__ = ('root_object', 'root_path', 'special_fields_extractor', 'keys')
+
+    def __init__(self, root_object, root_path, special_fields_extractor):
+        self.root_object = root_object
+        self.root_path = root_path
+        self.special_fields_extractor = special_fields_extractor
+        self.keys = None
+
+
+class Interpreter:
+    """
+    Validator interpreting the schema of ``resolver``. ``code_generator`` is used only
+    for keywords and formats of the draft. Risky regular expressions are handled by
+    ``regex_policy`` the same way as by :any:`compile`. Use :any:`interpret` instead
+    of this class.
+    """
+
+    def __init__(self, resolver, code_generator, formats={}, regex_policy=None):  # pylint: disable=dangerous-default-value
+        self._resolver = resolver
+        self._regex_policy = regex_policy
+        self._keywords = code_generator.keywords
+        self._format_regexs = code_generator.FORMAT_REGEXS
+        # Since draft 06 definitions can be boolean and a float without fractional part is an integer.
+        self._draft06 = isinstance(code_generator, CodeGeneratorDraft06)
+        self._custom_formats = formats
+        self._builders = {
+            'type': self.build_type,
+            'enum': self.build_enum,
+            'allOf': self.build_all_of,
+            'anyOf': self.build_any_of,
+            'oneOf': self.build_one_of,
+            'not': self.build_not,
+            'minLength': self.build_min_length,
+            'maxLength': self.build_max_length,
+            'pattern': self.build_pattern,
+            'format': self.build_format,
+            'minimum': self.build_minimum,
+            'maximum': self.build_maximum,
+            'multipleOf': self.build_multiple_of,
+            'minItems': self.build_min_items,
+            'maxItems': self.build_max_items,
+            'uniqueItems': self.build_unique_items,
+            'items': self.build_items,
+            'minProperties': self.build_min_properties,
+            'maxProperties': self.build_max_properties,
+            'properties': self.build_properties,
+            'patternProperties': self.build_pattern_properties,
+            'required': self.build_required_and_additional,
+            'additionalProperties': self.build_required_and_additional,
+            'dependencies': self.build_dependencies,
+            'exclusiveMinimum': self.build_exclusive_minimum,
+            'exclusiveMaximum': self.build_exclusive_maximum,
+            'propertyNames': self.build_property_names,
+            'contains': self.build_contains,
+            'const': self.build_const,
+            'if': self.build_if_then_else,
+            'contentEncoding': self.build_content_encoding,
+            'contentMediaType': self.build_content_media_type,
+        }
+        # Nodes of ``$ref`` targets by their URI, so recursive schemas are finite.
+        self._ref_nodes = {}
+        self._building = set()
+        # Whether the schema references itself, so depth of validated data is not limited.
+        self.recursive = False
+        self._root = self.build_ref_node(resolver.get_uri(), resolver.schema)
+
+    def __call__(self, data, *, root_object=None, root_path=[], special_fields_extractor=None, budget_ns=None):  # pylint: disable=dangerous-default-value,unused-argument
+        """
+        Validates ``data`` with the same arguments as the compiled validator,
+        interpreted validation is not budgeted, so ``budget_ns`` is ignored.
+        """
+        context = Context(data if root_object is None else root_object, root_path, special_fields_extractor)
+        return validate_node(self._root, data, [], context)
+
+    def build_ref_node(self, uri, definition):
+        node = self._ref_nodes.get(uri)
+        if node is None:
+            node = self._ref_nodes[uri] = Node(definition)
+            self._building.add(uri)
+            self.build_checks(node)
+            self._building.discard(uri)
+        elif uri in self._building:
+            self.recursive = True
+        return node
+
+    def build(self, definition):
+        """
+        Returns :any:`Node` of ``definition``.
+        """
+        node = Node(definition)
+        self.build_checks(node)
+        return node
+
+    def build_checks(self, node):
+        definition = node.definition
+        if isinstance(definition, bool) and self._draft06:
+            if definition is False:
+                node.checks.append((check_false, None))
+            return
+        if not isinstance(definition, dict):
+            raise JsonSchemaDefinitionException('definition must be an object')
+        if '$ref' in definition:
+            # Reference overrides any sibling keywords.
+            with self._resolver.in_scope(definition['$ref']):
+                uri = self._resolver.get_uri()
+            with self._resolver.resolving(definition['$ref']) as target:
+                node.checks.append((check_ref, self.build_ref_node(uri, target)))
+            return
+        built = set()
+        for keyword in self._keywords:
+            builder = self._builders.get(keyword)
+            if keyword not in definition or builder is None or builder in built:
+                continue
+            built.add(builder)
+            check = builder(definition)
+            if check is not None:
+                node.checks.append(check)
+                node.keyed = node.keyed or check[0] in KEYED_CHECKS
+
+    def build_type(self, definition):
+        types = enforce_list(definition['type'])
+        try:
+            python_types = tuple(python_type for type_ in types for python_type in JSON_TYPE_TO_PYTHON_TYPES[type_])
+        except KeyError as exc:
+            raise JsonSchemaDefinitionException('Unknown type: {}'.format(exc))
+        # Same conditions as in generated code, see `CodeGeneratorDraft06.generate_type`.
+        integer_float = self._draft06 and 'integer' in types
+        exclude_bool = ('number' in types or 'integer' in types) and 'boolean' not in types
+        exclude_str = 'array' in types and 'string' not in types
+        if exclude_str:
+            integer_float = exclude_bool = False
+        return check_type, (python_types, integer_float, exclude_bool, exclude_str, ' or '.join(types))
+
+    def build_enum(self, definition):
+        enum = definition['enum']
+        if not isinstance(enum, (list, tuple)):
+            raise JsonSchemaDefinitionException('enum must be an array')
+        return check_enum, enum
+
+    def build_all_of(self, definition):
+        return check_all_of, [self.build(item) for item in definition['allOf']]
+
+    def build_any_of(self, definition):
+        return check_any_of, [self.build(item) for item in definition['anyOf']]
+
+    def build_one_of(self, definition):
+        return check_one_of, [self.build(item) for item in definition['oneOf']]
+
+    def build_not(self, definition):
+        not_definition = definition['not']
+        if not_definition is True:
+            return check_not_true, None
+        if not_definition is False:
+            return None
+        return check_not, self.build(not_definition)
+
+    def build_min_length(self, definition):
+        if not isinstance(definition['minLength'], int):
+            raise JsonSchemaDefinitionException('minLength must be a number')
+        return check_min_length, definition['minLength']
+
+    def build_max_length(self, definition):
+        if not isinstance(definition['maxLength'], int):
+            raise JsonSchemaDefinitionException('maxLength must be a number')
+        return check_max_length, definition['maxLength']
+
+    def build_regex(self, pattern, keyword, function):
+        """
+        Returns ``function`` of compiled regular expression ``pattern``, guarded by
+        length of the string when the regex policy requires it.
+        """
+        if check_regex(pattern, self._regex_policy, '{} {!r}'.format(keyword, pattern)) and self._regex_policy == 'guard':
+            return guard_regex(function)
+        return function
+
+    def build_pattern(self, definition):
+        pattern = definition['pattern']
+        search = re.compile(DOLLAR_FINDER.sub(r'\\Z', pattern)).search
+        return check_pattern, (self.build_regex(pattern, 'pattern', search), pattern)
+
+    def build_format(self, definition):
+        format_ = definition['format']
+        if format_ in self._custom_formats:
+            custom_format = self._custom_formats[format_]
+            if isinstance(custom_format, str):
+                return check_format, (self.build_regex(custom_format, 'format', re.compile(custom_format).match), format_)
+            return check_format, (custom_format, format_)
+        if format_ in self._format_regexs:
+            return check_format, (re.compile(self._format_regexs[format_]).match, format_)
+        if format_ == 'regex':
+            return check_format_regex, None
+        raise JsonSchemaDefinitionException('Unknown format: {}'.format(format_))
+
+    def build_minimum(self, definition):
+        if not isinstance(definition['minimum'], (int, float)):
+            raise JsonSchemaDefinitionException('minimum must be a number')
+        return check_minimum, (definition['minimum'], bool(definition.get('exclusiveMinimum', False)))
+
+    def build_maximum(self, definition):
+        if not isinstance(definition['maximum'], (int, float)):
+            raise JsonSchemaDefinitionException('maximum must be a number')
+        return check_maximum, (definition['maximum'], bool(definition.get('exclusiveMaximum', False)))
+
+    def build_multiple_of(self, definition):
+        if not isinstance(definition['multipleOf'], (int, float)):
+            raise JsonSchemaDefinitionException('multipleOf must be a number')
+        return check_multiple_of, definition['multipleOf']
+
+    def build_min_items(self, definition):
+        if not isinstance(definition['minItems'], int):
+            raise JsonSchemaDefinitionException('minItems must be a number')
+        return check_min_items, definition['minItems']
+
+    def build_max_items(self, definition):
+        if not isinstance(definition['maxItems'], int):
+            raise JsonSchemaDefinitionException('maxItems must be a number')
+        return check_max_items, definition['maxItems']
+
+    def build_unique_items(self, definition):
+        return check_unique_items, None
+
+    def build_items(self, definition):
+        items_definition = definition['items']
+        if items_definition is True:
+            return None
+        if items_definition is False:
+            return check_items_false, None
+        if isinstance(items_definition, list):
+            additional_items = None
+            if 'additionalItems' in definition and definition['additionalItems'] is not False:
+                additional_items = self.build(definition['additionalItems'])
+            items = []
+            for item in items_definition:
+                has_default = isinstance(item, dict) and 'default' in item
+                items.append((self.build(item), has_default, item['default'] if has_default else None))
+            return check_items_tuple, (items, definition.get('additionalItems') is False, additional_items)
+        if not items_definition:
+            return None
+        return check_items, self.build(items_definition)
+
+    def build_min_properties(self, definition):
+        if not isinstance(definition['minProperties'], int):
+            raise JsonSchemaDefinitionException('minProperties must be a number')
+        return check_min_properties, definition['minProperties']
+
+    def build_max_properties(self, definition):
+        if not isinstance(definition['maxProperties'], int):
+            raise JsonSchemaDefinitionException('maxProperties must be a number')
+        return check_max_properties, definition['maxProperties']
+
+    def build_properties(self, definition):
+        properties = []
+        for key, prop_definition in definition['properties'].items():
+            if not isinstance(prop_definition, (dict, bool)):
+                raise JsonSchemaDefinitionException('data[{}] must be object'.format(key))
+            has_default = isinstance(prop_definition, dict) and 'default' in prop_definition
+            properties.append((key, self.build(prop_definition), has_default, prop_definition.get('default') if has_default else None))
+        return check_properties, properties
+
+    def build_pattern_properties(self, definition):
+        return check_pattern_properties, [
+            (self.build_regex(pattern, 'patternProperties', re.compile(pattern).search), self.build(pattern_definition))
+            for pattern, pattern_definition in definition['patternProperties'].items()
+        ]
+
+    def build_required_and_additional(self, definition):
+        required = definition.get('required')
+        if required is not None and not isinstance(required, (list, tuple)):
+            raise JsonSchemaDefinitionException('required must be an array')
+        additional = None
+        if 'additionalProperties' in definition:
+            additional_definition = definition['additionalProperties']
+            if additional_definition == True:  # pylint: disable=singleton-comparison
+                additional = True
+            elif additional_definition:
+                additional = self.build(additional_definition)
+            else:
+                additional = False
+        return check_required_and_additional, (
+            required,
+            'additionalProperties' in definition,
+            additional,
+            list(definition.get('properties', {}).keys()),
+        )
+
+    def build_dependencies(self, definition):
+        dependencies = []
+        for key, values in definition['dependencies'].items():
+            if values == [] or values is True:
+                continue
+            if values is False or isinstance(values, list):
+                dependencies.append((key, values))
+            else:
+                dependencies.append((key, self.build(values)))
+        return check_dependencies, dependencies
+
+    def build_exclusive_minimum(self, definition):
+        if not isinstance(definition['exclusiveMinimum'], (int, float)):
+            raise JsonSchemaDefinitionException('exclusiveMinimum must be an integer or a float')
+        return check_exclusive_minimum, definition['exclusiveMinimum']
+
+    def build_exclusive_maximum(self, definition):
+        if not isinstance(definition['exclusiveMaximum'], (int, float)):
+            raise JsonSchemaDefinitionException('exclusiveMaximum must be an integer or a float')
+        return check_exclusive_maximum, definition['exclusiveMaximum']
+
+    def build_property_names(self, definition):
+        property_names_definition = definition.get('propertyNames', {})
+        if property_names_definition is True:
+            return None
+        if property_names_definition is False:
+            return check_property_names_false, None
+        return check_property_names, self.build(property_names_definition)
+
+    def build_contains(self, definition):
+        contains_definition = definition['contains']
+        if contains_definition is False or contains_definition is True:
+            return check_contains_boolean, contains_definition
+        return check_contains, self.build(contains_definition)
+
+    def build_const(self, definition):
+        return check_const, definition['const']
+
+    def build_if_then_else(self, definition):
+        return check_if_then_else, (
+            self.build(definition['if']),
+            self.build(definition['then']) if 'then' in definition else None,
+            self.build(definition['else']) if 'else' in definition else None,
+        )
+
+    def build_content_encoding(self, definition):
+        if definition['contentEncoding'] == 'base64':
+            return check_content_encoding, None
+        return None
+
+    def build_content_media_type(self, definition):
+        if definition['contentMediaType'] == 'application/json':
+            return check_content_media_type, None
+        return None
+
+
+def validate_node(node, value, path, context):
+    """
+    Validates ``value`` at ``path`` by ``node`` and returns it (changed by
+    ``contentEncoding`` or ``contentMediaType``).
+    """
+    if not node.keyed:
+        for check, argument in node.checks:
+            value = check(argument, value, node, path, context)
+        return value
+    keys = context.keys
+    context.keys = None
+    try:
+        for check, argument in node.checks:
+            value = check(argument, value, node, path, context)
+    finally:
+        context.keys = keys
+    return value
+
+
+def object_keys(value, context):
+    """
+    Returns keys of object ``value`` shared by checks of the current node, the same
+    way as ``{variable}_keys`` in generated code.
+    """
+    keys = context.keys
+    if keys is None:
+        keys = context.keys = set(value.keys())
+    return keys
+
+
+def error(message, value, node, rule, path, context, **kwargs):
+    return JsonSchemaValidationException(
+        message, value=value, definition=node.definition, rule=rule, path=context.root_path + path,
+        root_object=context.root_object, special_fields_extractor=context.special_fields_extractor, **kwargs
+    )
+
+
+def is_list(value):
+    return isinstance(value, Sequence) and not isinstance(value, str)
+
+
+# Checks get argument prepared by the builder, value, its node, path and context
+# and return the value (changed only by the content keywords).
+# pylint: disable=unused-argument
+
+def check_false(argument, value, node, path, context):
+    raise error('must not be there', value, node, None, path, context)
+
+
+def check_ref(target, value, node, path, context):
+    validate_node(target, value, path, context)
+    return value
+
+
+def check_type(argument, value, node, path, context):
+    python_types, integer_float, exclude_bool, exclude_str, types = argument
+    if (
+        (not isinstance(value, python_types) and not (integer_float and isinstance(value, float) and value.is_integer()))
+        or (exclude_bool and isinstance(value, bool))
+        or (exclude_str and isinstance(value, str))
+    ):
+        raise error('must be {}, but is a: {}'.format(types, type(value).__name__), value, node, 'type', path, context)
+    return value
+
+
+def check_enum(enum, value, node, path, context):
+    if value not in enum:
+        raise error('must be one of {} but is: {}'.format(enum, value), value, node, 'enum', path, context)
+    return value
+
+
+def check_all_of(nodes, value, node, path, context):
+    for item in nodes:
+        value = validate_node(item, value, path, context)
+    return value
+
+
+def check_any_of(nodes, value, node, path, context):
+    errors = []
+    for item in nodes:
+        try:
+            return validate_node(item, value, path, context)
+        except JsonSchemaValidationException as exc:
+            errors.append(exc)
+    raise_best_anyof_error(value, context.root_object, context.root_path + path, errors, context.special_fields_extractor, node.definition)
+    return value
+
+
+def check_one_of(nodes, value, node, path, context):
+    count = 0
+    for item in nodes:
+        if count >= 2:
+            break
+        try:
+            value = validate_node(item, value, path, context)
+            count += 1
+        except JsonSchemaValidationException:
+            pass
+    if count != 1:
+        raise error('must be valid exactly by one of oneOf definition', value, node, 'oneOf', path, context)
+    return value
+
+
+def check_not_true(argument, value, node, path, context):
+    raise error('must not be there', value, node, 'not', path, context)
+
+
+def check_not(not_node, value, node, path, context):
+    try:
+        validate_node(not_node, value, path, context)
+    except JsonSchemaValidationException:
+        return value
+    raise error('must not be valid by not definition', value, node, 'not', path, context)
+
+
+def check_min_length(min_length, value, node, path, context):
+    if isinstance(value, str) and len(value) < min_length:
+        raise error('must be longer than or equal to {} characters'.format(min_length), value, node, 'minLength', path, context)
+    return value
+
+
+def check_max_length(max_length, value, node, path, context):
+    if isinstance(value, str) and len(value) > max_length:
+        raise error('must be shorter than or equal to {} characters'.format(max_length), value, node, 'maxLength', path, context)
+    return value
+
+
+def check_pattern(argument, value, node, path, context):
+    search, pattern = argument
+    if isinstance(value, str) and not search(value):
+        raise error('"{}" does not match pattern "{}"'.format(value, pattern), value, node, 'pattern', path, context)
+    return value
+
+
+def check_format(argument, value, node, path, context):
+    match, format_ = argument
+    if isinstance(value, str) and not match(value):
+        raise error('must be {}'.format(format_), value, node, 'format', path, context)
+    return value
+
+
+def check_format_regex(argument, value, node, path, context):
+    if isinstance(value, str):
+        try:
+            re.compile(value)
+        except Exception:  # pylint: disable=broad-except
+            raise error('must be a valid regex', value, node, 'format', path, context)
+    return value
+
+
+def check_minimum(argument, value, node, path, context):
+    minimum, exclusive = argument
+    if isinstance(value, (int, float)):
+        if exclusive and value <= minimum:
+            raise error('must be bigger than {}'.format(minimum), value, node, 'minimum', path, context)
+        if not exclusive and value < minimum:
+            raise error('must be bigger than or equal to {}'.format(minimum), value, node, 'minimum', path, context)
+    return value
+
+
+def check_maximum(argument, value, node, path, context):
+    maximum, exclusive = argument
+    if isinstance(value, (int, float)):
+        if exclusive and value >= maximum:
+            raise error('must be smaller than {}'.format(maximum), value, node, 'maximum', path, context)
+        if not exclusive and value > maximum:
+            raise error('must be smaller than or equal to {}'.format(maximum), value, node, 'maximum', path, context)
+    return value
+
+
+def check_multiple_of(multiple_of, value, node, path, context):
+    if isinstance(value, (int, float)):
+        if isinstance(multiple_of, float):
+            quotient = decimal.Decimal(repr(value)) / decimal.Decimal(repr(multiple_of))
+        else:
+            quotient = value / multiple_of
+        if int(quotient) != quotient:
+            raise error('must be multiple of {}'.format(multiple_of), value, node, 'multipleOf', path, context)
+    return value
+
+
+def check_min_items(min_items, value, node, path, context):
+    if is_list(value) and len(value) < min_items:
+        raise error('must contain at least {} items'.format(min_items), value, node, 'minItems', path, context)
+    return value
+
+
+def check_max_items(max_items, value, node, path, context):
+    if is_list(value) and len(value) > max_items:
+        raise error('must contain less than or equal to {} items'.format(max_items), value, node, 'maxItems', path, context)
+    return value
+
+
+def check_unique_items(argument, value, node, path, context):
+    if is_list(value) and len(value) > len(set(str(item) for item in value)):
+        raise error('must contain unique items', value, node, 'uniqueItems', path, context)
+    return value
+
+
+def check_items_false(argument, value, node, path, context):
+    if is_list(value) and value:
+        raise error('must be empty, because items definition is False', value, node, 'items', path, context)
+    return value
+
+
+def check_items_tuple(argument, value, node, path, context):
+    items, no_additional, additional_node = argument
+    if not is_list(value):
+        return value
+    length = len(value)
+    for idx, (item_node, has_default, default) in enumerate(items):
+        if length > idx:
+            validate_node(item_node, value[idx], path + [idx], context)
+        elif has_default:
+            value.append(copy.deepcopy(default))
+    if no_additional:
+        if length > len(items):
+            raise error('must contain only specified items', value, node, 'items', path, context)
+    elif additional_node is not None:
+        for idx, item in enumerate(value[len(items):], len(items)):
+            validate_node(additional_node, item, path + [idx], context)
+    return value
+
+
+def check_items(item_node, value, node, path, context):
+    if is_list(value):
+        for idx, item in enumerate(value):
+            validate_node(item_node, item, path + [idx], context)
+    return value
+
+
+def check_min_properties(min_properties, value, node, path, context):
+    if isinstance(value, Mapping) and len(value) < min_properties:
+        raise error('must contain at least {} properties'.format(min_properties), value, node, 'minProperties', path, context)
+    return value
+
+
+def check_max_properties(max_properties, value, node, path, context):
+    if isinstance(value, Mapping) and len(value) > max_properties:
+        raise error('must contain less than or equal to {} properties'.format(max_properties), value, node, 'maxProperties', path, context)
+    return value
+
+
+
+
+def check_properties(properties, value, node, path, context):
+    if isinstance(value, Mapping):
+        keys = object_keys(value, context)
+        for key, prop_node, has_default, default in properties:
+            if key in keys:
+                keys.remove(key)
+                validate_node(prop_node, value[key], path + [key], context)
+            elif has_default:
+                value[key] = copy.deepcopy(default)
+    return value
+
+
+def check_pattern_properties(patterns, value, node, path, context):
+    if isinstance(value, Mapping):
+        keys = object_keys(value, context)
+        for key, item in value.items():
+            for search, pattern_node in patterns:
+                if search(key):
+                    if key in keys:
+                        keys.remove(key)
+                    validate_node(pattern_node, item, path + [key], context)
+    return value
+
+
+def check_required_and_additional(argument, value, node, path, context):
+    required, has_additional, additional, properties_keys = argument
+    if not isinstance(value, Mapping):
+        return value
+    missing = []
+    extra = []
+    if required is not None and not all(prop in value for prop in required):
+        missing = sorted(set(required) - value.keys())
+    if has_additional and additional is not True:
+        keys = object_keys(value, context)
+        if additional is False:
+            extra = list(keys)
+        else:
+            for key in keys:
+                if key not in properties_keys:
+                    validate_node(additional, value.get(key), path + [key], context)
+    if missing or extra:
+        raise error(
+            'missing/extra properties', value, node, 'required-additionalProperties', path, context,
+            missing_fields=missing, extra_fields=extra,
+        )
+    return value
+
+
+def check_dependencies(dependencies, value, node, path, context):
+    if isinstance(value, Mapping):
+        keys = object_keys(value, context)
+        for key, values in dependencies:
+            if key not in keys:
+                continue
+            if values is False:
+                raise error('{} must not be there'.format(key), value, node, 'dependencies', path, context)
+            if isinstance(values, list):
+                for dependency in values:
+                    if dependency not in keys:
+                        raise error('missing dependency {} for {}'.format(dependency, key), value, node, 'dependencies', path, context)
+            else:
+                value = validate_node(values, value, path, context)
+    return value
+
+
+def check_exclusive_minimum(exclusive_minimum, value, node, path, context):
+    if isinstance(value, (int, float)) and value <= exclusive_minimum:
+        raise error('must be bigger than {}'.format(exclusive_minimum), value, node, 'exclusiveMinimum', path, context)
+    return value
+
+
+def check_exclusive_maximum(exclusive_maximum, value, node, path, context):
+    if isinstance(value, (int, float)) and value >= exclusive_maximum:
+        raise error('must be smaller than {}'.format(exclusive_maximum), value, node, 'exclusiveMaximum', path, context)
+    return value
+
+
+def check_property_names_false(argument, value, node, path, context):
+    if isinstance(value, Mapping) and object_keys(value, context):
+        raise error('must not be there', value, node, 'propertyNames', path, context)
+    return value
+
+
+def check_property_names(names_node, value, node, path, context):
+    if isinstance(value, Mapping):
+        for key in value:
+            try:
+                validate_node(names_node, key, path, context)
+            except JsonSchemaValidationException:
+                raise error('must be named by propertyName definition', value, node, 'propertyNames', path, context)
+    return value
+
+
+def check_contains_boolean(contains, value, node, path, context):
+    if is_list(value):
+        if contains is False:
+            raise error('is always invalid', value, node, 'contains', path, context)
+        if not value:
+            raise error('must not be empty', value, node, 'contains', path, context)
+    return value
+
+
+def check_contains(contains_node, value, node, path, context):
+    if is_list(value):
+        for item in value:
+            try:
+                validate_node(contains_node, item, path, context)
+            except JsonSchemaValidationException:
+                continue
+            return value
+        raise error('must contain one of contains definition', value, node, 'contains', path, context)
+    return value
+
+
+def check_const(const, value, node, path, context):
+    if value != const:
+        raise error('must be same as const definition', value, node, 'const', path, context)
+    return value
+
+
+def check_if_then_else(argument, value, node, path, context):
+    if_node, then_node, else_node = argument
+    try:
+        value = validate_node(if_node, value, path, context)
+    except JsonSchemaValidationException:
+        if else_node is not None:
+            value = validate_node(else_node, value, path, context)
+    else:
+        if then_node is not None:
+            value = validate_node(then_node, value, path, context)
+    return value
+
+
+def check_content_encoding(argument, value, node, path, context):
+    if isinstance(value, str):
+        try:
+            value = base64.b64decode(value)
+        except Exception:  # pylint: disable=broad-except
+            raise error('must be encoded by base64', value, node, None, path, context)
+        if value == '':
+            raise error('contentEncoding must be base64', value, node, None, path, context)
+    return value
+
+
+def check_content_media_type(argument, value, node, path, context):
+    if isinstance(value, bytes):
+        try:
+            value = value.decode('utf-8')
+        except Exception:  # pylint: disable=broad-except
+            raise error('must encoded by utf8', value, node, None, path, context)
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except Exception:  # pylint: disable=broad-except
+            raise error('must be valid JSON', value, node, None, path, context)
+    return value
+
+# pylint: enable=unused-argument
+
+
+KEYED_CHECKS = frozenset((
+    check_properties,
+    check_pattern_properties,
+    check_required_and_additional,
+    check_dependencies,
+    check_property_names_false,
+))
+
+
+class TieredValidator:
+    """
+    Callable validator which starts with ``interpreted`` one and switches to validator
+    returned by ``promote()`` (usually compiled one) after ``promote_calls`` calls or
+    after ``promote_ns`` nanoseconds spent by the interpreted validation, whichever
+    comes first (``None`` disables the limit).
+
+    Keyword arguments of calls (such as ``root_path`` or ``budget_ns``) are passed
+    to both validators, so it can be used the same way as the compiled one.
+
+    Promotion is done synchronously by the call reaching the limit, other threads
+    keep using the interpreted validator in the meantime. Other attributes (such as
+    ``stats``) are the ones of the promoted validator, which is promoted for that.
+    """
+
+    def __init__(self, interpreted, promote, promote_calls=100, promote_ns=50_000_000):
+        self.interpreted = interpreted
+        self.promote = promote
+        self.promote_calls = promote_calls
+        self.promote_ns = promote_ns
+        self.calls = 0
+        self.interpreted_ns = 0
+        self._validate = None
+        self._lock = threading.Lock()
+
+    @property
+    def promoted(self):
+        """
+        Returns whether the promoted validator is used.
+        """
+        return self._validate is not None
+
+    def __call__(self, data, **kwargs):
+        validate = self._validate
+        if validate is not None:
+            return validate(data, **kwargs)
+        if (
+            (self.promote_calls is not None and self.calls >= self.promote_calls)
+            or (self.promote_ns is not None and self.interpreted_ns >= self.promote_ns)
+        ):
+            validate = self._promote(blocking=False)
+            if validate is not None:
+                return validate(data, **kwargs)
+        self.calls += 1
+        start = time.perf_counter_ns()
+        try:
+            return self.interpreted(data, **kwargs)
+        finally:
+            self.interpreted_ns += time.perf_counter_ns() - start
+
+    def _promote(self, blocking=True):
+        if not self._lock.acquire(blocking):
+            return None
+        try:
+            if self._validate is None:
+                self._validate = self.promote()
+            return self._validate
+        finally:
+            self._lock.release()
+
+    def __getattr__(self, name):
+        if name in ('interpreted', 'promote', '_validate', '_lock'):
+            raise AttributeError(name)
+        return getattr(self._promote(), name)
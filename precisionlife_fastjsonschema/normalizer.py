@@ -0,0 +1,233 @@
+"""
+Normalization of JSON schema before generating the code.
+
+Schemas generated by tools are often full of wrappers which do not change
+anything but still cost generated code (and time to compile and validate).
+:any:`normalize_schema` returns smaller equivalent schema together with
+the report of what was removed:
+
+.. code-block:: python
+
+    definition, report = normalize_schema({
+        'type': 'object',
+        'allOf': [{'properties': {'a': {'type': 'string'}}}],
+    })
+    # definition == {'type': 'object', 'properties': {'a': {'type': 'string'}}}
+    # report == ['#: allOf with single subschema merged into parent']
+
+Validation results, paths and rules of errors stay the same, only attribute
+``definition`` of the error can be the simplified subschema. Nodes referenced by
+some JSON pointer in ``$ref`` (and subschemas with own ``$id``) are never changed.
+"""
+
+from urllib import parse as urlparse
+
+from .ref_resolver import escape_pointer_part
+
+
+# Keywords which never generate any code (besides ``default`` which is used by parent).
+ANNOTATION_KEYWORDS = (
+    '$schema', '$comment', 'title', 'description', 'default', 'examples', 'definitions', 'readOnly', 'writeOnly',
+)
+# Keywords checked before ``allOf`` in all drafts.
+KEYWORDS_BEFORE_ALL_OF = ('type', 'enum')
+# Keywords with subschemas validating the same value as the parent.
+IN_PLACE_KEYWORDS = ('allOf', 'anyOf', 'oneOf', 'not', 'if', 'then', 'else')
+# Keywords changing the validated data or the value in the generated code.
+SIDE_EFFECT_KEYWORDS = ('default', 'contentEncoding', 'contentMediaType', '$ref')
+
+
+def normalize_schema(definition):
+    """
+    Returns pair of simplified copy of ``definition`` and list of messages what was
+    simplified (each prefixed by JSON pointer of changed node):
+
+     * ``allOf`` with single subschema is merged into its parent when the order of
+       checks does not change,
+     * nested ``allOf`` in ``allOf`` is flattened,
+     * empty (``{}`` or ``true``) subschemas are removed from ``allOf``, subschemas
+       after the first empty one are removed from ``anyOf`` and ``anyOf`` which always
+       passes is removed completely,
+     * ``if`` without ``then`` and ``else`` is removed,
+     * ``additionalProperties`` simplified to empty subschema is replaced by ``true``,
+     * ``type`` of subschema validating the same value is removed when it is already
+       ensured by ``type`` of its parent.
+    """
+    return Normalizer(definition).normalize()
+
+
+class Normalizer:
+    """
+    This class is not supposed to be used directly, use :any:`normalize_schema` instead.
+    """
+
+    def __init__(self, definition):
+        self._definition = definition
+        self._report = []
+        self._referenced_pointers = set()
+        # Boolean schemas are supported since draft-06.
+        self._true_is_empty = not (isinstance(definition, dict) and 'draft-04' in str(definition.get('$schema', '')))
+
+    def normalize(self):
+        self._collect_references(self._definition)
+        return self._normalize(self._definition, ''), self._report
+
+    def _collect_references(self, node):
+        if isinstance(node, list):
+            for item in node:
+                self._collect_references(item)
+        elif isinstance(node, dict):
+            ref = node.get('$ref')
+            if isinstance(ref, str):
+                self._referenced_pointers.add(urlparse.unquote(urlparse.urldefrag(ref)[1]))
+            for key, item in node.items():
+                if key not in ('enum', 'const', 'default', 'examples'):
+                    self._collect_references(item)
+
+    def _is_referenced(self, pointer):
+        """
+        Returns True when node at ``pointer`` or anything inside of it is referenced.
+        """
+        return any(
+            referenced == pointer or referenced.startswith(pointer + '/')
+            for referenced in self._referenced_pointers
+        )
+
+    def _log(self, pointer, message):
+        self._report.append('#{}: {}'.format(pointer, message))
+
+    def _normalize(self, node, pointer):
+        if not isinstance(node, dict) or '$id' in node or 'id' in node:
+            return node
+
+        node = dict(node)
+        for key in ('properties', 'patternProperties', 'definitions', 'dependencies'):
+            if isinstance(node.get(key), dict):
+                node[key] = {
+                    name: self._normalize(item, self._pointer(pointer, key, name))
+                    for name, item in node[key].items()
+                }
+        for key in ('items', 'additionalItems', 'additionalProperties', 'contains', 'propertyNames', *IN_PLACE_KEYWORDS):
+            if isinstance(node.get(key), dict):
+                subschema = self._normalize(node[key], self._pointer(pointer, key))
+                if key == 'additionalProperties' and subschema == {} and node[key] != {}:
+                    # Empty ``additionalProperties`` forbids them in the generated code, same as ``false``.
+                    subschema = True
+                    self._log(self._pointer(pointer, key), 'always valid subschema replaced by true')
+                node[key] = subschema
+            elif isinstance(node.get(key), list) and key != 'not':
+                node[key] = [self._normalize(item, self._pointer(pointer, key, idx)) for idx, item in enumerate(node[key])]
+
+        self._flatten_all_of(node, pointer)
+        self._remove_known_types(node, pointer)
+        self._remove_empty_subschemas(node, pointer)
+        self._merge_single_all_of(node, pointer)
+        return node
+
+    @staticmethod
+    def _pointer(pointer, *parts):
+        return pointer + ''.join('/' + escape_pointer_part(str(part)) for part in parts)
+
+    def _subschemas_in_place(self, node, pointer):
+        """
+        Yields (pointer, subschema) of all subschemas validating the same value as ``node``.
+        """
+        for key in IN_PLACE_KEYWORDS:
+            value = node.get(key)
+            if isinstance(value, dict):
+                yield self._pointer(pointer, key), value
+            elif isinstance(value, list) and key in ('allOf', 'anyOf', 'oneOf'):
+                for idx, item in enumerate(value):
+                    if isinstance(item, dict):
+                        yield self._pointer(pointer, key, idx), item
+
+    def _remove_known_types(self, node, pointer):
+        if not isinstance(node.get('type'), str):
+            return
+        known_type = node['type']
+        for subpointer, subschema in self._subschemas_in_place(node, pointer):
+            types = subschema.get('type')
+            types = [types] if isinstance(types, str) else types
+            if not isinstance(types, list) or '$id' in subschema or 'id' in subschema or self._is_referenced(subpointer):
+                continue
+            if known_type in types or (known_type == 'integer' and 'number' in types):
+                del subschema['type']
+                self._log(subpointer, 'type already ensured by parent removed')
+
+    def _flatten_all_of(self, node, pointer):
+        # Nested ``anyOf`` is not flattened, it would change which error is picked as the best one.
+        all_of = node.get('allOf')
+        if not isinstance(all_of, list) or self._is_referenced(self._pointer(pointer, 'allOf')):
+            return
+        result = []
+        for idx, subschema in enumerate(all_of):
+            if isinstance(subschema, dict) and list(subschema) == ['allOf'] and isinstance(subschema['allOf'], list):
+                result.extend(subschema['allOf'])
+                self._log(self._pointer(pointer, 'allOf', idx), 'nested allOf flattened')
+            else:
+                result.append(subschema)
+        node['allOf'] = result
+
+    def _remove_empty_subschemas(self, node, pointer):
+        if isinstance(node.get('allOf'), list) and not self._is_referenced(self._pointer(pointer, 'allOf')):
+            all_of = [subschema for subschema in node['allOf'] if not self._is_empty(subschema)]
+            if len(all_of) < len(node['allOf']):
+                self._log(self._pointer(pointer, 'allOf'), 'empty subschemas removed')
+            if all_of:
+                node['allOf'] = all_of
+            else:
+                del node['allOf']
+
+        if isinstance(node.get('anyOf'), list) and not self._is_referenced(self._pointer(pointer, 'anyOf')):
+            any_of = node['anyOf']
+            for idx, subschema in enumerate(any_of):
+                if self._is_empty(subschema):
+                    if not any(self._has_side_effects(item) for item in any_of[:idx]):
+                        del node['anyOf']
+                        self._log(self._pointer(pointer, 'anyOf'), 'always valid anyOf removed')
+                    elif idx + 1 < len(any_of):
+                        node['anyOf'] = any_of[:idx + 1]
+                        self._log(self._pointer(pointer, 'anyOf'), 'subschemas after empty subschema removed')
+                    break
+
+        if (
+            'if' in node and 'then' not in node and 'else' not in node
+            and not self._has_side_effects(node['if'])
+            and not self._is_referenced(self._pointer(pointer, 'if'))
+        ):
+            del node['if']
+            self._log(self._pointer(pointer, 'if'), 'if without then and else removed')
+
+    def _is_empty(self, subschema):
+        return subschema == {} or (subschema is True and self._true_is_empty)
+
+    def _merge_single_all_of(self, node, pointer):
+        all_of = node.get('allOf')
+        if (
+            not isinstance(all_of, list) or len(all_of) != 1 or not isinstance(all_of[0], dict)
+            or self._is_referenced(self._pointer(pointer, 'allOf'))
+        ):
+            return
+        subschema = all_of[0]
+        keywords = [key for key in node if key != 'allOf' and key not in ANNOTATION_KEYWORDS]
+        if (
+            any(key not in KEYWORDS_BEFORE_ALL_OF for key in keywords)
+            or any(key in node for key in subschema)
+            or ('enum' in node and 'type' in subschema)
+            # Keywords next to ``$ref`` are ignored and ``default`` is used only in subschema of properties.
+            or any(key in subschema for key in ('$id', 'id', '$ref', 'default'))
+        ):
+            return
+        del node['allOf']
+        node.update(subschema)
+        self._log(self._pointer(pointer, 'allOf'), 'allOf with single subschema merged into parent')
+
+    def _has_side_effects(self, node):
+        if isinstance(node, list):
+            return any(self._has_side_effects(item) for item in node)
+        if not isinstance(node, dict):
+            return False
+        return any(
+            key in SIDE_EFFECT_KEYWORDS or (key not in ('enum', 'const', 'examples') and self._has_side_effects(value))
+            for key, value in node.items()
+        )
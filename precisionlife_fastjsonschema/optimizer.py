@@ -0,0 +1,232 @@
+"""
+Optimizer of generated code.
+
+Keyword generators emit code line by line and do not know what was emitted
+before them. For example every keyword applicable only to strings wraps its
+check with ``if isinstance(data, str):`` even when ``type`` already ensured
+that the value is a string. Therefore generated lines (pairs of indentation
+level and code) are turned into a tree of blocks and simplified before they
+are joined together:
+
+ * ``type`` check leaves :any:`TypeFact` in the code saying which kinds of
+   values can reach the following code,
+ * type guards (see ``TYPE_GUARDS``) which always pass are replaced by their
+   body and those which never pass are removed together with their body,
+ * adjacent blocks with the same type guard are merged,
+ * variables ``*_is_dict`` and ``*_is_list`` which are not used anymore are
+   not created at all.
+
+Values are classified into kinds: ``null``, ``bool``, ``int``, ``float``,
+``str``, ``list`` (any sequence except string), ``dict`` (any mapping) and
+``other``. It is expected that no value is both mapping and sequence.
+"""
+
+import collections
+import re
+
+
+ALL_KINDS = frozenset(('null', 'bool', 'int', 'float', 'str', 'list', 'dict', 'other'))
+
+# Kinds of values which can pass ``type`` check of given JSON type.
+JSON_TYPE_TO_KINDS = {
+    'null': {'null'},
+    'boolean': {'bool'},
+    'number': {'int', 'float'},
+    'integer': {'int', 'float'},
+    'string': {'str'},
+    'array': {'list'},
+    'object': {'dict'},
+}
+
+# Conditions used by keyword generators for applying the keyword only to some
+# values and kinds of values for which the condition is true.
+TYPE_GUARDS = (
+    ('if isinstance({variable}, str):', {'str'}),
+    ('if isinstance({variable}, (int, float)):', {'int', 'float', 'bool'}),
+    ('if {variable}_is_list:', {'list'}),
+    ('if {variable}_is_dict:', {'dict'}),
+)
+
+TYPE_GUARDS_REGEXS = [
+    (re.compile('^' + re.escape(template).replace(re.escape('{variable}'), r'(\w+)') + '$'), frozenset(kinds))
+    for template, kinds in TYPE_GUARDS
+]
+ASSIGNMENT_REGEX = re.compile(r'^(\w+) = ')
+FOR_TARGET_REGEX = re.compile(r'^for (.+?) in ')
+TYPE_VARIABLE_REGEX = re.compile(r'^(\w+_is_(?:dict|list)) = ')
+TYPE_VARIABLE_USAGE_REGEX = re.compile(r'\b(\w+_is_(?:dict|list))\b')
+
+
+class TypeFact:
+    """
+    Marker in the generated code (not emitted) saying that following code at the same
+    level is reached only when value of ``variable`` is one of ``kinds``.
+    """
+
+    __slots__ = ('variable', 'kinds')
+
+    def __init__(self, variable, kinds):
+        self.variable = variable
+        self.kinds = frozenset(kinds)
+
+
+class Block:
+    __slots__ = ('code', 'children')
+
+    def __init__(self, code):
+        self.code = code
+        self.children = []
+
+
+def type_kinds(types):
+    """
+    Returns kinds of values passing ``type`` check generated for list of JSON ``types``.
+    """
+    kinds = set()
+    for type_ in types:
+        kinds |= JSON_TYPE_TO_KINDS[type_]
+    # Check of array replaces exclusion of booleans from numbers in generated code.
+    if kinds & {'int', 'float'} and 'list' in kinds and 'str' not in kinds:
+        kinds.add('bool')
+    return kinds
+
+
+def optimize(code):
+    """
+    Returns optimized ``code`` given as list of pairs of indentation level and code
+    (or :any:`TypeFact`) as the same list without any :any:`TypeFact`.
+    """
+    root = _build_tree(code)
+    root.children, _ = _optimize_block(root.children, {})
+    for function in root.children:
+        _remove_unused_type_variables(function)
+    result = []
+    _flatten(root.children, 0, result)
+    return result
+
+
+def _build_tree(code):
+    root = Block(None)
+    stack = [(-1, root)]
+    for indent, line in code:
+        while stack[-1][0] >= indent:
+            stack.pop()
+        block = Block(line)
+        stack[-1][1].children.append(block)
+        stack.append((indent, block))
+    return root
+
+
+def _match_type_guard(block):
+    if not block.children or not block.code.startswith('if '):
+        return None
+    for regex, kinds in TYPE_GUARDS_REGEXS:
+        match = regex.match(block.code)
+        if match:
+            return match.group(1), kinds
+    return None
+
+
+def _assigned_variables(code):
+    if code.startswith('for '):
+        match = FOR_TARGET_REGEX.match(code)
+        return {name.strip() for name in match.group(1).split(',')}
+    if ' = ' in code:
+        match = ASSIGNMENT_REGEX.match(code)
+        if match:
+            return {match.group(1)}
+    return set()
+
+
+def _optimize_block(children, facts):
+    """
+    Returns optimized ``children`` and names of all variables assigned in them.
+    Known ``facts`` (variable to possible kinds) are updated by facts valid after
+    ``children``.
+    """
+    result = []
+    assigned = set()
+    for idx, block in enumerate(children):
+        if isinstance(block.code, TypeFact):
+            fact = block.code
+            facts[fact.variable] = facts.get(fact.variable, ALL_KINDS) & fact.kinds
+            continue
+
+        guard = _match_type_guard(block)
+        if guard and idx + 1 < len(children):
+            next_code = children[idx + 1].code
+            if isinstance(next_code, str) and next_code.startswith(('else', 'elif')):
+                guard = None
+        if guard:
+            variable, kinds = guard
+            known = facts.get(variable, ALL_KINDS)
+            if not known & kinds:
+                continue
+            if known <= kinds:
+                block_children, block_assigned = _optimize_block(block.children, facts)
+                result.extend(block_children)
+                assigned |= block_assigned
+                continue
+            block.children, block_assigned = _optimize_block(block.children, dict(facts, **{variable: known & kinds}))
+            if result and result[-1].code == block.code:
+                result[-1].children.extend(block.children)
+            else:
+                result.append(block)
+        else:
+            block_assigned = _assigned_variables(block.code)
+            if block.children:
+                inner_facts = {} if block.code.startswith('def ') else dict(facts)
+                for name in block_assigned:
+                    inner_facts.pop(name, None)
+                block.children, children_assigned = _optimize_block(block.children, inner_facts)
+                block_assigned |= children_assigned
+            result.append(block)
+
+        # Facts about reassigned variables are not valid anymore.
+        for name in block_assigned:
+            facts.pop(name, None)
+        assigned |= block_assigned
+    return result, assigned
+
+
+def _remove_unused_type_variables(function):
+    assignments = collections.Counter()
+    usages = collections.Counter()
+    _count_type_variables(function, assignments, usages)
+    unused = {name for name, count in assignments.items() if usages[name] == count}
+    if unused:
+        _remove_assignments(function, unused)
+
+
+def _count_type_variables(block, assignments, usages):
+    for child in block.children:
+        if '_is_' in child.code:
+            match = TYPE_VARIABLE_REGEX.match(child.code)
+            if match:
+                assignments[match.group(1)] += 1
+            usages.update(TYPE_VARIABLE_USAGE_REGEX.findall(child.code))
+        if child.children:
+            _count_type_variables(child, assignments, usages)
+
+
+def _remove_assignments(block, names):
+    children = []
+    for child in block.children:
+        if child.children:
+            _remove_assignments(child, names)
+        elif '_is_' in child.code:
+            match = TYPE_VARIABLE_REGEX.match(child.code)
+            if match and match.group(1) in names:
+                continue
+        children.append(child)
+    block.children = children
+
+
+def _flatten(blocks, indent, result):
+    for block in blocks:
+        result.append((indent, block.code))
+        if block.children:
+            _flatten(block.children, indent + 1, result)
+        elif block.code.endswith(':'):
+            # All code of the block was optimized out.
+            result.append((indent + 1, 'pass'))
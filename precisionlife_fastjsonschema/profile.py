@@ -0,0 +1,111 @@
+"""
+Profile-guided compilation of validators.
+
+Order of checks is by default the order of keywords in the draft and branches
+of ``anyOf`` are tried in the order of the schema. When the data are skewed
+(most of them match the last branch or fail the same check), the validator
+does needless work. Record a profile from representative data by instrumented
+validator and compile the production one with it:
+
+.. code-block:: python
+
+    validate = fastjsonschema.compile(definition, instrument=True)
+    for data in corpus:
+        try:
+            validate(data)
+        except fastjsonschema.JsonSchemaValidationException:
+            pass
+    with open('profile.json', 'w') as f:
+        json.dump(validate.stats(), f)
+
+    validate = fastjsonschema.compile(definition, profile='profile.json')
+
+Validator compiled with a profile:
+
+ * tries branches of ``anyOf`` in order of their observed matches (the most
+   frequent one first) unless any branch has side effects (``default``,
+   ``contentEncoding`` or ``contentMediaType``), errors of failed branches are
+   still reported as without profile,
+ * orders checks of the same value without side effects (such as ``pattern``
+   or ``maximum``, see ``REORDERABLE_KEYWORDS``) so the most frequently failing
+   cheap ones come first, other keywords stay in their places.
+
+Valid data pass the same, but for data failing more reordered checks of one
+subschema, the first reported error can be different. Branches of ``oneOf`` are
+not reordered, all of them are always tried anyway.
+"""
+
+import json
+
+
+# Keywords checking only the value itself, so they can be evaluated in any order,
+# with relative costs of their checks.
+REORDERABLE_KEYWORDS = {
+    'enum': 2,
+    'const': 1,
+    'minLength': 1,
+    'maxLength': 1,
+    'pattern': 5,
+    'format': 5,
+    'minimum': 1,
+    'maximum': 1,
+    'exclusiveMinimum': 1,
+    'exclusiveMaximum': 1,
+    'multipleOf': 1,
+    'minItems': 1,
+    'maxItems': 1,
+    'uniqueItems': 20,
+    'minProperties': 1,
+    'maxProperties': 1,
+}
+
+
+class Profile:
+    """
+    Counters of validation recorded by instrumented validator, as returned by its
+    ``stats()`` (see :any:`Instrumentation`).
+    """
+
+    def __init__(self, stats):
+        self.keywords = stats.get('keywords', {})
+        self.branches = stats.get('branches', {})
+
+    @classmethod
+    def load(cls, path):
+        """
+        Returns profile saved as JSON in file ``path``.
+        """
+        with open(path, encoding='utf-8') as profile_file:
+            return cls(json.load(profile_file))
+
+    def branch_order(self, pointer, count):
+        """
+        Returns indexes of ``count`` branches of ``anyOf`` or ``oneOf`` at ``pointer``
+        ordered by their matches, branches matched equally keep their order.
+        """
+        matches = self.branches.get(pointer)
+        if not matches or len(matches) != count:
+            return list(range(count))
+        return sorted(range(count), key=lambda idx: -matches[idx])
+
+    def keyword_order(self, pointer, keywords):
+        """
+        Returns ``keywords`` of subschema at ``pointer`` with ``REORDERABLE_KEYWORDS``
+        ordered by their failure rate per cost in places of these keywords.
+        """
+        counters = self.keywords.get(pointer)
+        if not counters:
+            return list(keywords)
+
+        def priority(keyword):
+            keyword_counters = counters.get(keyword)
+            if not keyword_counters or not keyword_counters['evaluations']:
+                return 0
+            return keyword_counters['failures'] / keyword_counters['evaluations'] / REORDERABLE_KEYWORDS[keyword]
+
+        reorderable = sorted(
+            (keyword for keyword in keywords if keyword in REORDERABLE_KEYWORDS),
+            key=lambda keyword: -priority(keyword),
+        )
+        reordered = iter(reorderable)
+        return [next(reordered) if keyword in REORDERABLE_KEYWORDS else keyword for keyword in keywords]
@@ -7,13 +7,25 @@ Code adapted from https://github.com/Julian/jsonschema
 """
 
 import contextlib
+import functools
 import json
+import pkgutil
 import re
+import time
 from urllib import parse as urlparse
 from urllib.parse import unquote
 from urllib.request import urlopen
 
 from .exceptions import JsonSchemaDefinitionException
+from .store import RefStore, store_document
+
+# Meta schemas are shipped with the package so referencing them never needs network access.
+META_SCHEMA_FILES = {
+    'http://json-schema.org/draft-04/schema': 'schemas/draft-04.json',
+    'http://json-schema.org/draft-06/schema': 'schemas/draft-06.json',
+    'http://json-schema.org/draft-07/schema': 'schemas/draft-07.json',
+}
+_META_SCHEMAS = {}
 
 
 def get_id(schema):
@@ -23,6 +35,8 @@ def get_id(schema):
     return schema.get('$id', schema.get('id', ''))
 
 
+# Joining is pure but expensive and the same pairs are joined over and over during compilation.
+@functools.lru_cache(maxsize=8192)
 def fixed_urljoin(url0, url1):
     """
     Same as urlparse.urljoin(), but treats all schemes as hierarchical.
@@ -65,10 +79,31 @@ def resolve_path(schema, fragment):
     return schema
 
 
+def escape_pointer_part(part):
+    """
+    Escape one part of JSON pointer according https://tools.ietf.org/html/rfc6901
+    """
+    return str(part).replace('~', '~0').replace('/', '~1')
+
+
+@functools.lru_cache(maxsize=8192)
 def normalize(uri):
     return urlparse.urlsplit(uri).geturl()
 
 
+def get_meta_schema(uri):
+    """
+    Return meta schema shipped with the package for ``uri`` (without fragment)
+    or ``None`` when ``uri`` is not known meta schema. Loaded only once per process.
+    """
+    path = META_SCHEMA_FILES.get(uri.rstrip('#'))
+    if path is None:
+        return None
+    if path not in _META_SCHEMAS:
+        _META_SCHEMAS[path] = json.loads(pkgutil.get_data(__package__, path).decode('utf-8'))
+    return _META_SCHEMAS[path]
+
+
 def resolve_remote(uri, handlers):
     """
     Resolve a remote ``uri``.
@@ -76,7 +111,8 @@ def resolve_remote(uri, handlers):
     .. note::
 
         urllib library is used to fetch requests from the remote ``uri``
-        if handlers does notdefine otherwise.
+        if handlers does notdefine otherwise. See ``HttpFetcher`` for handler
+        with timeouts, keep-alive connections and caching.
     """
     scheme = urlparse.urlsplit(uri).scheme
     try:
@@ -102,16 +138,27 @@ class RefResolver:
     """
 
     # pylint: disable=dangerous-default-value,too-many-arguments
-    def __init__(self, base_uri, schema, store={}, cache=True, handlers={}):
+    def __init__(self, base_uri, schema, store=None, cache=True, handlers={}):
         """
         `base_uri` is URI of the referring document from the `schema`.
+
+        `store` is mapping of URIs to already retrieved remote documents. It can be
+        shared between resolvers, preferably as bounded and thread-safe :any:`RefStore`.
+        When not passed, every resolver has its own.
         """
         self.base_uri = base_uri
         self.resolution_scope = base_uri
         self.schema = schema
-        self.store = store
+        self.store = RefStore() if store is None else store
+        # Subschemas of the `schema` with `$id`. Kept apart from the store, they are valid only for this schema.
+        self.local_store = {}
+        # Normalized URI of document -> (document, dictionary of JSON pointer to node in that document).
+        self.pointer_indexes = {}
         self.cache = cache
         self.handlers = handlers
+        # Number of retrieved remote documents and total time spent by it.
+        self.remote_fetches = 0
+        self.remote_fetch_ns = 0
         self.walk(schema)
 
         # Dictionary used to make sure we will generate unique names for generated functions.
@@ -152,26 +199,59 @@ class RefResolver:
         new_uri = fixed_urljoin(self.resolution_scope, ref)
         uri, fragment = urlparse.urldefrag(new_uri)
 
-        normalized_uri = normalize(uri)
-        if normalized_uri in self.store:
-            schema = self.store[normalized_uri]
-        elif not uri or uri == self.base_uri:
-            schema = self.schema
-        else:
-            schema = resolve_remote(uri, self.handlers)
-            if self.cache:
-                scheme = urlparse.urlsplit(normalized_uri).scheme
-                if scheme != 'internal-no-cache':
-                    self.store[normalized_uri] = schema
-
+        schema = self._resolve_document(uri)
         old_base_uri, old_schema = self.base_uri, self.schema
         self.base_uri, self.schema = uri, schema
         try:
             with self.in_scope(uri):
-                yield resolve_path(schema, fragment)
+                yield self._resolve_pointer(uri, schema, fragment)
         finally:
             self.base_uri, self.schema = old_base_uri, old_schema
 
+    def _resolve_pointer(self, uri, schema, fragment):
+        """
+        Return node of ``schema`` (document of ``uri``) addressed by JSON pointer in ``fragment``.
+        Every document is indexed only once, so it is just a lookup in the dictionary.
+        """
+        normalized_uri = normalize(uri)
+        document_index = self.pointer_indexes.get(normalized_uri)
+        if document_index is None or document_index[0] is not schema:
+            index = {}
+            self._walk(schema, '', index, dereference=False)
+            document_index = self.pointer_indexes[normalized_uri] = (schema, index)
+        index = document_index[1]
+        if fragment not in index:
+            # Different spelling of the pointer (for example percent-encoded).
+            index[fragment] = resolve_path(schema, fragment)
+        return index[fragment]
+
+    def _resolve_document(self, uri):
+        """
+        Return whole document for ``uri`` (without fragment). Document is looked up in
+        subschemas with ``$id``, current document, store and shipped meta schemas,
+        it is retrieved by ``resolve_remote`` only when not found anywhere.
+        """
+        normalized_uri = normalize(uri)
+        schema = self.local_store.get(normalized_uri)
+        if schema is not None:
+            return schema
+        # Local references do not query the store, so its statistics count only other documents.
+        if not uri or uri == self.base_uri:
+            return self.schema
+        schema = self.store.get(normalized_uri)
+        if schema is not None:
+            return schema
+        schema = get_meta_schema(normalized_uri)
+        if schema is not None:
+            return schema
+        started = time.perf_counter_ns()
+        schema = resolve_remote(uri, self.handlers)
+        self.remote_fetches += 1
+        self.remote_fetch_ns += time.perf_counter_ns() - started
+        if self.cache:
+            store_document(self.store, normalized_uri, schema)
+        return schema
+
     def get_uri(self):
         return normalize(self.resolution_scope)
 
@@ -198,20 +278,43 @@ class RefResolver:
 
     def walk(self, node: dict):
         """
-        Walk thru schema and dereferencing ``id`` and ``$ref`` instances
-        """
-        if isinstance(node, bool):
-            pass
-        elif '$ref' in node and isinstance(node['$ref'], str):
-            ref = node['$ref']
-            node['$ref'] = fixed_urljoin(self.resolution_scope, ref)
-        elif ('$id' in node or 'id' in node) and isinstance(get_id(node), str):
-            with self.in_scope(get_id(node)):
-                self.store[normalize(self.resolution_scope)] = node
-                for _, item in node.items():
-                    if isinstance(item, dict):
-                        self.walk(item)
-        else:
-            for _, item in node.items():
-                if isinstance(item, dict):
-                    self.walk(item)
+        Walk thru schema and dereferencing ``id`` and ``$ref`` instances.
+        In the same pass every object and array in the schema is indexed by its JSON pointer.
+        """
+        index = {}
+        self._walk(node, '', index, dereference=True)
+        self.pointer_indexes[normalize(self.base_uri)] = (node, index)
+
+    def _walk(self, node, pointer, index, dereference):
+        index[pointer] = node
+        if isinstance(node, list):
+            for idx, item in enumerate(node):
+                if isinstance(item, (dict, list)):
+                    self._walk(item, '{}/{}'.format(pointer, idx), index, dereference=False)
+            return
+        if not isinstance(node, dict):
+            return
+
+        if dereference:
+            if '$ref' in node and isinstance(node['$ref'], str):
+                ref = node['$ref']
+                node['$ref'] = fixed_urljoin(self.resolution_scope, ref)
+                # Siblings of ``$ref`` are ignored, only indexed.
+                dereference = False
+            elif ('$id' in node or 'id' in node) and isinstance(get_id(node), str):
+                with self.in_scope(get_id(node)):
+                    self.local_store[normalize(self.resolution_scope)] = node
+                    self._walk_items(node, pointer, index, dereference)
+                return
+        self._walk_items(node, pointer, index, dereference)
+
+    def _walk_items(self, node, pointer, index, dereference):
+        for key, item in node.items():
+            if isinstance(item, (dict, list)):
+                # Items of arrays are not dereferenced, only indexed.
+                self._walk(
+                    item,
+                    '{}/{}'.format(pointer, escape_pointer_part(key)),
+                    index,
+                    dereference=dereference and isinstance(item, dict),
+                )
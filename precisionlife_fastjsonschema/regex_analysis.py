@@ -0,0 +1,220 @@
+"""
+Static analysis of regular expressions prone to catastrophic backtracking.
+
+Regular expressions of ``pattern``, ``patternProperties`` and custom formats are
+full Python ones, so a schema can contain one which takes exponential time for
+some strings (ReDoS), such as ``^(a+)+$`` for ``'aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa!'``.
+:any:`analyze_regex` parses the expression (by the parser of :mod:`re`) and finds:
+
+ * nested quantifiers, where a repeated part can be matched by more iterations of
+   the enclosing repetition in different ways (``(a+)+``, ``(\\w+\\s?)*``), but not
+   when it is delimited (``(\\d+\\.)*``),
+ * ambiguous alternation under quantifier, where more alternatives can match the
+   same character (``(\\d+|\\w+)*``, ``(a|aa)*``).
+
+It is a heuristic working with the first characters of repeated parts, so it can
+report also expressions which backtrack only polynomially. Possessive quantifiers
+and atomic groups (since Python 3.11) do not backtrack and are never reported.
+
+What to do with such expression is given by ``regex_policy`` of :any:`compile`:
+``None`` only reports them (see :any:`collect_compile_stats`), ``'warn'`` emits
+:any:`RegexRiskWarning`, ``'reject'`` raises :any:`JsonSchemaDefinitionException`
+and ``'guard'`` matches them only for strings up to ``REGEX_GUARD_LENGTH``
+characters, longer ones do not match.
+"""
+
+import warnings
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants  # pylint: disable=deprecated-module
+    import sre_parse  # pylint: disable=deprecated-module
+
+from .exceptions import JsonSchemaDefinitionException
+
+
+REGEX_POLICIES = (None, 'warn', 'reject', 'guard')
+REGEX_GUARD_LENGTH = 1000
+
+NESTED_QUANTIFIERS = 'has nested quantifiers prone to catastrophic backtracking'
+AMBIGUOUS_ALTERNATION = 'has ambiguous alternation under quantifier prone to catastrophic backtracking'
+
+# Characters the first sets are computed for, ASCII and some of each Unicode category.
+PROBE_CHARS = tuple(chr(code) for code in range(128)) + ('é', '٠', ' ', '一')
+ALL_CHARS = frozenset(PROBE_CHARS)
+CATEGORY_CHARS = {
+    sre_constants.CATEGORY_DIGIT: frozenset(char for char in PROBE_CHARS if char.isdigit()),
+    sre_constants.CATEGORY_SPACE: frozenset(char for char in PROBE_CHARS if char.isspace()),
+    sre_constants.CATEGORY_WORD: frozenset(char for char in PROBE_CHARS if char.isalnum() or char == '_'),
+    sre_constants.CATEGORY_LINEBREAK: frozenset('\n'),
+}
+CATEGORY_CHARS.update({
+    sre_constants.CATEGORY_NOT_DIGIT: ALL_CHARS - CATEGORY_CHARS[sre_constants.CATEGORY_DIGIT],
+    sre_constants.CATEGORY_NOT_SPACE: ALL_CHARS - CATEGORY_CHARS[sre_constants.CATEGORY_SPACE],
+    sre_constants.CATEGORY_NOT_WORD: ALL_CHARS - CATEGORY_CHARS[sre_constants.CATEGORY_WORD],
+    sre_constants.CATEGORY_NOT_LINEBREAK: ALL_CHARS - CATEGORY_CHARS[sre_constants.CATEGORY_LINEBREAK],
+})
+
+REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+POSSESSIVE_REPEAT = getattr(sre_constants, 'POSSESSIVE_REPEAT', None)
+ATOMIC_GROUP = getattr(sre_constants, 'ATOMIC_GROUP', None)
+ZERO_WIDTH = (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT)
+
+
+class RegexRiskWarning(UserWarning):
+    """
+    Warning emitted for regular expression prone to catastrophic backtracking
+    with ``regex_policy='warn'``.
+    """
+
+
+def analyze_regex(pattern):
+    """
+    Returns list of reasons why regular expression ``pattern`` is prone to catastrophic
+    backtracking, empty when it is not (or when it is not valid at all).
+    """
+    try:
+        items = sre_parse.parse(pattern)
+    except Exception:  # pylint: disable=broad-except
+        return []
+    risks = []
+    _walk(list(items), frozenset(), False, risks)
+    return risks
+
+
+def check_regex(pattern, policy, description):
+    """
+    Analyzes ``pattern`` and applies ``policy`` to it when it is risky, ``description``
+    (such as keyword and JSON pointer) is used in the warning or the exception.
+    Returns list of found risks.
+    """
+    if policy not in REGEX_POLICIES:
+        raise JsonSchemaDefinitionException('Unknown regex policy: {}'.format(policy))
+    risks = analyze_regex(pattern)
+    if risks:
+        message = '{} {}'.format(description, ' and '.join(risks))
+        if policy == 'reject':
+            raise JsonSchemaDefinitionException(message)
+        if policy == 'warn':
+            warnings.warn(message, RegexRiskWarning, stacklevel=2)
+    return risks
+
+
+def guard_regex(function, max_length=REGEX_GUARD_LENGTH):
+    """
+    Returns ``function`` (``search`` or ``match`` of compiled expression) which does
+    not match strings longer than ``max_length``.
+    """
+    return lambda value: len(value) <= max_length and function(value)
+
+
+def _walk(items, follow, looping, risks):
+    """
+    Finds risks in sequence ``items`` followed by characters ``follow``. ``looping`` means
+    it is repeated by quantifier, so it can be matched by different iterations.
+    """
+    for idx, (op, av) in enumerate(items):
+        item_follow = _first(items[idx + 1:], follow)
+        if op in REPEATS:
+            min_, max_, body = av
+            body = list(body)
+            if max_ > 1:
+                if looping and _first(body, frozenset()) & item_follow:
+                    _add_risk(risks, NESTED_QUANTIFIERS)
+                _walk(body, _first(body, frozenset()) | item_follow, True, risks)
+            else:
+                _walk(body, item_follow, looping, risks)
+        elif op == POSSESSIVE_REPEAT or op == ATOMIC_GROUP:
+            body = av[2] if op == POSSESSIVE_REPEAT else av
+            _walk(list(body), item_follow, False, risks)
+        elif op == sre_constants.SUBPATTERN:
+            _walk(list(av[-1]), item_follow, looping, risks)
+        elif op == sre_constants.BRANCH:
+            alternatives = [list(alternative) for alternative in av[1]]
+            if looping:
+                seen = frozenset()
+                for alternative in alternatives:
+                    first = _first(alternative, item_follow)
+                    if first & seen:
+                        _add_risk(risks, AMBIGUOUS_ALTERNATION)
+                    seen |= first
+            for alternative in alternatives:
+                _walk(alternative, item_follow, looping, risks)
+
+
+def _add_risk(risks, risk):
+    if risk not in risks:
+        risks.append(risk)
+
+
+def _first(items, follow):
+    """
+    Returns set of characters which sequence ``items`` followed by ``follow`` can start with.
+    """
+    first = set()
+    for op, av in items:
+        item_first, nullable = _first_of_item(op, av)
+        first |= item_first
+        if not nullable:
+            return frozenset(first)
+    return frozenset(first | follow)
+
+
+def _first_of_item(op, av):
+    """
+    Returns pair of set of characters item can start with and whether it can match empty string.
+    """
+    if op == sre_constants.LITERAL:
+        return {chr(av)}, False
+    if op == sre_constants.NOT_LITERAL:
+        return ALL_CHARS - {chr(av)}, False
+    if op == sre_constants.ANY:
+        return ALL_CHARS - {'\n'}, False
+    if op == sre_constants.IN:
+        return _chars_in(av), False
+    if op in ZERO_WIDTH:
+        return set(), True
+    if op in REPEATS or op == POSSESSIVE_REPEAT:
+        min_, _, body = av
+        first, nullable = _first_and_nullable(list(body))
+        return first, nullable or min_ == 0
+    if op == sre_constants.SUBPATTERN:
+        return _first_and_nullable(list(av[-1]))
+    if op == ATOMIC_GROUP:
+        return _first_and_nullable(list(av))
+    if op == sre_constants.BRANCH:
+        first, nullable = set(), False
+        for alternative in av[1]:
+            alternative_first, alternative_nullable = _first_and_nullable(list(alternative))
+            first |= alternative_first
+            nullable = nullable or alternative_nullable
+        return first, nullable
+    # Back references and conditions can match anything.
+    return set(ALL_CHARS), True
+
+
+def _first_and_nullable(items):
+    first = set()
+    for op, av in items:
+        item_first, nullable = _first_of_item(op, av)
+        first |= item_first
+        if not nullable:
+            return first, False
+    return first, True
+
+
+def _chars_in(av):
+    chars, negate = set(), False
+    for op, value in av:
+        if op == sre_constants.NEGATE:
+            negate = True
+        elif op == sre_constants.LITERAL:
+            chars.add(chr(value))
+        elif op == sre_constants.RANGE:
+            chars.update(char for char in PROBE_CHARS if value[0] <= ord(char) <= value[1])
+        elif op == sre_constants.CATEGORY:
+            chars |= CATEGORY_CHARS.get(value, ALL_CHARS)
+        else:
+            chars |= ALL_CHARS
+    return ALL_CHARS - chars if negate else chars
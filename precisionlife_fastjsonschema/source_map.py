@@ -0,0 +1,107 @@
+"""
+Source maps from generated code back to the schema.
+
+Profilers and tracebacks show only generated functions (such as
+``validate___definitions_order``) and line numbers. Validator compiled with
+``source_map=True`` registers its code in :mod:`linecache` (so tracebacks and
+debuggers show the generated lines) and remembers which JSON pointer and
+keyword produced every line:
+
+.. code-block:: python
+
+    validate = fastjsonschema.compile(definition, source_map=True)
+    # py-spy shows hotspot: validate___definitions_order (<fastjsonschema 1f2e3d4c5b6a7988>:120)
+    fastjsonschema.locate_source('<fastjsonschema 1f2e3d4c5b6a7988>', 120)
+    # '#/definitions/order/properties/items/pattern'
+
+Code of validators is compiled with such meaningful file name always, only
+the mapping and registration in :mod:`linecache` are optional.
+"""
+
+import hashlib
+import linecache
+import weakref
+
+from .ref_resolver import escape_pointer_part
+
+
+# File name of generated code to its source map, alive as long as its validator.
+_source_maps = weakref.WeakValueDictionary()
+
+
+class SourceLine(str):
+    """
+    Line of generated code which knows ``source`` (pair of JSON pointer of
+    subschema and keyword) which generated it.
+    """
+
+    def __new__(cls, line, source):
+        instance = super().__new__(cls, line)
+        instance.source = source
+        return instance
+
+
+def code_filename(code, uri=''):
+    """
+    Returns file name used for compiling generated ``code`` of schema ``uri``.
+    """
+    digest = hashlib.sha256(code.encode('utf-8')).hexdigest()[:16]
+    return '<fastjsonschema {}>'.format(' '.join(filter(None, (uri, digest))))
+
+
+class SourceMap:
+    """
+    Mapping of lines of generated ``code`` compiled as ``filename`` to pairs of
+    JSON pointer and keyword (``None`` for lines not generated by any keyword).
+    """
+
+    def __init__(self, filename, code, sources):
+        self.filename = filename
+        self.sources = sources
+        lines = [line + '\n' for line in code.split('\n')]
+        linecache.cache[filename] = (len(code), None, lines, filename)
+        _source_maps[filename] = self
+        weakref.finalize(self, _forget, filename)
+
+    def locate(self, lineno):
+        """
+        Returns JSON pointer of keyword which generated line ``lineno`` (starting by 1),
+        or of the subschema when line was not generated by any keyword.
+        """
+        if not 0 < lineno <= len(self.sources) or self.sources[lineno - 1] is None:
+            return None
+        pointer, keyword = self.sources[lineno - 1]
+        if keyword is None:
+            return pointer
+        return '{}/{}'.format(pointer, escape_pointer_part(keyword))
+
+
+def _forget(filename):
+    # Other validator with the same code could be registered meanwhile.
+    if filename not in _source_maps:
+        linecache.cache.pop(filename, None)
+
+
+def locate_source(filename, lineno):
+    """
+    Returns JSON pointer of keyword which generated line ``lineno`` of ``filename``
+    (as shown by profiler or in traceback), ``None`` when it is not known.
+    """
+    source_map = _source_maps.get(filename)
+    if source_map is None:
+        return None
+    return source_map.locate(lineno)
+
+
+def locate_traceback(traceback):
+    """
+    Returns JSON pointer of keyword of the innermost generated code in ``traceback``
+    (for example ``exc.__traceback__``), ``None`` when there is none.
+    """
+    location = None
+    while traceback is not None:
+        frame_location = locate_source(traceback.tb_frame.f_code.co_filename, traceback.tb_lineno)
+        if frame_location is not None:
+            location = frame_location
+        traceback = traceback.tb_next
+    return location
@@ -0,0 +1,149 @@
+"""
+Store of remote documents retrieved by :any:`RefResolver`.
+
+By default every resolver has its own unlimited store, so documents are fetched
+once per compilation. To share documents between compilations (and threads),
+pass one bounded store to all of them:
+
+.. code-block:: python
+
+    store = RefStore(max_entries=1000, max_bytes=50 * 1024 * 1024, ttl=3600)
+    validate = fastjsonschema.compile(definition, store=store)
+    store.stats()
+    # {'hits': 10, 'misses': 2, 'entries': 2, 'bytes': 1234, 'evictions': 0}
+"""
+
+import collections
+import json
+import threading
+import time
+from urllib import parse as urlparse
+
+
+_MISSING = object()
+
+
+class RefStore(collections.abc.MutableMapping):
+    """
+    Thread-safe mapping from normalized URI to document with LRU eviction.
+
+     * ``max_entries`` limits number of documents,
+     * ``max_bytes`` limits approximate size of documents (length of its JSON),
+     * ``ttl`` is number of seconds after which document expires,
+     * ``policies`` maps URI scheme to its own TTL in seconds, where ``0`` means
+       that documents with that scheme are never stored (by default it is the case
+       of ``internal-no-cache`` scheme).
+
+    ``None`` means no limit.
+    """
+
+    DEFAULT_POLICIES = {
+        'internal-no-cache': 0,
+    }
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None, policies=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.policies = dict(self.DEFAULT_POLICIES if policies is None else policies)
+
+        self._lock = threading.RLock()
+        # URI -> (document, size in bytes, expiration time or None); ordered from least recently used.
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, uri, default=None):
+        with self._lock:
+            entry = self._entries.get(uri)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                self._remove(uri)
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return default
+            self._hits += 1
+            self._entries.move_to_end(uri)
+            return entry[0]
+
+    def __getitem__(self, uri):
+        document = self.get(uri, _MISSING)
+        if document is _MISSING:
+            raise KeyError(uri)
+        return document
+
+    def __setitem__(self, uri, document):
+        ttl = self.policies.get(urlparse.urlsplit(uri).scheme, self.ttl)
+        if ttl == 0:
+            return
+        size = len(json.dumps(document, default=repr))
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            if uri in self._entries:
+                self._remove(uri)
+            self._entries[uri] = (document, size, expires)
+            self._bytes += size
+            self._evict()
+
+    def __delitem__(self, uri):
+        with self._lock:
+            if uri not in self._entries:
+                raise KeyError(uri)
+            self._remove(uri)
+
+    def __contains__(self, uri):
+        with self._lock:
+            entry = self._entries.get(uri)
+            return entry is not None and (entry[2] is None or entry[2] > time.monotonic())
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._entries))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Returns counters of the store as a dictionary.
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'evictions': self._evictions,
+            }
+
+    def _remove(self, uri):
+        _, size, _ = self._entries.pop(uri)
+        self._bytes -= size
+
+    def _evict(self):
+        while self._entries and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+
+def store_document(store, uri, document):
+    """
+    Store ``document`` in any mapping. Plain mappings (without own policies) follow
+    the default policies of :any:`RefStore`.
+    """
+    if not isinstance(store, RefStore):
+        if RefStore.DEFAULT_POLICIES.get(urlparse.urlsplit(uri).scheme) == 0:
+            return
+    store[uri] = document
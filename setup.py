@@ -20,6 +20,7 @@ setup(
     name='precisionlife_fastjsonschema',
     version=VERSION,
     packages=['precisionlife_fastjsonschema'],
+    package_data={'precisionlife_fastjsonschema': ['schemas/*.json']},
     extras_require={
         'devel': [
             'colorama',
@@ -80,3 +80,166 @@ def test_benchmark_bad_values(benchmark, value):
             pass
         else:
             pytest.fail('Exception is not raised')
+
+
+REF_DENSE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'prop{}'.format(idx): {'$ref': '#/definitions/name'}
+        for idx in range(400)
+    },
+    'definitions': {
+        'name': {'type': 'string', 'maxLength': 64},
+    },
+}
+REF_DENSE_VALUE = {'prop{}'.format(idx): 'value' for idx in range(400)}
+
+
+@pytest.mark.benchmark(min_rounds=20, group='ref dense schema')
+@pytest.mark.parametrize('inline_refs', (0, 4))
+def test_benchmark_ref_dense(benchmark, inline_refs):
+    validate = fastjsonschema.compile(REF_DENSE_SCHEMA, inline_refs=inline_refs)
+    benchmark(validate, REF_DENSE_VALUE)
+
+
+REF_CALLS_SCHEMA = {
+    'type': 'array',
+    'items': {'$ref': '#/definitions/node'},
+    'definitions': {
+        'node': {
+            'type': 'object',
+            'properties': {'name': {'$ref': '#/definitions/name'}, 'value': {'$ref': '#/definitions/value'}},
+        },
+        'name': {'type': 'string', 'minLength': 1, 'maxLength': 64, 'pattern': '^[a-z]'},
+        'value': {'type': 'integer', 'minimum': 0, 'maximum': 1000, 'multipleOf': 2},
+    },
+}
+REF_CALLS_VALUE = [{'name': 'node', 'value': idx * 2} for idx in range(200)]
+
+
+@pytest.mark.benchmark(min_rounds=20, group='ref calls')
+def test_benchmark_ref_calls(benchmark):
+    validate = fastjsonschema.compile(REF_CALLS_SCHEMA, inline_refs=0)
+    benchmark(validate, REF_CALLS_VALUE)
+
+
+TREE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'value': {'type': 'integer', 'minimum': 0},
+        'children': {'type': 'array', 'items': {'$ref': '#'}},
+    },
+    'required': ['value'],
+}
+
+
+def make_tree_value(depth):
+    value = {'value': 0}
+    for _ in range(depth):
+        value = {'value': 1, 'children': [{'value': 2}, value]}
+    return value
+
+
+@pytest.mark.benchmark(min_rounds=20, group='deep tree')
+@pytest.mark.parametrize('iterative', (False, True))
+def test_benchmark_deep_tree(benchmark, iterative):
+    validate = fastjsonschema.compile(TREE_SCHEMA, iterative=iterative)
+    benchmark(validate, make_tree_value(200))
+
+
+@pytest.mark.benchmark(min_rounds=20, group='deep tree')
+@pytest.mark.parametrize('depth', (2000, 5000))
+def test_benchmark_deep_tree_iterative_depth(benchmark, depth):
+    validate = fastjsonschema.compile(TREE_SCHEMA, iterative=True)
+    benchmark(validate, make_tree_value(depth))
+
+
+@pytest.mark.benchmark(min_rounds=20, group='instrumentation')
+@pytest.mark.parametrize('instrument', (False, True, 'timing'))
+def test_benchmark_instrumentation(benchmark, instrument):
+    validate = fastjsonschema.compile(REF_CALLS_SCHEMA, inline_refs=0, instrument=instrument)
+    benchmark(validate, REF_CALLS_VALUE)
+
+
+# Events of many kinds where most of them are of one of the last kinds.
+EVENT_SCHEMA = {
+    'type': 'array',
+    'items': {
+        'anyOf': [
+            {
+                'type': 'object',
+                'properties': {'kind': {'const': kind}, 'value': {'type': 'string', 'maxLength': 20}},
+                'required': ['kind', 'value'],
+            }
+            for kind in ('created', 'renamed', 'moved', 'copied', 'archived', 'restored', 'viewed', 'deleted')
+        ],
+    },
+}
+EVENT_VALUE = [{'kind': 'viewed', 'value': 'x'}] * 800 + [
+    {'kind': kind, 'value': 'x'} for kind in ('created', 'renamed', 'moved', 'copied', 'archived', 'restored', 'deleted')
+] * 28
+
+
+def event_profile():
+    validate = fastjsonschema.compile(EVENT_SCHEMA, instrument=True)
+    validate(EVENT_VALUE)
+    return validate.stats()
+
+
+@pytest.mark.benchmark(min_rounds=20, group='profile guided')
+@pytest.mark.parametrize('profiled', (False, True))
+def test_benchmark_profile_guided(benchmark, profiled):
+    validate = fastjsonschema.compile(EVENT_SCHEMA, profile=event_profile() if profiled else None)
+    benchmark(validate, EVENT_VALUE)
+
+
+ORDER_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'id': {'type': 'integer', 'minimum': 1},
+        'customer': {'type': 'string', 'maxLength': 50},
+        'note': {'type': 'string'},
+        'coupon': {'type': 'string'},
+        'lines': {
+            'type': 'array',
+            'items': {
+                'type': 'object',
+                'properties': {
+                    'sku': {'type': 'string'},
+                    'count': {'type': 'integer', 'minimum': 1},
+                    'price': {'type': 'number', 'minimum': 0},
+                    'discount': {'type': 'number'},
+                    'gift': {'type': 'boolean'},
+                },
+                'required': ['sku', 'count', 'price'],
+                'additionalProperties': False,
+            },
+        },
+    },
+    'required': ['id', 'customer', 'lines'],
+    'additionalProperties': False,
+}
+ORDER_VALUE = {'id': 1, 'customer': 'abc', 'lines': [{'sku': 'x', 'count': 1, 'price': 1.5}] * 200}
+
+
+@pytest.mark.benchmark(min_rounds=20, group='adaptive')
+@pytest.mark.parametrize('adaptive', (False, True))
+def test_benchmark_adaptive(benchmark, adaptive):
+    validate = fastjsonschema.compile(ORDER_SCHEMA, adaptive=1 if adaptive else False)
+    validate(ORDER_VALUE)
+    assert not adaptive or validate.wait()
+    benchmark(validate, ORDER_VALUE)
+
+
+@pytest.mark.benchmark(min_rounds=20, group='tiered')
+@pytest.mark.parametrize('engine', ('compile', 'interpret'))
+def test_benchmark_tiered_one_off(benchmark, engine):
+    # Setup and a single validation, as done by `fastjsonschema.validate`.
+    benchmark(lambda: getattr(fastjsonschema, engine)(JSON_SCHEMA)([9, 'hello', [1, 'a', True], {'a': 'a', 'b': 'b', 'd': 'd'}, 42, 3]))
+
+
+@pytest.mark.benchmark(min_rounds=20, group='budget')
+@pytest.mark.parametrize('budget_ns', (None, 10 ** 9))
+def test_benchmark_budget(benchmark, budget_ns):
+    validate = fastjsonschema.compile(EVENT_SCHEMA, budget_ns=budget_ns)
+    benchmark(validate, EVENT_VALUE)
@@ -0,0 +1,226 @@
+import json
+import tracemalloc
+
+import pytest
+
+import precisionlife_fastjsonschema as fastjsonschema
+
+
+def make_remote_documents(count):
+    """
+    Multi-file schema set: every document references the next few ones.
+    """
+    documents = {}
+    for idx in range(count):
+        documents['http://example.com/schemas/doc{}.json'.format(idx)] = {
+            'type': 'object',
+            'properties': {
+                'name': {'type': 'string', 'maxLength': 64},
+                'value': {'type': 'integer', 'minimum': 0},
+                **{
+                    'link{}'.format(other): {'$ref': 'doc{}.json'.format(other)}
+                    for other in range(idx + 1, min(idx + 4, count))
+                },
+            },
+            'required': ['name'],
+        }
+    return documents
+
+
+# Stored as text, so the handler pays for decoding like a real fetch would (without network latency).
+REMOTE_DOCUMENTS = {uri: json.dumps(document) for uri, document in make_remote_documents(200).items()}
+MULTI_FILE_SCHEMA = {
+    'type': 'array',
+    'items': {'$ref': 'http://example.com/schemas/doc0.json'},
+}
+
+
+def remote_handler(uri):
+    return json.loads(REMOTE_DOCUMENTS[uri])
+
+
+@pytest.mark.benchmark(group='compile multi-file schema')
+def test_benchmark_compile_with_handler(benchmark):
+    benchmark(lambda: fastjsonschema.compile(MULTI_FILE_SCHEMA, handlers={'http': remote_handler}, store={}))
+
+
+@pytest.mark.benchmark(group='compile multi-file schema')
+def test_benchmark_compile_bundled(benchmark):
+    bundled = fastjsonschema.bundle(MULTI_FILE_SCHEMA, handlers={'http': remote_handler}, store={})
+    benchmark(lambda: fastjsonschema.compile(bundled, store={}))
+
+
+def make_schema_with_refs(count):
+    """
+    Schema with ``count`` internal references to a few shared definitions.
+    """
+    return {
+        'type': 'object',
+        'properties': {
+            'prop{}'.format(idx): {'$ref': '#/definitions/def{}'.format(idx % 10)}
+            for idx in range(count)
+        },
+        'definitions': {
+            'def{}'.format(idx): {'type': 'string', 'maxLength': idx + 1}
+            for idx in range(10)
+        },
+    }
+
+
+@pytest.mark.benchmark(group='compile refs')
+@pytest.mark.parametrize('count', [100, 1000, 4000])
+def test_benchmark_compile_refs(benchmark, count):
+    definition = make_schema_with_refs(count)
+    benchmark(lambda: fastjsonschema.compile(definition))
+
+
+def make_wide_schema(width):
+    """
+    Object with ``width`` properties, every one with a few keywords.
+    """
+    return {
+        'type': 'object',
+        'properties': {
+            'prop{}'.format(idx): {'type': 'string', 'maxLength': 10, 'enum': ['a', 'b']}
+            for idx in range(width)
+        },
+        'required': ['prop0'],
+    }
+
+
+def make_deep_schema(depth):
+    """
+    Objects nested ``depth`` levels deep, every level with a sibling property.
+    """
+    definition = {'type': 'string'}
+    for _ in range(depth):
+        definition = {
+            'type': 'object',
+            'properties': {
+                'nested': definition,
+                'value': {'type': 'integer', 'minimum': 0},
+            },
+            'required': ['nested'],
+        }
+    return definition
+
+
+@pytest.mark.benchmark(group='compile width')
+@pytest.mark.parametrize('width', [100, 1000, 5000])
+def test_benchmark_compile_width(benchmark, width):
+    definition = make_wide_schema(width)
+    benchmark(lambda: fastjsonschema.compile(definition))
+
+
+@pytest.mark.benchmark(group='compile depth')
+@pytest.mark.parametrize('depth', [5, 10, 20])
+def test_benchmark_compile_depth(benchmark, depth):
+    definition = make_deep_schema(depth)
+    benchmark(lambda: fastjsonschema.compile(definition))
+
+
+@pytest.mark.benchmark(group='compile code cache')
+def test_benchmark_compile_without_code_cache(benchmark):
+    definition = make_wide_schema(1000)
+    benchmark(lambda: fastjsonschema.compile(definition))
+
+
+@pytest.mark.benchmark(group='compile code cache')
+def test_benchmark_compile_with_code_cache(benchmark):
+    definition = make_wide_schema(1000)
+    code_cache = fastjsonschema.CodeCache()
+    fastjsonschema.compile(definition, code_cache=code_cache)
+    benchmark(lambda: fastjsonschema.compile(definition, code_cache=code_cache))
+
+
+def make_repeated_subschema_schema(count):
+    """
+    Object with ``count`` records, every one with the same inline address objects.
+    """
+    address = {
+        'type': 'object',
+        'properties': {
+            'street': {'type': 'string', 'maxLength': 100},
+            'city': {'type': 'string'},
+            'zip': {'type': 'string', 'pattern': '^[0-9]{5}$'},
+        },
+        'required': ['street', 'city'],
+        'additionalProperties': False,
+    }
+    return {
+        'type': 'object',
+        'properties': {
+            'record{}'.format(idx): {
+                'type': 'object',
+                'properties': {'home': address, 'work': address, 'created': {'type': 'string', 'format': 'date-time'}},
+            }
+            for idx in range(count)
+        },
+    }
+
+
+@pytest.mark.benchmark(group='compile repeated subschemas')
+@pytest.mark.parametrize('deduplicate', [False, True])
+def test_benchmark_compile_repeated_subschemas(benchmark, deduplicate):
+    definition = make_repeated_subschema_schema(200)
+    benchmark(lambda: fastjsonschema.compile(definition, deduplicate=deduplicate))
+
+
+def make_tenant_schemas(count):
+    """
+    Schemas of ``count`` tenants, all built from the same shared definitions.
+    """
+    shared = make_repeated_subschema_schema(20)['properties']
+    return [
+        {
+            'type': 'object',
+            'properties': {**shared, 'tenant': {'const': 'tenant{}'.format(idx)}},
+        }
+        for idx in range(count)
+    ]
+
+
+@pytest.mark.benchmark(group='compile memory of many tenants')
+@pytest.mark.parametrize('pooled', [False, True])
+def test_benchmark_memory_function_pool(benchmark, pooled):
+    definitions = make_tenant_schemas(200)
+
+    def compile_all():
+        function_pool = fastjsonschema.FunctionPool() if pooled else None
+        tracemalloc.start()
+        validators = [fastjsonschema.compile(definition, function_pool=function_pool) for definition in definitions]
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        benchmark.extra_info['memory_kib'] = memory // 1024
+        return validators
+
+    benchmark.pedantic(compile_all, rounds=3)
+
+
+def make_schema_with_many_definitions(count):
+    """
+    Object with ``count`` optional properties, every one referencing its own definition.
+    """
+    return {
+        'type': 'object',
+        'properties': {
+            'prop{}'.format(idx): {'$ref': '#/definitions/def{}'.format(idx)}
+            for idx in range(count)
+        },
+        'definitions': {
+            'def{}'.format(idx): {
+                'type': 'object',
+                'properties': {'name': {'type': 'string', 'maxLength': idx + 1}, 'value': {'type': 'integer'}},
+                'required': ['name'],
+            }
+            for idx in range(count)
+        },
+    }
+
+
+@pytest.mark.benchmark(group='time to first validation')
+@pytest.mark.parametrize('lazy', [False, True])
+def test_benchmark_time_to_first_validation(benchmark, lazy):
+    definition = make_schema_with_many_definitions(3000)
+    data = {'prop{}'.format(idx): {'name': 'x', 'value': idx} for idx in range(0, 3000, 100)}
+    benchmark(lambda: fastjsonschema.compile(definition, lazy=lazy)(data))
@@ -1,10 +1,11 @@
+import copy
 import json
 from pathlib import Path
 
 import pytest
 from urllib.request import urlopen
 
-from precisionlife_fastjsonschema import RefResolver, JsonSchemaValidationException, compile, _get_code_generator_class
+from precisionlife_fastjsonschema import RefResolver, JsonSchemaValidationException, compile, interpret, _get_code_generator_class
 
 
 REMOTES = {
@@ -77,13 +78,15 @@ def template_test(schema_version, schema, data, is_valid):
     if isinstance(schema, dict):
         schema.setdefault('$schema', schema_version)
 
-    validate = compile(schema, handlers={'http': remotes_handler})
-    try:
-        result = validate(data)
-        print('Validate result:', result)
-    except JsonSchemaValidationException:
-        if is_valid:
-            raise
-    else:
-        if not is_valid:
-            pytest.fail('Test should not pass')
+    # Both engines, generated code and interpreter, have to pass the suite.
+    for engine in (compile, interpret):
+        validate = engine(schema, handlers={'http': remotes_handler})
+        try:
+            result = validate(copy.deepcopy(data))
+            print('Validate result:', result)
+        except JsonSchemaValidationException:
+            if is_valid:
+                raise
+        else:
+            if not is_valid:
+                pytest.fail('Test should not pass by {}'.format(engine.__name__))
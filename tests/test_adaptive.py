@@ -0,0 +1,126 @@
+import pytest
+
+from precisionlife_fastjsonschema import AdaptiveValidator, JsonSchemaValidationException, compile
+from precisionlife_fastjsonschema.adaptive import Shape, common_shape, observe_shape
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+DEFINITION = {
+    'type': 'object',
+    'properties': {
+        'id': {'type': 'integer', 'minimum': 1},
+        'name': {'type': 'string', 'maxLength': 5},
+        'tags': {'type': 'array', 'items': {'type': 'string'}},
+        'note': {'type': 'string'},
+    },
+    'required': ['id', 'name'],
+    'additionalProperties': False,
+}
+
+VALUE = {'id': 1, 'name': 'abc', 'tags': ['a', 'b']}
+
+
+def test_observe_shape():
+    shape = observe_shape(VALUE)
+    assert shape.kind == 'dict'
+    assert shape.keys == {'id', 'name', 'tags'}
+    assert shape.properties['tags'] == Shape('list', items=Shape('str'))
+    assert observe_shape({1: 'a'}) is None
+    assert observe_shape(object()) is None
+
+
+def test_common_shape():
+    assert common_shape([observe_shape(VALUE), observe_shape(dict(VALUE, id=2))]) == observe_shape(VALUE)
+    assert common_shape([observe_shape(VALUE), observe_shape(dict(VALUE, note='x'))]) is None
+    assert common_shape([observe_shape(VALUE), observe_shape(dict(VALUE, id=1.5))]).properties['id'] is None
+    assert common_shape([observe_shape([1, 'a'])]).items is None
+
+
+def test_specialized_code():
+    code = CodeGeneratorDraft07(DEFINITION, shape=observe_shape(VALUE)).func_code
+    assert 'raise SpecializationMiss' in code
+    assert 'isinstance(data, (Mapping))' not in code
+    assert '"note"' not in code
+    assert 'data_ra_missing' not in code
+
+
+def test_side_effects_are_not_specialized():
+    definition = {'properties': {'a': {'default': 1}}}
+    code_generator = CodeGeneratorDraft07(definition, shape=observe_shape({'a': 2}))
+    assert 'SpecializationMiss' not in code_generator.func_code
+    assert not code_generator.specialized
+
+
+def test_recursive_schema_is_not_specialized():
+    definition = {'type': 'array', 'items': {'$ref': '#'}}
+    assert not CodeGeneratorDraft07(definition, shape=observe_shape([[]])).specialized
+
+
+def test_adaptive_validator():
+    validate = compile(DEFINITION, adaptive=3)
+    assert isinstance(validate, AdaptiveValidator)
+    for _ in range(3):
+        assert validate(VALUE) == VALUE
+    assert validate.wait(timeout=10)
+    assert validate.shape == observe_shape(VALUE)
+    assert validate(VALUE) == VALUE
+    assert validate({'id': 1, 'name': 'abc'}) == {'id': 1, 'name': 'abc'}
+    assert (validate.calls, validate.hits, validate.misses) == (2, 1, 1)
+
+
+def test_unstable_shape_is_not_specialized():
+    validate = compile(DEFINITION, adaptive=3)
+    validate(VALUE)
+    validate({'id': 1, 'name': 'abc'})
+    validate(VALUE)
+    validate(VALUE)
+    assert not validate.wait(timeout=10)
+
+
+@pytest.mark.parametrize('value', [
+    VALUE,
+    dict(VALUE, id=0),
+    dict(VALUE, name='abcdef'),
+    dict(VALUE, tags=['a', 1]),
+    dict(VALUE, tags='a'),
+    {'id': 1, 'name': 'abc'},
+    {'id': 1, 'name': 'abc', 'tags': [], 'other': 1},
+    {'id': True, 'name': 'abc', 'tags': []},
+    {'name': 'abc'},
+    [],
+])
+def test_same_result_as_generic(value):
+    def result(validate):
+        try:
+            return validate(value)
+        except JsonSchemaValidationException as exc:
+            return exc.message, exc.rule, exc.path
+    validate = compile(DEFINITION, adaptive=1)
+    validate(VALUE)
+    assert validate.wait(timeout=10)
+    assert result(validate) == result(compile(DEFINITION))
+
+
+def test_specialization_is_dropped_when_missed():
+    validate = compile(DEFINITION, adaptive=2)
+    validate(VALUE)
+    validate(VALUE)
+    assert validate.wait(timeout=10)
+    for _ in range(3):
+        validate({'id': 1, 'name': 'abc'})
+    assert not validate.specialized
+    assert validate.misses == 2
+
+
+@pytest.mark.parametrize('specialized', (False, True))
+def test_keyword_arguments_are_passed(specialized):
+    validate = compile(DEFINITION, adaptive=1 if specialized else 100, budget_ns=10 ** 10)
+    if specialized:
+        validate(VALUE)
+        assert validate.wait(timeout=10)
+    value = dict(VALUE, id=0)
+    with pytest.raises(JsonSchemaValidationException) as exc:
+        validate(value, root_object={'x': value}, root_path=['x'], special_fields_extractor=None, budget_ns=10 ** 9)
+    assert exc.value.path == ['x', 'id']
+    assert exc.value.root_object == {'x': value}
+    assert validate.specialized == specialized
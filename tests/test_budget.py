@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaBudgetExceeded, JsonSchemaValidationException, compile
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+DEFINITION = {
+    'type': 'array',
+    'items': {
+        'anyOf': [
+            {'type': 'string'},
+            {'type': 'object', 'additionalProperties': {'$ref': '#'}},
+        ],
+    },
+}
+
+SMALL_VALUE = ['a', {'b': ['c']}]
+BIG_VALUE = [{'key{}'.format(idx): ['a'] * 100 for idx in range(100)}] * 100
+
+
+def test_without_budget_no_checks():
+    code = CodeGeneratorDraft07(DEFINITION).func_code
+    assert 'perf_counter_ns' not in code
+    assert 'BUDGET' not in code
+
+
+def test_budget_checks():
+    code = CodeGeneratorDraft07(DEFINITION, budget_ns=1000).func_code
+    assert 'budget_ns=1000' in code
+    assert 'BUDGET.deadline = perf_counter_ns() + budget_ns' in code
+    assert code.count('if perf_counter_ns() > budget_deadline:') == 4
+
+
+def test_within_budget():
+    validate = compile(DEFINITION, budget_ns=10 ** 10)
+    assert validate(SMALL_VALUE) == SMALL_VALUE
+    with pytest.raises(JsonSchemaValidationException):
+        validate(['a', 1])
+
+
+def test_budget_exceeded():
+    validate = compile(DEFINITION, budget_ns=10 ** 10)
+    with pytest.raises(JsonSchemaBudgetExceeded) as exc:
+        validate(BIG_VALUE, budget_ns=0)
+    assert not isinstance(exc.value, JsonSchemaValidationException)
+    assert exc.value.path == []
+    # Deadline is cleared, so next call has the whole budget again.
+    assert validate(BIG_VALUE) == BIG_VALUE
+
+
+def test_budget_exceeded_in_nested_branch():
+    validate = compile(DEFINITION, budget_ns=10 ** 10)
+    with pytest.raises(JsonSchemaBudgetExceeded) as exc:
+        # Not caught by anyOf as failed branch.
+        validate([{'a': ['b'] * 100000}], budget_ns=1000000)
+    assert exc.value.path[:2] == [0, 'a']
+
+
+@pytest.mark.parametrize('iterative', (False, True))
+def test_budget_with_recursion(iterative):
+    validate = compile(DEFINITION, budget_ns=10 ** 10, iterative=iterative)
+    assert validate(SMALL_VALUE) == SMALL_VALUE
+    with pytest.raises(JsonSchemaBudgetExceeded):
+        validate(BIG_VALUE, budget_ns=0)
+
+
+def test_budget_per_thread():
+    validate = compile(DEFINITION, budget_ns=10 ** 10)
+    results = []
+
+    def run():
+        results.append(validate(BIG_VALUE))
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [BIG_VALUE] * 4
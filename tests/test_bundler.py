@@ -0,0 +1,126 @@
+import json
+import sys
+
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaDefinitionException, JsonSchemaValidationException, bundle, compile
+from precisionlife_fastjsonschema.__main__ import main
+
+
+REMOTES = {
+    'http://example.com/integer.json': {'type': 'integer'},
+    'http://example.com/other/integer.json': {'type': 'integer'},
+    'http://example.com/name.json': {
+        'type': 'string',
+        'definitions': {
+            'orNull': {'anyOf': [{'type': 'null'}, {'$ref': '#'}]},
+        },
+    },
+    'http://example.com/item.json': {
+        'type': 'object',
+        'properties': {
+            'id': {'$ref': 'integer.json'},
+            'name': {'$ref': 'name.json#/definitions/orNull'},
+        },
+    },
+}
+
+
+@pytest.fixture
+def handlers():
+    calls = []
+
+    def handler(uri):
+        calls.append(uri)
+        return REMOTES[uri]
+    handler.calls = calls
+    return {'http': handler}
+
+
+def failing_handler(uri):
+    raise AssertionError('Handler called for {}'.format(uri))
+
+
+def test_bundle_remote_documents(handlers):
+    bundled = bundle({
+        'type': 'array',
+        'items': {'$ref': 'http://example.com/item.json'},
+    }, handlers=handlers, store={})
+    assert bundled['items'] == {'$ref': '#/definitions/item'}
+    assert set(bundled['definitions']) == {'item', 'integer', 'name'}
+    assert bundled['definitions']['item']['properties']['name'] == {'$ref': '#/definitions/name/definitions/orNull'}
+    assert bundled['definitions']['name']['definitions']['orNull']['anyOf'][1] == {'$ref': '#/definitions/name'}
+
+    validate = compile(bundled, handlers={'http': failing_handler}, store={})
+    assert validate([{'id': 1, 'name': None}, {'id': 2, 'name': 'x'}]) == [{'id': 1, 'name': None}, {'id': 2, 'name': 'x'}]
+    with pytest.raises(JsonSchemaValidationException):
+        validate([{'id': 1, 'name': 1}])
+
+
+def test_bundle_deduplicates_identical_documents(handlers):
+    bundled = bundle({
+        'properties': {
+            'a': {'$ref': 'http://example.com/integer.json'},
+            'b': {'$ref': 'http://example.com/other/integer.json'},
+        },
+    }, handlers=handlers, store={})
+    assert bundled['definitions'] == {'integer': {'type': 'integer'}}
+    assert bundled['properties']['b'] == {'$ref': '#/definitions/integer'}
+
+
+def test_bundle_does_not_change_input(handlers):
+    definition = {'$ref': 'http://example.com/integer.json'}
+    bundle(definition, handlers=handlers, store={})
+    assert definition == {'$ref': 'http://example.com/integer.json'}
+
+
+def test_bundle_with_defs_keyword(handlers):
+    bundled = bundle({'$ref': 'http://example.com/integer.json'}, handlers=handlers, definitions_keyword='$defs', store={})
+    assert bundled == {'$ref': '#/$defs/integer', '$defs': {'integer': {'type': 'integer'}}}
+
+
+def test_bundle_keeps_existing_definitions(handlers):
+    bundled = bundle({
+        'definitions': {'integer': {'type': 'string'}},
+        'properties': {
+            'a': {'$ref': '#/definitions/integer'},
+            'b': {'$ref': 'http://example.com/integer.json'},
+        },
+    }, handlers=handlers, store={})
+    assert bundled['properties'] == {
+        'a': {'$ref': '#/definitions/integer'},
+        'b': {'$ref': '#/definitions/integer_1'},
+    }
+
+
+def test_bundle_nested_id(handlers):
+    bundled = bundle({
+        '$id': 'http://example.com/root.json',
+        'definitions': {
+            'a': {'$id': 'http://example.com/nested/a.json', 'type': 'integer'},
+        },
+        'properties': {
+            'a': {'$ref': 'nested/a.json'},
+            'b': {'$ref': 'integer.json'},
+        },
+    }, handlers=handlers, store={})
+    assert bundled['definitions']['a'] == {'type': 'integer'}
+    assert bundled['properties']['a'] == {'$ref': '#/definitions/a'}
+    assert bundled['properties']['b'] == {'$ref': '#/definitions/integer'}
+    assert handlers['http'].calls == ['http://example.com/integer.json']
+
+
+def test_bundle_plain_name_fragment(handlers):
+    with pytest.raises(JsonSchemaDefinitionException):
+        bundle({'$ref': 'http://example.com/integer.json#foo'}, handlers=handlers, store={})
+
+
+def test_bundle_command(tmp_path, monkeypatch, capsys):
+    schema_path = tmp_path / 'schema.json'
+    schema_path.write_text(json.dumps({
+        'properties': {'a': {'$ref': '#/definitions/a'}},
+        'definitions': {'a': {'type': 'string'}},
+    }))
+    monkeypatch.setattr(sys, 'argv', ['fastjsonschema', 'bundle', str(schema_path)])
+    main()
+    assert json.loads(capsys.readouterr().out)['properties'] == {'a': {'$ref': '#/definitions/a'}}
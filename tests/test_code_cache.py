@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from precisionlife_fastjsonschema import CodeCache, JsonSchemaValidationException, compile
+
+
+DEFINITION = {'type': 'object', 'properties': {'a': {'type': 'integer'}}}
+
+
+def test_compile_with_code_cache():
+    code_cache = CodeCache()
+    first = compile(DEFINITION, code_cache=code_cache)
+    second = compile(DEFINITION, code_cache=code_cache)
+    assert first.__code__ is second.__code__
+    assert code_cache.stats() == {'hits': 1, 'misses': 1, 'entries': 1}
+    assert second({'a': 1}) == {'a': 1}
+    with pytest.raises(JsonSchemaValidationException):
+        second({'a': 'x'})
+
+
+def test_different_code_is_not_shared():
+    code_cache = CodeCache()
+    compile(DEFINITION, code_cache=code_cache)
+    compile({'type': 'string'}, code_cache=code_cache)
+    assert code_cache.stats() == {'hits': 0, 'misses': 2, 'entries': 2}
+
+
+def test_max_entries():
+    code_cache = CodeCache(max_entries=1)
+    code_cache.compile('a = 1')
+    code_cache.compile('a = 2')
+    code_cache.compile('a = 1')
+    assert code_cache.stats() == {'hits': 0, 'misses': 3, 'entries': 1}
+
+
+def test_disk_cache(tmpdir):
+    CodeCache(cache_dir=str(tmpdir)).compile('a = 1')
+    assert len(os.listdir(str(tmpdir))) == 1
+
+    code_cache = CodeCache(cache_dir=str(tmpdir))
+    namespace = {}
+    exec(code_cache.compile('a = 1'), namespace)
+    assert namespace['a'] == 1
+    assert code_cache.stats() == {'hits': 1, 'misses': 0, 'entries': 1}
+
+
+def test_corrupted_disk_cache(tmpdir):
+    CodeCache(cache_dir=str(tmpdir)).compile('a = 1')
+    for name in os.listdir(str(tmpdir)):
+        with open(os.path.join(str(tmpdir), name), 'wb') as cache_file:
+            cache_file.write(b'garbage')
+
+    code_cache = CodeCache(cache_dir=str(tmpdir))
+    namespace = {}
+    exec(code_cache.compile('a = 1'), namespace)
+    assert namespace['a'] == 1
+    assert code_cache.stats()['misses'] == 1
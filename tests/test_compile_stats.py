@@ -0,0 +1,46 @@
+import json
+import sys
+
+from precisionlife_fastjsonschema import compile
+from precisionlife_fastjsonschema.__main__ import main
+
+
+DEFINITION = {
+    'type': 'object',
+    'properties': {
+        'name': {'type': 'string', 'pattern': '^[a-z]+$'},
+        'code': {'type': 'string', 'pattern': '^[0-9]+$'},
+        'remote': {'$ref': 'http://example.com/remote.json'},
+        'tree': {'$ref': '#/definitions/tree'},
+    },
+    'definitions': {
+        'tree': {'type': 'array', 'items': {'$ref': '#/definitions/tree'}},
+    },
+}
+
+
+def test_compile_stats():
+    validate = compile(DEFINITION, handlers={'http': lambda uri: {'type': 'integer'}}, compile_stats=True)
+    stats = validate.compile_stats
+    assert stats['remote_fetches'] == 1
+    assert stats['functions'] == 2
+    assert stats['regexs'] == 2
+    assert stats['lines'] > 10
+    assert stats['bytes'] > stats['lines']
+    for key in ('walk_ns', 'generate_ns', 'exec_ns', 'regex_compile_ns', 'code_bytes', 'global_state_bytes'):
+        assert stats[key] > 0
+    assert stats['total_ns'] == stats['walk_ns'] + stats['generate_ns'] + stats['remote_fetch_ns'] + stats['exec_ns']
+
+
+def test_no_compile_stats():
+    assert not hasattr(compile(DEFINITION, handlers={'http': lambda uri: {}}), 'compile_stats')
+
+
+def test_stats_command(tmp_path, monkeypatch, capsys):
+    schema_path = tmp_path / 'schema.json'
+    schema_path.write_text(json.dumps({'properties': {'a': {'type': 'string', 'pattern': '^a'}}}))
+    monkeypatch.setattr(sys, 'argv', ['fastjsonschema', 'stats', str(schema_path)])
+    main()
+    stats = json.loads(capsys.readouterr().out)
+    assert stats['functions'] == 1
+    assert stats['regexs'] == 1
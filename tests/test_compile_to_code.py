@@ -127,3 +127,25 @@ validationTestTypesSchema = {
 ])
 def test_unique_name_generator(asserter, value, expected):
     asserter(validationTestTypesSchema, value, expected, ignore_exc_fields=['value', 'definition'])
+
+
+def test_compile_to_code_internal_functions_are_positional():
+    code = compile_to_code({
+        'type': 'object',
+        'properties': {
+            'name': {'$ref': '#/definitions/name'},
+            'children': {'type': 'array', 'items': {'$ref': '#'}},
+        },
+        'definitions': {
+            'name': {'type': 'string', 'minLength': 1, 'maxLength': 10, 'pattern': '^[a-z]'},
+        },
+    }, inline_refs=0)
+    assert 'def validate(data, *, root_object=None, root_path=[], special_fields_extractor=None):' in code
+    assert 'def validate___definitions_name(data, root_object, root_path, special_fields_extractor):' in code
+    with open('temp/schema_3.py', 'w') as f:
+        f.write(code)
+    from temp.schema_3 import validate
+    assert validate({'name': 'a', 'children': [{'name': 'b'}]})
+    with pytest.raises(JsonSchemaValidationException) as exc:
+        validate({'name': 'a', 'children': [{'name': 'B'}]})
+    assert exc.value.path == ['children', 0, 'name']
@@ -0,0 +1,109 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+ADDRESS = {
+    'type': 'object',
+    'properties': {
+        'street': {'type': 'string', 'maxLength': 10},
+        'zip': {'type': 'string', 'pattern': '^[0-9]{5}$'},
+    },
+    'required': ['street'],
+}
+
+DEFINITION = {
+    'type': 'object',
+    'properties': {
+        'home': ADDRESS,
+        'work': dict(ADDRESS),
+        'others': {'type': 'array', 'items': dict(ADDRESS)},
+    },
+}
+
+
+def test_equal_subschemas_share_function():
+    code = CodeGeneratorDraft07(DEFINITION).func_code
+    assert code.count('def validate_subschema_') == 1
+    assert code.count('validate_subschema_0(') == 4
+    assert len(code) < len(CodeGeneratorDraft07(DEFINITION, deduplicate=False).func_code)
+
+
+def test_small_subschemas_are_inlined():
+    code = CodeGeneratorDraft07({
+        'properties': {'a': {'type': 'string', 'format': 'date'}, 'b': {'type': 'string', 'format': 'date'}},
+    }).func_code
+    assert 'validate_subschema_' not in code
+
+
+def test_subschemas_with_different_order_are_not_shared():
+    code = CodeGeneratorDraft07({
+        'properties': {
+            'a': {'properties': {'x': {'type': 'string'}, 'y': {'type': 'number'}}, 'required': ['x']},
+            'b': {'properties': {'y': {'type': 'number'}, 'x': {'type': 'string'}}, 'required': ['x']},
+        },
+    }).func_code
+    assert 'validate_subschema_' not in code
+
+
+def test_subschemas_with_refs_in_different_scopes_are_not_shared():
+    item = {'type': 'object', 'properties': {'a': {'$ref': '#/definitions/a'}, 'b': {'type': 'string'}}, 'required': ['a']}
+    definition = {
+        'properties': {
+            'local': dict(item),
+            'remote': {'$ref': 'http://example.com/item.json'},
+        },
+        'definitions': {'a': {'type': 'string'}},
+    }
+    remote = {'allOf': [item], 'definitions': {'a': {'type': 'integer'}}}
+    validate = compile(definition, handlers={'http': lambda uri: remote})
+    assert validate({'local': {'a': 'x'}, 'remote': {'a': 1}})
+    with pytest.raises(JsonSchemaValidationException):
+        validate({'local': {'a': 'x'}, 'remote': {'a': 'x'}})
+
+
+@pytest.mark.parametrize('value, expected', [
+    ({'home': {'street': 'a'}, 'others': [{'street': 'b', 'zip': '12345'}]}, None),
+    ({'home': {'street': 'a' * 11}}, ('must be shorter than or equal to 10 characters', 'maxLength', ['home', 'street'])),
+    ({'work': {}}, ('missing/extra properties', 'required-additionalProperties', ['work'])),
+    ({'others': [{'street': 'a'}, {'street': 'b', 'zip': 'x'}]}, ('"x" does not match pattern "^[0-9]{5}$"', 'pattern', ['others', 1, 'zip'])),
+])
+def test_same_result_as_not_deduplicated(value, expected):
+    def result(deduplicate):
+        try:
+            compile(DEFINITION, deduplicate=deduplicate)(value)
+        except JsonSchemaValidationException as exc:
+            return exc.message, exc.rule, exc.path
+        return None
+    assert result(False) == result(True) == expected
+
+
+OBJECT_OR_NUMBER = {
+    'minProperties': 1,
+    'maxProperties': 5,
+    'required': ['q'],
+    'properties': {'q': {'type': 'integer'}},
+    'minimum': 0,
+}
+
+
+@pytest.mark.parametrize('deduplicate', (False, True))
+@pytest.mark.parametrize('value, expected', [
+    ({'q': 1}, {'q': 1}),
+    (True, True),
+    ({'q': 1, 'z': {'q': 2}}, {'q': 1, 'z': {'q': 2}}),
+    ({'q': 1, 'z': {}}, 'must contain at least 1 properties'),
+    ({'q': 1, 'a': 1}, 'missing dependency b for a'),
+])
+def test_variables_created_under_condition_are_not_reused(deduplicate, value, expected):
+    # Shared subschema is called under condition of anyOf, which created variables used after it.
+    validate = compile({
+        'anyOf': [{'type': 'boolean'}, OBJECT_OR_NUMBER],
+        'dependencies': {'a': ['b']},
+        'properties': {'z': OBJECT_OR_NUMBER},
+    }, deduplicate=deduplicate)
+    try:
+        assert validate(value) == expected
+    except JsonSchemaValidationException as exc:
+        assert exc.message == expected
@@ -0,0 +1,101 @@
+import json
+import sys
+
+import pytest
+
+from precisionlife_fastjsonschema import explain, format_report
+from precisionlife_fastjsonschema.__main__ import main
+
+
+def make_branch(name, **extra):
+    return dict({'type': 'object', 'properties': {name: {'type': 'number'}}, 'required': [name]}, **extra)
+
+
+def warnings(definition):
+    return [(warning['pointer'], warning['keyword']) for warning in explain(definition)['warnings']]
+
+
+def test_no_warnings():
+    report = explain({'type': 'object', 'properties': {'a': {'type': 'string', 'pattern': '^a'}}})
+    assert report['warnings'] == []
+    assert report['cost'] > 0
+    assert [node['pointer'] for node in report['nodes']] == ['#/properties/a', '#']
+
+
+@pytest.mark.parametrize('keyword', ['anyOf', 'oneOf'])
+def test_branches_without_discriminator(keyword):
+    assert warnings({keyword: [make_branch(name) for name in 'abcd']}) == [('#/' + keyword, keyword)]
+    assert warnings({keyword: [make_branch(name) for name in 'abc']}) == []
+
+
+@pytest.mark.parametrize('branches', [
+    [make_branch(name, properties={'kind': {'const': name}}) for name in 'abcd'],
+    [{'type': type_} for type_ in ('string', 'number', 'array', 'object')],
+    [{'$ref': '#/definitions/' + name} for name in 'abcd'],
+])
+def test_branches_with_discriminator(branches):
+    definitions = {name: make_branch(name, properties={'kind': {'enum': [name]}}) for name in 'abcd'}
+    assert warnings({'anyOf': branches, 'definitions': definitions}) == []
+
+
+def test_unique_items():
+    assert warnings({'uniqueItems': True, 'items': {'type': 'object'}}) == [('#/uniqueItems', 'uniqueItems')]
+    assert warnings({'uniqueItems': True, 'items': {'type': 'string'}}) == []
+
+
+@pytest.mark.parametrize('pattern, expected', [
+    ('^[a-z]+$', False),
+    ('[a-z]+', True),
+    ('^(a+)+$', True),
+    ('^(\\w*\\s?)*$', True),
+    ('^(a|aa)*$', True),
+    ('^(\\d+\\.)*$', False),
+])
+def test_pattern(pattern, expected):
+    assert bool(warnings({'pattern': pattern})) == expected
+
+
+def test_large_enum():
+    assert warnings({'enum': list(range(100))}) == [('#/enum', 'enum')]
+    assert warnings({'enum': list(range(10))}) == []
+
+
+def test_pattern_properties():
+    assert warnings({'patternProperties': {'^{}'.format(idx): {} for idx in range(10)}}) == [('#/patternProperties', 'patternProperties')]
+    assert warnings({'patternProperties': {'^(a+)+$': {}}}) == [('#/patternProperties', 'patternProperties')]
+
+
+def test_ranking_and_refs():
+    report = explain({
+        'properties': {
+            'cheap': {'type': 'string'},
+            'expensive': {'$ref': '#/definitions/expensive'},
+            'tree': {'$ref': '#/definitions/tree'},
+        },
+        'definitions': {
+            'expensive': {'type': 'array', 'uniqueItems': True, 'items': {'type': 'array'}},
+            'tree': {'type': 'array', 'items': {'$ref': '#/definitions/tree'}},
+        },
+    })
+    assert report['warnings'][0]['pointer'] == '#/definitions/expensive/uniqueItems'
+    assert report['nodes'][0]['pointer'] == '#/definitions/expensive'
+    assert [node['own_cost'] for node in report['nodes']] == sorted((node['own_cost'] for node in report['nodes']), reverse=True)
+    assert len([node for node in report['nodes'] if node['pointer'] == '#/definitions/tree']) == 1
+
+
+def test_format_report():
+    text = format_report(explain({'uniqueItems': True, 'items': {'type': 'object'}}))
+    assert 'Slow constructs:' in text
+    assert '#/uniqueItems' in text
+
+
+@pytest.mark.parametrize('args, check', [
+    ([], lambda out: 'Estimated cost' in out),
+    (['--json'], lambda out: json.loads(out)['warnings'][0]['keyword'] == 'uniqueItems'),
+])
+def test_explain_command(tmp_path, monkeypatch, capsys, args, check):
+    schema_path = tmp_path / 'schema.json'
+    schema_path.write_text(json.dumps({'uniqueItems': True, 'items': {'type': 'object'}}))
+    monkeypatch.setattr(sys, 'argv', ['fastjsonschema', 'explain'] + args + [str(schema_path)])
+    main()
+    assert check(capsys.readouterr().out)
@@ -0,0 +1,102 @@
+import gc
+
+import pytest
+
+from precisionlife_fastjsonschema import FunctionPool, JsonSchemaValidationException, compile
+
+
+ADDRESS = {
+    'type': 'object',
+    'properties': {
+        'street': {'type': 'string', 'maxLength': 10},
+        'zip': {'type': 'string', 'pattern': '^[0-9]{5}$'},
+    },
+    'required': ['street'],
+}
+
+
+def make_tenant_schema(tenant):
+    return {
+        'type': 'object',
+        'properties': {
+            'address': dict(ADDRESS),
+            'tenant': {'const': tenant},
+        },
+    }
+
+
+def test_functions_are_shared_between_validators():
+    function_pool = FunctionPool()
+    validate_a = compile(make_tenant_schema('a'), function_pool=function_pool)
+    validate_b = compile(make_tenant_schema('b'), function_pool=function_pool)
+    assert validate_a.__globals__['validate_subschema_0'] is validate_b.__globals__['validate_subschema_0']
+    assert function_pool.stats() == {'hits': 1, 'misses': 1, 'functions': 1, 'regexs': 1}
+
+
+def test_validation_with_pooled_functions():
+    validate = compile(make_tenant_schema('a'), function_pool=FunctionPool())
+    assert validate({'address': {'street': 'x', 'zip': '12345'}, 'tenant': 'a'})
+    with pytest.raises(JsonSchemaValidationException) as exc:
+        validate({'address': {'street': 'x', 'zip': 'x'}})
+    assert exc.value.path == ['address', 'zip']
+    assert exc.value.rule == 'pattern'
+
+
+def test_subschemas_with_ref_are_not_pooled():
+    definition = {
+        'properties': {'address': dict(ADDRESS, properties={'street': {'$ref': '#/definitions/street'}})},
+        'definitions': {'street': {'type': 'string'}},
+    }
+    function_pool = FunctionPool()
+    compile(definition, function_pool=function_pool)
+    assert function_pool.stats()['functions'] == 0
+
+
+def test_unused_functions_are_freed():
+    function_pool = FunctionPool()
+    validate = compile(make_tenant_schema('a'), function_pool=function_pool)
+    assert function_pool.stats()['functions'] == 1
+    del validate
+    gc.collect()
+    assert function_pool.stats()['functions'] == 0
+
+
+def test_different_formats_are_not_shared():
+    definition = {'properties': {'a': {'type': 'string', 'format': 'code', 'minLength': 1, 'maxLength': 5, 'pattern': '.'}}}
+    function_pool = FunctionPool()
+    validate_a = compile(definition, formats={'code': '^a'}, function_pool=function_pool)
+    validate_b = compile(definition, formats={'code': '^b'}, function_pool=function_pool)
+    assert function_pool.stats()['functions'] == 2
+    assert validate_a({'a': 'ab'})
+    assert validate_b({'a': 'ba'})
+    with pytest.raises(JsonSchemaValidationException):
+        validate_b({'a': 'ab'})
+
+
+SHARED = {
+    'minProperties': 1,
+    'maxProperties': 5,
+    'required': ['q'],
+    'properties': {'q': {'type': 'integer'}},
+    'minimum': 0,
+}
+
+
+@pytest.mark.parametrize('definition', [
+    {'anyOf': [{'type': 'boolean'}, SHARED], 'dependencies': {'a': ['b']}, 'properties': {'z': SHARED}},
+    {'not': {'properties': {'q': SHARED}}, 'properties': {'q': SHARED}, 'additionalProperties': {'type': 'integer'}},
+    {'maxProperties': 2, 'uniqueItems': True, 'items': SHARED, 'properties': {'z': dict(SHARED, uniqueItems=True)}},
+    {'oneOf': [{'oneOf': [{'pattern': '^a', 'minimum': 0}, SHARED]}], 'properties': {'q': SHARED}},
+    {'anyOf': [{'minimum': 0, 'oneOf': [{'anyOf': [{'maxItems': 2, 'maxProperties': 2}]}]}], 'items': SHARED},
+])
+@pytest.mark.parametrize('value', [
+    None, -1, 1, 'a', 'x', True, [], [1, 1], [{'q': 1}, {'q': 1}], {}, {'q': 1}, {'q': 'x'},
+    {'q': 1, 'z': {'q': 2}}, {'q': 1, 'z': {}}, {'a': 1}, {'q': {'q': 1}}, {'q': 1, 'a': 1, 'b': 2},
+])
+def test_same_result_as_not_pooled(definition, value):
+    def result(**kwds):
+        try:
+            return compile(definition, **kwds)(value)
+        except JsonSchemaValidationException as exc:
+            return exc.message, exc.rule, exc.path
+    assert result(function_pool=FunctionPool()) == result()
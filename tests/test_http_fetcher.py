@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from precisionlife_fastjsonschema import HttpFetcher, JsonSchemaDefinitionException, JsonSchemaValidationException, compile
+
+
+SCHEMAS = {
+    '/integer.json': {'type': 'integer'},
+    '/object.json': {'type': 'object', 'properties': {'a': {'$ref': 'integer.json'}}},
+}
+
+
+class SchemaRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.client_address, dict(self.headers)))
+        if server.delay:
+            time.sleep(server.delay)
+        if self.path == '/redirect.json':
+            self.send_response(302)
+            self.send_header('Location', '/integer.json')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path not in SCHEMAS:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        etag = '"v{}"'.format(server.version)
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps(SCHEMAS[self.path]).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), SchemaRequestHandler)
+    httpd.requests = []
+    httpd.version = 1
+    httpd.delay = 0
+    thread = threading.Thread(target=httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    httpd.url = 'http://127.0.0.1:{}'.format(httpd.server_address[1])
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fetch(server):
+    with HttpFetcher() as fetcher:
+        assert fetcher(server.url + '/integer.json') == {'type': 'integer'}
+
+
+def test_fresh_response_is_not_requested_again(server):
+    with HttpFetcher(ttl=60) as fetcher:
+        fetcher(server.url + '/integer.json')
+        fetcher(server.url + '/integer.json')
+    assert len(server.requests) == 1
+
+
+def test_revalidation_by_etag(server):
+    with HttpFetcher(ttl=0) as fetcher:
+        fetcher(server.url + '/integer.json')
+        assert fetcher(server.url + '/integer.json') == {'type': 'integer'}
+    assert len(server.requests) == 2
+    assert server.requests[1][2]['If-None-Match'] == '"v1"'
+
+
+def test_keep_alive_connection_is_reused(server):
+    with HttpFetcher(ttl=0) as fetcher:
+        for _ in range(3):
+            fetcher(server.url + '/integer.json')
+    assert len({client_address for _, client_address, _ in server.requests}) == 1
+
+
+def test_redirect(server):
+    with HttpFetcher() as fetcher:
+        assert fetcher(server.url + '/redirect.json') == {'type': 'integer'}
+
+
+def test_disk_cache_survives_new_instance(server, tmp_path):
+    with HttpFetcher(cache_dir=str(tmp_path), ttl=60) as fetcher:
+        fetcher(server.url + '/integer.json')
+    with HttpFetcher(cache_dir=str(tmp_path), ttl=60) as fetcher:
+        assert fetcher(server.url + '/integer.json') == {'type': 'integer'}
+    assert len(server.requests) == 1
+
+
+def test_stale_if_error(server, tmp_path):
+    url = server.url + '/integer.json'
+    with HttpFetcher(cache_dir=str(tmp_path), ttl=0) as fetcher:
+        fetcher(url)
+    server.shutdown()
+    server.server_close()
+    with HttpFetcher(cache_dir=str(tmp_path), ttl=0, stale_if_error=60, timeout=1) as fetcher:
+        assert fetcher(url) == {'type': 'integer'}
+    with HttpFetcher(cache_dir=str(tmp_path), ttl=0, stale_if_error=0, timeout=1) as fetcher:
+        with pytest.raises(JsonSchemaDefinitionException):
+            fetcher(url)
+
+
+def test_timeout(server):
+    server.delay = 0.5
+    with HttpFetcher(timeout=0.1) as fetcher:
+        with pytest.raises(JsonSchemaDefinitionException):
+            fetcher(server.url + '/integer.json')
+
+
+def test_not_found(server):
+    with HttpFetcher() as fetcher:
+        with pytest.raises(JsonSchemaDefinitionException):
+            fetcher(server.url + '/missing.json')
+
+
+def test_compile_with_fetcher(server):
+    with HttpFetcher() as fetcher:
+        validate = compile({'$ref': server.url + '/object.json'}, handlers={'http': fetcher}, store={})
+    assert validate({'a': 1}) == {'a': 1}
+    with pytest.raises(JsonSchemaValidationException):
+        validate({'a': 'x'})
@@ -0,0 +1,87 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile, compile_to_code
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+DEFINITION = {
+    'type': 'object',
+    'properties': {
+        'name': {'$ref': '#/definitions/name'},
+        'other_name': {'$ref': '#/definitions/name'},
+        'address': {'$ref': '#/definitions/address'},
+        'tree': {'$ref': '#/definitions/tree'},
+    },
+    'definitions': {
+        'name': {'type': 'string', 'maxLength': 5},
+        'address': {
+            'type': 'object',
+            'properties': {'street': {'$ref': '#/definitions/name'}, 'number': {'type': 'integer', 'minimum': 1}},
+            'required': ['street'],
+        },
+        'tree': {'type': 'array', 'items': {'$ref': '#/definitions/tree'}},
+    },
+}
+
+
+def test_small_target_is_inlined():
+    code = CodeGeneratorDraft07(DEFINITION).func_code
+    assert 'def validate___definitions_name(' not in code
+    assert 'def validate___definitions_address(' in code
+
+
+def test_recursive_target_is_not_inlined():
+    code = CodeGeneratorDraft07(DEFINITION).func_code
+    assert 'def validate___definitions_tree(' in code
+    assert 'validate___definitions_tree(data_item, ' in code
+
+
+def test_inlining_off():
+    code = CodeGeneratorDraft07(DEFINITION, inline_refs=0).func_code
+    assert 'def validate___definitions_name(' in code
+
+
+@pytest.mark.parametrize('target', ({}, {'$comment': 'anything'}))
+def test_inlined_empty_target(target):
+    definition = {'not': {'$ref': '#/definitions/a'}, 'definitions': {'a': target}}
+    for optimize in (False, True):
+        with pytest.raises(JsonSchemaValidationException, match='must not be valid by not definition'):
+            compile(definition, optimize=optimize)(1)
+        namespace = {}
+        exec(compile_to_code(definition, optimize=optimize), namespace)
+        with pytest.raises(JsonSchemaValidationException, match='must not be valid by not definition'):
+            namespace['validate'](1)
+
+
+def test_inlined_target_with_relative_ref():
+    remote = {
+        'type': 'object',
+        'properties': {'value': {'$ref': '#/definitions/value'}},
+        'definitions': {'value': {'type': 'integer'}},
+    }
+    validate = compile(
+        {'properties': {'a': {'$ref': 'http://example.com/remote.json'}}},
+        handlers={'http': lambda uri: remote},
+        inline_refs=10,
+    )
+    assert validate({'a': {'value': 1}})
+    with pytest.raises(JsonSchemaValidationException) as exc:
+        validate({'a': {'value': 'x'}})
+    assert exc.value.path == ['a', 'value']
+
+
+@pytest.mark.parametrize('value', [
+    {'name': 'abc', 'address': {'street': 'abc', 'number': 1}, 'tree': [[], [[]]]},
+    {'name': 'abcdef'},
+    {'other_name': 1},
+    {'address': {'street': 'abcdef'}},
+    {'address': {'number': 0, 'street': 'a'}},
+    {'tree': [[], [[1]]]},
+])
+def test_same_result_as_not_inlined(value):
+    def result(inline_refs):
+        try:
+            return compile(DEFINITION, inline_refs=inline_refs)(value)
+        except JsonSchemaValidationException as exc:
+            return exc.message, exc.rule, exc.path, exc.definition
+    assert result(0) == result(100)
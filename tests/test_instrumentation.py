@@ -0,0 +1,76 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+DEFINITION = {
+    'type': 'object',
+    'properties': {
+        'a': {'type': 'integer', 'minimum': 0},
+        'b': {'$ref': '#/definitions/b'},
+    },
+    'definitions': {
+        'b': {'type': 'array', 'items': {'$ref': '#/definitions/b'}},
+    },
+}
+
+
+def test_not_instrumented_code():
+    code = CodeGeneratorDraft07(DEFINITION).func_code
+    assert 'INSTRUMENT' not in code
+    assert not hasattr(compile(DEFINITION), 'stats')
+
+
+def test_keyword_counters():
+    validate = compile(DEFINITION, instrument=True)
+    validate({'a': 1, 'b': [[], [[]]]})
+    with pytest.raises(JsonSchemaValidationException):
+        validate({'a': -1})
+    stats = validate.stats()
+    assert stats['keywords']['#'] == {
+        'type': {'evaluations': 2, 'failures': 0},
+        'properties': {'evaluations': 2, 'failures': 1},
+    }
+    assert stats['keywords']['#/properties/a']['minimum'] == {'evaluations': 2, 'failures': 1}
+    assert stats['keywords']['#/properties/b']['$ref'] == {'evaluations': 1, 'failures': 0}
+    assert stats['keywords']['#/definitions/b']['items'] == {'evaluations': 4, 'failures': 0}
+    assert stats['functions'] == {}
+
+
+@pytest.mark.parametrize('options', [{}, {'iterative': True}, {'lazy': True}])
+def test_function_timing(options):
+    validate = compile(DEFINITION, instrument='timing', **options)
+    validate({'b': [[], [[]]]})
+    functions = validate.stats()['functions']
+    assert functions['validate___definitions_b']['calls'] == 3
+    assert functions['validate___definitions_b']['pointer'] == '#/definitions/b'
+    assert all(counters['time_ns'] > 0 for counters in functions.values())
+
+
+def test_failures_caught_by_any_of():
+    validate = compile({'anyOf': [{'type': 'string'}, {'type': 'integer'}]}, instrument=True)
+    assert validate(1) == 1
+    stats = validate.stats()
+    assert stats['keywords']['#/anyOf/0'] == {'type': {'evaluations': 1, 'failures': 1}}
+    assert stats['keywords']['#']['anyOf'] == {'evaluations': 1, 'failures': 0}
+
+
+def test_equal_subschemas_have_own_counters():
+    address = {'type': 'object', 'properties': {'street': {'type': 'string', 'maxLength': 10}}, 'required': ['street']}
+    validate = compile({'properties': {'home': address, 'work': dict(address)}}, instrument=True)
+    validate({'home': {'street': 'a'}})
+    keywords = validate.stats()['keywords']
+    assert keywords['#/properties/home']['required']['evaluations'] == 1
+    assert keywords['#/properties/work']['required']['evaluations'] == 0
+
+
+def test_prometheus_format():
+    validate = compile({'properties': {'a"b': {'type': 'string'}}}, instrument=True)
+    validate({'a"b': 'x'})
+    text = validate.stats(format='prometheus', labels={'schema': 'test'})
+    assert '# TYPE fastjsonschema_keyword_evaluations_total counter\n' in text
+    assert 'fastjsonschema_keyword_evaluations_total{schema="test",pointer="#/properties/a\\"b",keyword="type"} 1\n' in text
+    assert 'fastjsonschema_function_calls_total' not in text
+    with pytest.raises(ValueError):
+        validate.stats(format='xml')
@@ -0,0 +1,152 @@
+import pytest
+
+from precisionlife_fastjsonschema import (
+    JsonSchemaDefinitionException, JsonSchemaValidationException, TieredValidator, compile, interpret, validate,
+)
+from precisionlife_fastjsonschema.interpreter import Interpreter
+
+
+def result(validate, value):
+    try:
+        return validate(value)
+    except JsonSchemaValidationException as exc:
+        return exc.message, exc.rule, exc.path, exc.definition, exc.missing_fields, exc.extra_fields
+
+
+@pytest.mark.parametrize('definition, values', [
+    (
+        {'type': 'object', 'properties': {'a': {'type': 'integer'}, 'b': {'default': [1]}}, 'required': ['a'], 'additionalProperties': False},
+        [{'a': 1}, {'a': 1, 'b': 2}, {'a': 'x'}, {'c': 1}, {'a': 1, 'c': 1}, [], None],
+    ),
+    (
+        {'patternProperties': {'^x': {'type': 'string'}}, 'additionalProperties': {'type': 'integer'}, 'propertyNames': {'maxLength': 3}},
+        [{'xa': 'a', 'b': 1}, {'xa': 1}, {'b': 'a'}, {'abcd': 1}, 'x'],
+    ),
+    (
+        {'dependencies': {'a': ['b'], 'c': {'required': ['d']}, 'e': False}},
+        [{'a': 1, 'b': 2}, {'a': 1}, {'c': 1}, {'c': 1, 'd': 1}, {'e': 1}, 1],
+    ),
+    (
+        {'type': 'array', 'items': [{'type': 'integer'}, {'default': 'x'}], 'additionalItems': {'type': 'string'}, 'uniqueItems': True},
+        [[1], [1, 'a', 'b'], [1, 'a', 2], ['a'], [1, 1, 1], 'ab'],
+    ),
+    (
+        {'anyOf': [{'type': 'string', 'maxLength': 2}, {'type': 'integer', 'minimum': 5}], 'not': {'const': 7}},
+        ['ab', 'abc', 5, 4, 7, None],
+    ),
+    (
+        {'oneOf': [{'multipleOf': 3}, {'multipleOf': 5}], 'exclusiveMaximum': 100},
+        [3, 5, 15, 7, 100, 'a'],
+    ),
+    (
+        {'if': {'minimum': 0}, 'then': {'maximum': 10}, 'else': {'multipleOf': 2.5}},
+        [5, 11, -5, -4, 'a'],
+    ),
+    (
+        {'contains': {'type': 'null'}, 'minItems': 2, 'maxItems': 3},
+        [[None, 1], [1, 2], [None], [None, 1, 2, 3]],
+    ),
+    (
+        {'type': 'string', 'format': 'date', 'pattern': '^2', 'enum': ['2020-01-01', '1999-01-01', '2020-1']},
+        ['2020-01-01', '1999-01-01', '2020-1', 'x'],
+    ),
+    (
+        {'type': 'object', 'properties': {'child': {'$ref': '#'}, 'value': {'type': 'number'}}, 'additionalProperties': False},
+        [{'child': {'child': {'value': 1}}}, {'child': {'child': {'value': 'x'}}}, {'child': {'x': 1}}],
+    ),
+    (
+        {'$schema': 'http://json-schema.org/draft-04/schema', 'type': ['integer', 'array'], 'minimum': 1, 'maximum': 5, 'exclusiveMaximum': True},
+        [1, 5, 0, 1.0, True, [], 'a'],
+    ),
+    (
+        {'contentEncoding': 'base64', 'contentMediaType': 'application/json'},
+        ['eyJhIjogMX0=', 'e', 'bm90IGpzb24=', 1],
+    ),
+])
+def test_same_result_as_compiled(definition, values):
+    compiled = compile(definition)
+    interpreted = interpret(definition)
+    for value in values:
+        assert result(interpreted, value) == result(compiled, value), value
+
+
+def test_root_path_and_root_object():
+    definition = {'properties': {'a': {'type': 'string'}}}
+    with pytest.raises(JsonSchemaValidationException) as exc:
+        interpret(definition)({'a': 1}, root_object={'x': 1}, root_path=['x'])
+    assert exc.value.path == ['x', 'a']
+    assert exc.value.root_object == {'x': 1}
+
+
+def test_definition_error():
+    with pytest.raises(JsonSchemaDefinitionException, match='Unknown type: '):
+        interpret({'type': 'foo'})
+    with pytest.raises(JsonSchemaDefinitionException, match='minLength must be a number'):
+        interpret({'minLength': 'x'})
+
+
+def test_custom_formats():
+    validate_format = interpret({'format': 'foo'}, formats={'foo': r'^f', 'bar': bool})
+    assert validate_format('fa') == 'fa'
+    with pytest.raises(JsonSchemaValidationException, match='must be foo'):
+        validate_format('a')
+
+
+def test_validate_is_interpreted():
+    assert validate({'type': 'object', 'properties': {'a': {'default': 1}}}, {}) == {'a': 1}
+    with pytest.raises(JsonSchemaValidationException):
+        validate({'type': 'string'}, 1)
+
+
+def test_validate_deep_data_of_recursive_schema():
+    definition = {'type': 'object', 'properties': {'child': {'$ref': '#'}, 'value': {'type': 'number'}}}
+    assert interpret(definition).recursive
+    assert not interpret({'properties': {'a': {'$ref': '#/definitions/a'}}, 'definitions': {'a': {}}}).recursive
+    data = {'value': 1}
+    for _ in range(300):
+        data = {'child': data}
+    assert validate(definition, data) == data
+    data['child'] = {'value': 'x'}
+    with pytest.raises(JsonSchemaValidationException):
+        validate(definition, data)
+
+
+def test_tiered_promoted_by_calls():
+    validator = compile({'type': 'string', 'minLength': 2}, tiered=3)
+    assert isinstance(validator, TieredValidator)
+    assert isinstance(validator.interpreted, Interpreter)
+    for _ in range(3):
+        assert validator('ab') == 'ab'
+        assert not validator.promoted
+    assert validator('ab') == 'ab'
+    assert validator.promoted
+    assert validator.calls == 3
+    with pytest.raises(JsonSchemaValidationException, match='must be longer than or equal to 2 characters'):
+        validator('a')
+
+
+def test_tiered_promoted_by_time():
+    validator = TieredValidator(interpret({'type': 'string'}), lambda: compile({'type': 'string'}), promote_calls=None, promote_ns=0)
+    assert validator('a') == 'a'
+    assert validator.promoted
+    assert validator.calls == 0
+
+
+def test_tiered_attributes_of_promoted():
+    validator = compile({'type': 'string'}, tiered=True, instrument=True)
+    assert not validator.promoted
+    assert 'keywords' in validator.stats()
+    assert validator.promoted
+
+
+@pytest.mark.parametrize('promoted', (False, True))
+def test_tiered_keyword_arguments_are_passed(promoted):
+    validator = compile({'properties': {'a': {'type': 'string'}}}, tiered=1, budget_ns=10 ** 10)
+    if promoted:
+        validator({})
+    kwargs = {'root_object': {'x': 1}, 'root_path': ['x'], 'special_fields_extractor': None, 'budget_ns': 10 ** 9}
+    with pytest.raises(JsonSchemaValidationException) as exc:
+        validator({'a': 1}, **kwargs)
+    assert exc.value.path == ['x', 'a']
+    assert exc.value.root_object == {'x': 1}
+    assert validator.promoted == promoted
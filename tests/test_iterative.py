@@ -0,0 +1,108 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile, compile_to_code
+
+
+TREE = {
+    'type': 'object',
+    'properties': {
+        'value': {'type': 'integer', 'minimum': 0},
+        'children': {'type': 'array', 'items': {'$ref': '#'}},
+    },
+    'required': ['value'],
+}
+
+
+def make_deep_tree(depth, value=0):
+    data = {'value': value}
+    for _ in range(depth):
+        data = {'value': 1, 'children': [{'value': 2}, data]}
+    return data
+
+
+def test_deep_data_without_recursion_error():
+    data = make_deep_tree(2000)
+    with pytest.raises(RecursionError):
+        compile(TREE)(data)
+    assert compile(TREE, iterative=True)(data) == data
+
+
+def test_maximum_depth():
+    validate = compile(TREE, iterative=100)
+    assert validate(make_deep_tree(98)) == make_deep_tree(98)
+    with pytest.raises(RecursionError, match='maximum depth of iterative validation exceeded'):
+        validate(make_deep_tree(100))
+
+
+def test_ref_cycle_ends_with_recursion_error():
+    definition = {'$ref': '#/definitions/a', 'definitions': {'a': {'allOf': [{'$ref': '#/definitions/a'}]}}}
+    with pytest.raises(RecursionError):
+        compile(definition, iterative=True)(1)
+
+
+def test_deep_data_with_tiered():
+    data = make_deep_tree(3000)
+    # Interpreter is recursive, so iterative validator is compiled right away.
+    assert compile(TREE, iterative=True, tiered=1)(data) == data
+
+
+def test_deep_data_error_path():
+    validate = compile(TREE, iterative=True)
+    with pytest.raises(JsonSchemaValidationException) as exc:
+        validate(make_deep_tree(2000, value=-1))
+    assert exc.value.path == ['children', 1] * 2000 + ['value']
+    assert exc.value.rule == 'minimum'
+
+
+@pytest.mark.parametrize('value', [
+    make_deep_tree(50),
+    make_deep_tree(50, value=-1),
+    make_deep_tree(50, value='x'),
+    {'value': 1, 'children': [{'value': 1}, {}]},
+    {'value': 1, 'children': 'x'},
+])
+def test_same_result_as_recursive(value):
+    def result(iterative):
+        try:
+            return compile(TREE, iterative=iterative, inline_refs=0)(value)
+        except JsonSchemaValidationException as exc:
+            return exc.message, exc.rule, exc.path, exc.definition
+    assert result(False) == result(True)
+
+
+@pytest.mark.parametrize('value, expected', [
+    (1, None),
+    ({'next': {'next': {}}}, None),
+    ({}, ('not', [])),
+    ({'next': {'next': 'x'}}, ('type', ['next', 'next'])),
+])
+def test_errors_are_caught_by_any_of_and_not(value, expected):
+    definition = {
+        'definitions': {
+            'node': {'type': 'object', 'properties': {'next': {'$ref': '#/definitions/node'}}},
+            'leaf': {'type': 'object', 'maxProperties': 0},
+        },
+        'anyOf': [{'$ref': '#/definitions/node'}, {'type': 'integer'}],
+        'not': {'$ref': '#/definitions/leaf'},
+    }
+    def result(iterative):
+        try:
+            compile(definition, iterative=iterative, inline_refs=0)(value)
+        except JsonSchemaValidationException as exc:
+            return exc.rule, exc.path
+        return None
+    assert result(False) == result(True) == expected
+
+
+def test_lazy():
+    validate = compile(TREE, iterative=True, lazy=True)
+    data = make_deep_tree(2000)
+    assert validate(data) == data
+
+
+def test_compile_to_code():
+    code = compile_to_code(TREE, iterative=True)
+    global_state = {}
+    exec(code, global_state)
+    data = make_deep_tree(2000)
+    assert global_state['validate'](data) == data
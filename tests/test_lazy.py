@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile
+
+
+DEFINITION = {
+    'type': 'object',
+    'properties': {
+        'a': {'$ref': '#/definitions/a'},
+        'b': {'$ref': '#/definitions/b'},
+        'tree': {'$ref': '#/definitions/tree'},
+    },
+    'definitions': {
+        'a': {'type': 'string', 'pattern': '^a'},
+        'b': {'type': 'object', 'properties': {'c': {'$ref': '#/definitions/c'}}},
+        'c': {'type': 'integer', 'minimum': 0},
+        'tree': {'type': 'object', 'properties': {'children': {'type': 'array', 'items': {'$ref': '#/definitions/tree'}}}},
+    },
+}
+
+
+def test_functions_are_generated_on_first_call():
+    validate = compile(DEFINITION, lazy=True, inline_refs=0)
+    global_state = validate.__globals__
+    stub = global_state['validate___definitions_a']
+    assert 'validate___definitions_c' not in global_state
+
+    assert validate({'a': 'abc'}) == {'a': 'abc'}
+    assert global_state['validate___definitions_a'] is not stub
+    assert 'validate___definitions_c' not in global_state
+
+    assert validate({'b': {'c': 1}})
+    assert 'validate___definitions_c' in global_state
+
+
+@pytest.mark.parametrize('value', [
+    {'a': 'abc', 'b': {'c': 1}},
+    {'a': 'xyz'},
+    {'b': {'c': -1}},
+    {'tree': {'children': [{'children': []}, {'children': [{'children': 1}]}]}},
+])
+def test_same_result_as_eager(value):
+    def result(lazy):
+        try:
+            return compile(DEFINITION, lazy=lazy)(value)
+        except JsonSchemaValidationException as exc:
+            return exc.message, exc.rule, exc.path
+    assert result(True) == result(False)
+
+
+def test_imports_needed_only_by_lazy_function():
+    definition = {'properties': {'a': {'$ref': '#/definitions/m'}}, 'definitions': {'m': {'multipleOf': 0.5}}}
+    validate = compile(definition, lazy=True, inline_refs=0)
+    assert validate({'a': 1.5}) == {'a': 1.5}
+    with pytest.raises(JsonSchemaValidationException, match='must be multiple of 0.5'):
+        validate({'a': 1.2})
+
+
+def test_concurrent_first_calls():
+    validate = compile(DEFINITION, lazy=True)
+    errors = []
+
+    def run():
+        try:
+            validate({'a': 'a', 'b': {'c': 1}, 'tree': {'children': [{}]}})
+        except Exception as exc:  # pylint: disable=broad-except
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
@@ -0,0 +1,43 @@
+import pytest
+
+import precisionlife_fastjsonschema.ref_resolver
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile
+
+
+@pytest.fixture(autouse=True)
+def no_network(monkeypatch):
+    def urlopen(uri, *args, **kwargs):
+        raise AssertionError('Network access to {}'.format(uri))
+    monkeypatch.setattr(precisionlife_fastjsonschema.ref_resolver, 'urlopen', urlopen)
+
+
+@pytest.mark.parametrize('uri', [
+    'http://json-schema.org/draft-04/schema#',
+    'http://json-schema.org/draft-06/schema#',
+    'http://json-schema.org/draft-07/schema#',
+    'http://json-schema.org/draft-07/schema',
+])
+def test_meta_schema_without_network(uri):
+    validate = compile({'$schema': uri, '$ref': uri}, handlers={}, store={})
+    # Meta schemas define some defaults which are filled in.
+    assert validate({'type': 'string', 'minLength': 1})['minLength'] == 1
+    with pytest.raises(JsonSchemaValidationException):
+        validate({'minLength': -1})
+
+
+def test_meta_schema_in_subschema():
+    validate = compile({
+        'properties': {
+            'schema': {'$ref': 'http://json-schema.org/draft-07/schema#'},
+        },
+    }, store={})
+    validate({'schema': {'type': 'integer'}})
+    with pytest.raises(JsonSchemaValidationException):
+        validate({'schema': {'type': 'foo'}})
+
+
+def test_store_overrides_meta_schema():
+    validate = compile({'$ref': 'http://json-schema.org/draft-07/schema#'}, store={
+        'http://json-schema.org/draft-07/schema': {'type': 'integer'},
+    })
+    assert validate(42) == 42
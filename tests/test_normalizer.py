@@ -0,0 +1,138 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile, normalize_schema
+
+
+def test_single_all_of_is_merged():
+    definition, report = normalize_schema({
+        'type': 'object',
+        'allOf': [{'properties': {'a': {'type': 'string'}}}],
+    })
+    assert definition == {'type': 'object', 'properties': {'a': {'type': 'string'}}}
+    assert report == ['#/allOf: allOf with single subschema merged into parent']
+
+
+def test_single_all_of_is_not_merged_when_order_changes():
+    definition = {'minProperties': 1, 'allOf': [{'type': 'object'}]}
+    assert normalize_schema(definition)[0] == definition
+
+
+def test_single_all_of_with_ref_is_not_merged():
+    definition = {'type': 'object', 'allOf': [{'$ref': '#/definitions/a'}], 'definitions': {'a': {}}}
+    assert normalize_schema(definition)[0] == definition
+
+
+def test_nested_all_of_is_flattened():
+    definition, report = normalize_schema({
+        'allOf': [{'allOf': [{'minLength': 1}, {'maxLength': 2}]}, {'pattern': 'a'}],
+    })
+    assert definition == {'allOf': [{'minLength': 1}, {'maxLength': 2}, {'pattern': 'a'}]}
+    assert report == ['#/allOf/0: nested allOf flattened']
+
+
+def test_nested_any_of_is_kept():
+    definition = {'anyOf': [{'anyOf': [{'minLength': 1}, {'maxLength': 2}]}, {'pattern': 'a'}]}
+    assert normalize_schema(definition)[0] == definition
+
+
+def test_empty_subschemas_are_removed():
+    definition, report = normalize_schema({'allOf': [{}, True, {}], 'anyOf': [{'minLength': 1}, {}, {'maxLength': 1}]})
+    assert definition == {}
+    assert report == ['#/allOf: empty subschemas removed', '#/anyOf: always valid anyOf removed']
+
+
+def test_any_of_with_default_is_truncated():
+    definition, report = normalize_schema({'anyOf': [{'properties': {'a': {'default': 1}}}, {}, {'minLength': 1}]})
+    assert definition == {'anyOf': [{'properties': {'a': {'default': 1}}}, {}]}
+    assert report == ['#/anyOf: subschemas after empty subschema removed']
+
+
+@pytest.mark.parametrize('schema', ['http://json-schema.org/draft-04/schema', 'http://json-schema.org/draft-07/schema'])
+def test_additional_properties_are_not_reduced_to_empty(schema):
+    definition, report = normalize_schema({'$schema': schema, 'additionalProperties': {'anyOf': [{}]}})
+    assert definition == {'$schema': schema, 'additionalProperties': True}
+    assert report == [
+        '#/additionalProperties/anyOf: always valid anyOf removed',
+        '#/additionalProperties: always valid subschema replaced by true',
+    ]
+    assert compile(definition)({'a': 1}) == {'a': 1}
+
+
+def test_true_is_not_empty_in_draft04():
+    definition = {'$schema': 'http://json-schema.org/draft-04/schema', 'allOf': [True]}
+    assert normalize_schema(definition)[0] == definition
+
+
+def test_if_without_then_and_else_is_removed():
+    definition, report = normalize_schema({'if': {'minLength': 1}, 'maxLength': 2})
+    assert definition == {'maxLength': 2}
+    assert report == ['#/if: if without then and else removed']
+
+
+def test_known_type_is_removed():
+    definition, report = normalize_schema({
+        'type': 'integer',
+        'anyOf': [{'type': 'number', 'minimum': 1}, {'type': 'integer', 'maximum': -1}],
+        'not': {'type': ['string', 'integer'], 'minimum': 0},
+    })
+    assert definition == {
+        'type': 'integer',
+        'anyOf': [{'minimum': 1}, {'maximum': -1}],
+        'not': {'minimum': 0},
+    }
+    assert len(report) == 3
+
+
+def test_referenced_nodes_are_kept():
+    definition = {
+        'allOf': [{'allOf': [{'minLength': 1}]}, {}],
+        'properties': {'a': {'$ref': '#/allOf/0'}},
+    }
+    # Referenced node itself can be simplified, but it cannot be moved.
+    assert normalize_schema(definition)[0] == dict(definition, allOf=[{'minLength': 1}, {}])
+
+
+def test_nested_schemas_are_normalized():
+    definition, report = normalize_schema({
+        'properties': {'a/b': {'items': {'allOf': [{}, {'type': 'string'}]}}},
+        'definitions': {'x': {'anyOf': [True]}},
+    })
+    assert definition == {
+        'properties': {'a/b': {'items': {'type': 'string'}}},
+        'definitions': {'x': {}},
+    }
+    assert report == [
+        '#/properties/a~1b/items/allOf: empty subschemas removed',
+        '#/properties/a~1b/items/allOf: allOf with single subschema merged into parent',
+        '#/definitions/x/anyOf: always valid anyOf removed',
+    ]
+
+
+def test_definition_is_not_changed():
+    definition = {'type': 'string', 'allOf': [{'type': 'string', 'minLength': 1}]}
+    normalize_schema(definition)
+    assert definition == {'type': 'string', 'allOf': [{'type': 'string', 'minLength': 1}]}
+
+
+@pytest.mark.parametrize('definition', [
+    {'type': 'object', 'allOf': [{'properties': {'a': {'type': 'integer', 'allOf': [{'minimum': 0}]}}}]},
+    {'type': 'string', 'allOf': [{'allOf': [{'type': 'string', 'minLength': 1}, {}]}, {'maxLength': 2}]},
+    {'type': 'integer', 'anyOf': [{'type': 'number', 'minimum': 2}, {'type': 'integer', 'maximum': 0}]},
+    {'anyOf': [{'type': 'string'}, True, {'minimum': 1}], 'maxLength': 2},
+    {'if': {'type': 'string'}, 'minimum': 1},
+    {'type': 'array', 'items': {'allOf': [{'type': 'integer'}], 'enum': [1, 'a']}},
+    {'properties': {'a': {'allOf': [{'default': 1}]}}, 'type': 'object'},
+    {'type': 'integer', 'not': {'type': 'integer', 'minimum': 2}},
+    {'additionalProperties': {'anyOf': [{}]}},
+    {'properties': {'a': {}}, 'additionalProperties': {'allOf': [{}]}},
+])
+@pytest.mark.parametrize('value', [
+    None, True, 0, 1, 2, 1.5, '', 'a', 'abc', [], [1], ['a'], [1.5], {}, {'a': 1}, {'a': -1}, {'a': 'x'},
+])
+def test_same_result_as_not_normalized(definition, value):
+    def result(normalize):
+        try:
+            return compile(definition, normalize=normalize)(value)
+        except JsonSchemaValidationException as exc:
+            return exc.message, exc.rule, exc.path
+    assert result(True) == result(False)
@@ -0,0 +1,78 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+def test_guard_of_known_type_is_removed():
+    code = CodeGeneratorDraft07({'type': 'string', 'minLength': 1, 'maxLength': 5}).func_code
+    assert 'if isinstance(data, str):' not in code
+    assert 'if data_len < 1:' in code
+
+
+def test_unreachable_guard_is_removed():
+    code = CodeGeneratorDraft07({'type': 'string', 'minimum': 1, 'minItems': 2}).func_code
+    assert 'minimum' not in code.replace('DEFINITIONS', '')
+    assert 'data_len < 2' not in code
+
+
+def test_unused_type_variable_is_removed():
+    code = CodeGeneratorDraft07({'type': 'object', 'properties': {'a': {}}, 'required': ['a']}).func_code
+    assert 'data_is_dict' not in code
+
+
+def test_guard_without_type_is_kept():
+    code = CodeGeneratorDraft07({'minLength': 1}).func_code
+    assert 'if isinstance(data, str):' in code
+
+
+def test_type_list():
+    code = CodeGeneratorDraft07({'type': ['string', 'null'], 'minLength': 1, 'minimum': 1}).func_code
+    assert 'if isinstance(data, str):' in code
+    assert 'if isinstance(data, (int, float)):' not in code
+
+
+def test_type_is_not_known_outside_of_any_of():
+    code = CodeGeneratorDraft07({'anyOf': [{'type': 'string'}, {'type': 'number'}], 'minLength': 1}).func_code
+    assert 'if isinstance(data, str):' in code
+
+
+def test_reassigned_variable_is_not_known():
+    code = CodeGeneratorDraft07({
+        'type': 'string',
+        'contentEncoding': 'base64',
+        'contentMediaType': 'application/json',
+    }).func_code
+    assert code.count('if isinstance(data, str):') == 1
+
+
+def test_optimize_off():
+    code = CodeGeneratorDraft07({'type': 'string', 'minLength': 1}, optimize=False).func_code
+    assert 'if isinstance(data, str):' in code
+
+
+@pytest.mark.parametrize('definition', [
+    {'type': 'string', 'minLength': 2, 'maxLength': 3, 'pattern': '^a', 'minimum': 1},
+    {'type': 'number', 'minimum': 1, 'maximum': 10, 'multipleOf': 2, 'minLength': 1},
+    {'type': 'integer', 'exclusiveMinimum': 0, 'maxItems': 1},
+    {'type': ['integer', 'array'], 'minimum': 1, 'minItems': 1},
+    {'type': ['boolean', 'null'], 'minimum': 1},
+    {'type': 'array', 'minItems': 1, 'uniqueItems': True, 'items': {'type': 'string', 'minLength': 1}, 'contains': {'const': 'a'}},
+    {'type': 'object', 'minProperties': 1, 'properties': {'a': {'type': 'integer', 'minimum': 0}}, 'required': ['a'], 'additionalProperties': False},
+    {'type': 'object', 'patternProperties': {'^x': {'type': 'string'}}, 'propertyNames': {'maxLength': 2}, 'dependencies': {'a': ['b']}},
+    {'allOf': [{'type': 'string'}, {'minLength': 2}]},
+    {'anyOf': [{'type': 'string', 'minLength': 2}, {'type': 'integer', 'minimum': 2}]},
+    {'not': {'type': 'string', 'minLength': 2}},
+    {'if': {'type': 'string'}, 'then': {'minLength': 2}, 'else': {'minimum': 2}},
+])
+@pytest.mark.parametrize('value', [
+    None, True, False, 0, 1, 2, 3, 1.5, 2.0, -1, '', 'a', 'ab', 'abc', [], ['a'], ['a', 'a'], [1, 2],
+    {}, {'a': 1}, {'a': -1}, {'a': 1, 'b': 2}, {'x': 'y'}, {'xy': 1}, {'abc': 1},
+])
+def test_same_result_as_not_optimized(definition, value):
+    def result(optimize):
+        try:
+            return compile(definition, optimize=optimize)(value)
+        except JsonSchemaValidationException as exc:
+            return exc.message, exc.rule, exc.path
+    assert result(True) == result(False)
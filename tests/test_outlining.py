@@ -0,0 +1,72 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+def make_deep_schema(depth):
+    definition = {'type': 'string'}
+    for level in range(depth):
+        definition = {
+            'type': 'object',
+            'properties': {
+                'nested': definition,
+                'level{}'.format(level): {'type': 'integer', 'minimum': 0},
+            },
+            'required': ['nested'],
+        }
+    return definition
+
+
+def make_deep_data(depth, value):
+    data = value
+    for _ in range(depth):
+        data = {'nested': data}
+    return data
+
+
+@pytest.mark.parametrize('optimize', [True, False])
+def test_deep_schema(optimize):
+    validate = compile(make_deep_schema(50), optimize=optimize)
+    data = make_deep_data(50, 'x')
+    assert validate(data) == data
+
+
+def test_deep_schema_error_path():
+    validate = compile(make_deep_schema(50))
+    with pytest.raises(JsonSchemaValidationException) as exc:
+        validate(make_deep_data(50, 1))
+    assert exc.value.path == ['nested'] * 50
+    assert exc.value.rule == 'type'
+
+    data = make_deep_data(30, dict(make_deep_data(20, 'x'), level19=-1))
+    with pytest.raises(JsonSchemaValidationException) as exc:
+        validate(data)
+    assert exc.value.path == ['nested'] * 30 + ['level19']
+    assert exc.value.rule == 'minimum'
+
+
+def test_deep_schema_is_outlined():
+    code = CodeGeneratorDraft07(make_deep_schema(50), deduplicate=False).func_code
+    assert code.count('def validate_subschema_') > 1
+    max_indent = max(len(line) - len(line.lstrip()) for line in code.splitlines())
+    assert max_indent <= CodeGeneratorDraft07.OUTLINE_INDENT * CodeGeneratorDraft07.INDENT
+
+
+def test_big_subschema_is_outlined():
+    definition = {
+        'type': 'object',
+        'properties': {
+            'big': {
+                'type': 'object',
+                'properties': {'prop{}'.format(idx): {'type': 'integer', 'maximum': idx} for idx in range(300)},
+            },
+            'small': {'type': 'string'},
+        },
+    }
+    code = CodeGeneratorDraft07(definition).func_code
+    assert code.count('def validate_subschema_') == 1
+    validate = compile(definition)
+    with pytest.raises(JsonSchemaValidationException) as exc:
+        validate({'big': {'prop10': 11}})
+    assert exc.value.path == ['big', 'prop10']
@@ -0,0 +1,124 @@
+import json
+
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, Profile, compile
+from precisionlife_fastjsonschema.draft07 import CodeGeneratorDraft07
+
+
+DEFINITION = {
+    'anyOf': [
+        {'type': 'string', 'maxLength': 3},
+        {'type': 'object', 'properties': {'a': {'type': 'integer'}}, 'required': ['a']},
+        {'$ref': '#/definitions/positive'},
+    ],
+    'definitions': {
+        'positive': {'type': 'integer', 'minimum': 0},
+    },
+}
+
+CORPUS = [1, 2, 3, 4, {'a': 1}, {'a': 2}, 'abc']
+
+
+def record_profile(definition, corpus):
+    validate = compile(definition, instrument=True)
+    for value in corpus:
+        try:
+            validate(value)
+        except JsonSchemaValidationException:
+            pass
+    return validate.stats()
+
+
+def result(validate, value):
+    try:
+        return validate(value)
+    except JsonSchemaValidationException as exc:
+        return exc.message, exc.rule, exc.path
+
+
+def test_branch_matches_in_stats():
+    stats = record_profile(DEFINITION, CORPUS)
+    assert stats['branches'] == {'#/anyOf': [1, 2, 4]}
+    assert json.loads(json.dumps(stats)) == stats
+
+
+def test_branches_reordered():
+    profile = Profile(record_profile(DEFINITION, CORPUS))
+    assert profile.branch_order('#/anyOf', 3) == [2, 1, 0]
+    code = CodeGeneratorDraft07(DEFINITION, profile=profile).func_code
+    assert code.index('data < 0') < code.index('"a" in data') < code.index('data_len > 3')
+    assert 'data_errors[2] = exc' in code
+
+
+def test_not_reordered_without_profile():
+    code = CodeGeneratorDraft07(DEFINITION).func_code
+    assert code.index('data_len > 3') < code.index('"a" in data') < code.index('data < 0')
+    assert 'data_errors.append(exc)' in code
+
+
+@pytest.mark.parametrize('value', [
+    1, 'ab', {'a': 1},
+    -1, 'abcd', {'a': 'x'}, {'b': 1}, None, [],
+])
+def test_same_result_as_without_profile(value):
+    profile = record_profile(DEFINITION, CORPUS)
+    assert result(compile(DEFINITION, profile=profile), value) == result(compile(DEFINITION), value)
+
+
+def test_side_effects_prevent_reordering():
+    definition = {
+        'anyOf': [
+            {'type': 'string'},
+            {'$ref': '#/definitions/with_default'},
+        ],
+        'definitions': {
+            'with_default': {'type': 'object', 'properties': {'a': {'default': 1}}},
+        },
+    }
+    profile = Profile(record_profile(definition, [{}, {}, {}]))
+    assert profile.branch_order('#/anyOf', 2) == [1, 0]
+    code = CodeGeneratorDraft07(definition, profile=profile).func_code
+    assert code.index('isinstance(data, (str))') < code.index('isinstance(data, (Mapping))')
+
+
+def test_keywords_reordered():
+    definition = {'type': 'string', 'minLength': 1, 'pattern': '^a', 'maxLength': 5}
+    profile = Profile(record_profile(definition, ['abc', 'abcdefgh', 'abcdefghi', 'xyz']))
+    assert profile.keyword_order('#', ['type', 'minLength', 'maxLength', 'pattern']) == [
+        'type', 'maxLength', 'pattern', 'minLength',
+    ]
+    code = CodeGeneratorDraft07(definition, profile=profile).func_code
+    assert code.index('data_len > 5') < code.index('regex_0(data)') < code.index('data_len < 1')
+    validate = compile(definition, profile=profile)
+    assert validate('abc') == 'abc'
+    with pytest.raises(JsonSchemaValidationException) as exc:
+        validate('')
+    # Fails also minLength, which is the first reported error without the profile.
+    assert exc.value.rule == 'pattern'
+
+
+@pytest.mark.parametrize('value', [
+    {'a': 1}, [1], {}, [1, 1], [], {'a': 1, 'b': 2, 'c': 3}, 'abc',
+])
+def test_keywords_of_different_types_reordered(value):
+    definition = {'maxProperties': 2, 'uniqueItems': True, 'minItems': 1}
+    profile = Profile(record_profile(definition, [[1, 1]] * 5 + [{'a': 1}]))
+    assert profile.keyword_order('#', list(definition)) == ['uniqueItems', 'maxProperties', 'minItems']
+    # Length of the array cannot be reused for the object.
+    assert result(compile(definition, profile=profile), value) == result(compile(definition), value)
+
+
+def test_profile_from_file(tmp_path):
+    path = tmp_path / 'profile.json'
+    path.write_text(json.dumps(record_profile(DEFINITION, CORPUS)))
+    validate = compile(DEFINITION, profile=str(path))
+    assert validate(5) == 5
+    with pytest.raises(JsonSchemaValidationException):
+        validate(-5)
+
+
+def test_profile_of_other_schema_is_ignored():
+    profile = record_profile({'anyOf': [{'type': 'string'}]}, ['a'])
+    validate = compile(DEFINITION, profile=profile)
+    assert validate(5) == 5
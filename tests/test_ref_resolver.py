@@ -0,0 +1,52 @@
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaDefinitionException, RefResolver
+
+
+SCHEMA = {
+    'definitions': {
+        'a/b': {'type': 'string'},
+        'c~d': {'type': 'integer'},
+        'e f': {'type': 'null'},
+        'list': {'allOf': [{'type': 'number'}, {'minimum': 1}]},
+    },
+    'properties': {
+        'x': {'$ref': '#/definitions/a~1b'},
+    },
+}
+
+
+@pytest.mark.parametrize('ref, expected', [
+    ('#', SCHEMA),
+    ('#/definitions/a~1b', {'type': 'string'}),
+    ('#/definitions/c~0d', {'type': 'integer'}),
+    ('#/definitions/e f', {'type': 'null'}),
+    ('#/definitions/e%20f', {'type': 'null'}),
+    ('#/definitions/list/allOf/1', {'minimum': 1}),
+])
+def test_resolving_by_index(ref, expected):
+    resolver = RefResolver.from_schema(SCHEMA)
+    with resolver.resolving(ref) as definition:
+        assert definition == expected
+
+
+def test_walk_indexes_all_nodes():
+    resolver = RefResolver.from_schema(SCHEMA)
+    _, index = resolver.pointer_indexes['']
+    assert index['/definitions/list/allOf/0'] is SCHEMA['definitions']['list']['allOf'][0]
+    assert index['/properties/x'] is SCHEMA['properties']['x']
+
+
+def test_unresolvable_pointer():
+    resolver = RefResolver.from_schema(SCHEMA)
+    with pytest.raises(JsonSchemaDefinitionException):
+        with resolver.resolving('#/definitions/missing'):
+            pass
+
+
+def test_remote_document_is_indexed():
+    remote = {'definitions': {'a': {'type': 'string'}}}
+    resolver = RefResolver.from_schema({}, handlers={'http': lambda uri: remote})
+    with resolver.resolving('http://example.com/remote.json#/definitions/a') as definition:
+        assert definition is remote['definitions']['a']
+    assert resolver.pointer_indexes['http://example.com/remote.json'][0] is remote
@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+
+import precisionlife_fastjsonschema.store
+from precisionlife_fastjsonschema import RefResolver, RefStore, compile
+
+
+def test_lru_eviction_by_entries():
+    store = RefStore(max_entries=2)
+    store['http://example.com/a'] = {'type': 'string'}
+    store['http://example.com/b'] = {'type': 'string'}
+    assert store['http://example.com/a']  # a is now the most recently used
+    store['http://example.com/c'] = {'type': 'string'}
+    assert set(store) == {'http://example.com/a', 'http://example.com/c'}
+    assert store.stats()['evictions'] == 1
+
+
+def test_eviction_by_bytes():
+    store = RefStore(max_bytes=60)
+    store['http://example.com/a'] = {'type': 'string'}
+    store['http://example.com/b'] = {'enum': ['x' * 40]}
+    assert list(store) == ['http://example.com/b']
+    assert store.stats()['bytes'] == len('{"enum": ["' + 'x' * 40 + '"]}')
+
+
+def test_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(precisionlife_fastjsonschema.store.time, 'monotonic', lambda: now[0])
+    store = RefStore(ttl=10, policies={'https': 100})
+    store['http://example.com/a'] = {'type': 'string'}
+    store['https://example.com/a'] = {'type': 'string'}
+    now[0] += 50
+    assert 'http://example.com/a' not in store
+    assert store.get('http://example.com/a') is None
+    assert store.get('https://example.com/a') == {'type': 'string'}
+
+
+def test_no_cache_policy():
+    store = RefStore()
+    store['internal-no-cache://a'] = {'type': 'string'}
+    assert len(store) == 0
+
+
+def test_stats():
+    store = RefStore()
+    store['http://example.com/a'] = {}
+    store.get('http://example.com/a')
+    store.get('http://example.com/b')
+    assert store.stats() == {'hits': 1, 'misses': 1, 'entries': 1, 'bytes': 2, 'evictions': 0}
+
+
+def test_stats_of_local_refs():
+    store = RefStore()
+    compile({
+        'properties': {'a': {'$ref': '#/definitions/a'}, 'b': {'$ref': '#/definitions/b'}},
+        'definitions': {'a': {'type': 'string'}, 'b': {'$ref': '#/definitions/a'}},
+    }, store=store)
+    assert store.stats() == {'hits': 0, 'misses': 0, 'entries': 0, 'bytes': 0, 'evictions': 0}
+
+
+def test_stats_of_remote_refs():
+    store = RefStore()
+    definition = {'$ref': 'custom://example.com/a', 'definitions': {'b': {'$ref': '#/definitions/c'}, 'c': {}}}
+    compile(definition, handlers={'custom': lambda uri: {'type': 'integer'}}, store=store)
+    compile(definition, handlers={'custom': lambda uri: {'type': 'integer'}}, store=store)
+    assert store.stats() == {'hits': 1, 'misses': 1, 'entries': 1, 'bytes': 19, 'evictions': 0}
+
+
+def test_resolvers_do_not_share_default_store():
+    first = RefResolver.from_schema({'type': 'string'})
+    second = RefResolver.from_schema({'type': 'string'})
+    assert first.store is not second.store
+
+
+def test_local_ids_are_not_stored():
+    store = RefStore()
+    compile({'$id': 'http://example.com/root.json', 'type': 'string'}, store=store)
+    assert len(store) == 0
+
+
+@pytest.mark.parametrize('store', [{}, RefStore()])
+def test_compile_uses_store(store):
+    calls = []
+
+    def handler(uri):
+        calls.append(uri)
+        return {'type': 'integer'}
+
+    compile({'$ref': 'custom://example.com/a'}, handlers={'custom': handler}, store=store)
+    compile({'$ref': 'custom://example.com/a'}, handlers={'custom': handler}, store=store)
+    compile({'$ref': 'internal-no-cache://example.com/a'}, handlers={'internal-no-cache': handler}, store=store)
+    compile({'$ref': 'internal-no-cache://example.com/a'}, handlers={'internal-no-cache': handler}, store=store)
+    assert calls == ['custom://example.com/a', 'internal-no-cache://example.com/a', 'internal-no-cache://example.com/a']
+
+
+def test_concurrent_access():
+    store = RefStore(max_entries=10)
+
+    def worker(idx):
+        for item in range(200):
+            uri = 'http://example.com/{}/{}'.format(idx, item % 20)
+            store[uri] = {'idx': item}
+            store.get(uri)
+
+    threads = [threading.Thread(target=worker, args=(idx,)) for idx in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = store.stats()
+    assert stats['entries'] == 10
+    assert stats['hits'] + stats['misses'] == 8 * 200
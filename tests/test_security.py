@@ -1,6 +1,11 @@
+import warnings
+
 import pytest
 
-from precisionlife_fastjsonschema import JsonSchemaDefinitionException, compile
+from precisionlife_fastjsonschema import (
+    FunctionPool, JsonSchemaDefinitionException, JsonSchemaValidationException, RegexRiskWarning, analyze_regex, compile,
+    interpret,
+)
 
 
 @pytest.mark.parametrize('schema', [
@@ -61,3 +66,116 @@ def test_generate_code_without_overriding_variables(asserter):
         },
         'additionalProperties': False,
     }, value, value)
+
+
+# Known regular expressions with catastrophic backtracking (ReDoS).
+REDOS_PATTERNS = [
+    '^(a+)+$',
+    '^(a*)*b$',
+    '^(a|aa)*$',
+    '^(a|a)*$',
+    '^(\\w+\\s?)*$',
+    '^(\\d+|\\w+)*$',
+    '^(.*,)*$',
+    '^(([a-z])+.)+[A-Z]([a-z])+$',
+    '^([a-zA-Z0-9]+)*@example\\.com$',
+]
+
+SAFE_PATTERNS = [
+    '^[a-z]+$',
+    '^(\\d+\\.)*\\d+$',
+    '^([a-z0-9]+[-.])*[a-z0-9]+$',
+    '^(ab|ac)*$',
+    '^(a|ab)*$',
+    '^[^@]+@[^@]+\\.[^@]+$',
+    '^(?:ab+c)*$',
+]
+
+
+@pytest.mark.parametrize('pattern', REDOS_PATTERNS)
+def test_redos_pattern_is_reported(pattern):
+    assert analyze_regex(pattern)
+
+
+@pytest.mark.parametrize('pattern', SAFE_PATTERNS)
+def test_safe_pattern_is_not_reported(pattern):
+    assert analyze_regex(pattern) == []
+
+
+@pytest.mark.parametrize('schema', [
+    {'pattern': '^(a+)+$'},
+    {'patternProperties': {'^(a+)+$': {}}},
+    {'format': 'evil'},
+])
+def test_redos_pattern_rejected(schema):
+    with pytest.raises(JsonSchemaDefinitionException, match='catastrophic backtracking'):
+        compile(schema, formats={'evil': '^(a+)+$'}, regex_policy='reject')
+    with pytest.raises(JsonSchemaDefinitionException, match='catastrophic backtracking'):
+        interpret(schema, formats={'evil': '^(a+)+$'}, regex_policy='reject')
+
+
+def test_redos_pattern_warned():
+    with pytest.warns(RegexRiskWarning, match="pattern '\\^\\(a\\+\\)\\+\\$' at #"):
+        compile({'pattern': '^(a+)+$'}, regex_policy='warn')
+
+
+@pytest.mark.parametrize('engine', (compile, interpret))
+def test_redos_pattern_guarded(engine):
+    validate = engine({
+        'properties': {'a': {'pattern': '^(a+)+$'}, 'b': {'format': 'evil'}},
+        'patternProperties': {'^(x+)+$': {'type': 'integer'}},
+    }, formats={'evil': '^(a+)+$'}, regex_policy='guard')
+    assert validate({'a': 'aaa', 'b': 'aaa', 'xx': 1}) == {'a': 'aaa', 'b': 'aaa', 'xx': 1}
+    # Would take ages without the guard.
+    for key in ('a', 'b'):
+        with pytest.raises(JsonSchemaValidationException):
+            validate({key: 'a' * 5000 + '!'})
+    assert validate({'x' * 5000: 'not matched, so not validated'})
+
+
+def test_redos_pattern_in_compile_stats():
+    validate = compile({'properties': {'a': {'pattern': '^(a+)+$'}, 'b': {'pattern': '^a+$'}}}, compile_stats=True)
+    assert validate.compile_stats['regex_risks'] == [{
+        'pointer': '#/properties/a',
+        'keyword': 'pattern',
+        'pattern': '^(a+)+$',
+        'risks': ['has nested quantifiers prone to catastrophic backtracking'],
+    }]
+
+
+POOLED_REDOS = {
+    'properties': {
+        'a': {'type': 'string', 'pattern': '^(a+)+$', 'minLength': 1, 'maxLength': 5000, 'format': 'email'},
+        'b': {'properties': {'c': {'type': 'string', 'pattern': '^(a+)+$', 'minLength': 1, 'maxLength': 5000, 'format': 'email'}}},
+    },
+}
+
+
+@pytest.mark.parametrize('regex_policy', [None, 'warn', 'reject', 'guard'])
+def test_redos_pattern_with_function_pool(regex_policy):
+    function_pool = FunctionPool()
+    for _ in range(2):
+        if regex_policy == 'reject':
+            with pytest.raises(JsonSchemaDefinitionException, match='at #/properties/a has nested quantifiers'):
+                compile(POOLED_REDOS, function_pool=function_pool, regex_policy=regex_policy)
+            continue
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            validate = compile(POOLED_REDOS, function_pool=function_pool, regex_policy=regex_policy, compile_stats=True)
+        assert [risk['pointer'] for risk in validate.compile_stats['regex_risks']] == [
+            '#/properties/a', '#/properties/b/properties/c',
+        ]
+        risk_warnings = [item for item in caught if item.category is RegexRiskWarning]
+        assert len(risk_warnings) == (2 if regex_policy == 'warn' else 0)
+    if regex_policy == 'guard':
+        with pytest.raises(JsonSchemaValidationException):
+            validate({'b': {'c': 'a' * 2000 + '!'}})
+    if regex_policy != 'reject':
+        # Risks of the second validator are reported also for functions from the pool.
+        assert function_pool.stats()['hits'] == 3
+        assert function_pool.stats()['functions'] == 2
+
+
+def test_unknown_regex_policy():
+    with pytest.raises(JsonSchemaDefinitionException, match='Unknown regex policy'):
+        compile({'pattern': '^a$'}, regex_policy='ignore')
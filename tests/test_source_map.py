@@ -0,0 +1,58 @@
+import gc
+import linecache
+import traceback
+
+import pytest
+
+from precisionlife_fastjsonschema import JsonSchemaValidationException, compile, locate_source, locate_traceback
+
+
+DEFINITION = {
+    'type': 'object',
+    'properties': {
+        'items': {'type': 'array', 'items': {'$ref': '#/definitions/item'}},
+    },
+    'definitions': {
+        'item': {'type': 'string', 'minLength': 2, 'pattern': '^a'},
+    },
+}
+
+
+def find_line(validate, text):
+    filename = validate.__code__.co_filename
+    for lineno, line in enumerate(linecache.getlines(filename), 1):
+        if text in line:
+            return filename, lineno
+    raise AssertionError('Line not found')
+
+
+def test_filename():
+    validate = compile(DEFINITION)
+    assert validate.__code__.co_filename.startswith('<fastjsonschema ')
+    assert not hasattr(validate, 'source_maps')
+
+
+@pytest.mark.parametrize('options', [{}, {'lazy': True}, {'inline_refs': 0}])
+def test_locate_traceback(options):
+    validate = compile(DEFINITION, source_map=True, **options)
+    with pytest.raises(JsonSchemaValidationException) as exc:
+        validate({'items': ['ab', 'b']})
+    assert locate_traceback(exc.value.__traceback__) == '#/definitions/item/minLength'
+    assert "rule='minLength'" in ''.join(traceback.format_tb(exc.value.__traceback__))
+
+
+def test_locate_source():
+    validate = compile(DEFINITION, source_map=True)
+    assert locate_source(*find_line(validate, "rule='pattern'")) == '#/definitions/item/pattern'
+    assert locate_source(*find_line(validate, 'def validate(')) == '#'
+    assert locate_source(validate.__code__.co_filename, 100000) is None
+    assert locate_source('<string>', 1) is None
+
+
+def test_source_map_is_freed():
+    validate = compile(DEFINITION, source_map=True)
+    filename, lineno = find_line(validate, "rule='pattern'")
+    del validate
+    gc.collect()
+    assert filename not in linecache.cache
+    assert locate_source(filename, lineno) is None